@@ -0,0 +1,108 @@
+#! /usr/bin/env python3
+"""Micro-benchmark for TvDatafeed.create_hist_df
+
+Parses a synthetic 5000-bar timescale_update payload with the current
+parser and with the previous per-row regex parser, checks both give the
+same dataframe and prints the timings.
+
+    python benchmarks/bench_create_hist_df.py [n_bars] [repeat]
+"""
+
+import datetime
+import json
+import re
+import sys
+import timeit
+
+import pandas as pd
+
+from tvDatafeed import TvDatafeed
+
+
+def synthetic_payload(n_bars, volume=True):
+    start = 1600000000
+    bars = []
+    for i in range(n_bars):
+        price = 100.0 + (i % 97) * 0.25
+        values = [start + 60 * i, price, price + 1.5, price - 1.25, price + 0.5]
+        if volume:
+            values.append(1000.0 + i)
+        bars.append({"i": i, "v": values})
+
+    message = json.dumps(
+        {
+            "m": "timescale_update",
+            "p": ["cs_benchmark", {"s1": {"node": "bench", "s": bars, "t": "s1"}}],
+        },
+        separators=(",", ":"),
+    )
+    return TvDatafeed.prepend_header(message) + "\n"
+
+
+def legacy_create_hist_df(raw_data, symbol):
+    # the per-row regex parser create_hist_df used before
+    out = re.search('"s":\\[(.+?)\\}\\]', raw_data).group(1)
+    x = out.split(',{"')
+    data = list()
+    volume_data = True
+
+    for xi in x:
+        xi = re.split("\\[|:|,|\\]", xi)
+        ts = datetime.datetime.fromtimestamp(float(xi[4]))
+
+        row = [ts]
+
+        for i in range(5, 10):
+            if not volume_data and i == 9:
+                row.append(0.0)
+                continue
+            try:
+                row.append(float(xi[i]))
+            except ValueError:
+                volume_data = False
+                row.append(0.0)
+
+        data.append(row)
+
+    data = pd.DataFrame(
+        data, columns=["datetime", "open", "high", "low", "close", "volume"]
+    ).set_index("datetime")
+    data.insert(0, "symbol", value=symbol)
+    return data
+
+
+def main(n_bars=5000, repeat=20):
+    for volume in (True, False):
+        raw_data = synthetic_payload(n_bars, volume)
+
+        pd.testing.assert_frame_equal(
+            TvDatafeed.create_hist_df(raw_data, "BENCH:SYM"),
+            legacy_create_hist_df(raw_data, "BENCH:SYM"),
+            check_dtype=False,
+            check_index_type=False,
+        )
+
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_create_hist_df(raw_data, "BENCH:SYM"),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        current = min(
+            timeit.repeat(
+                lambda: TvDatafeed.create_hist_df(raw_data, "BENCH:SYM"),
+                number=1,
+                repeat=repeat,
+            )
+        )
+
+        print(
+            f"{n_bars} bars, volume={volume}: "
+            f"legacy {legacy * 1000:.2f} ms, current {current * 1000:.2f} ms, "
+            f"speedup {legacy / current:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+"""Benchmark for the TvDatafeedLive Seis scheduler
+
+Adds n Seises spread over all intervals to the scheduler, then times
+lookups, membership tests, expiry handling and removal, and compares them
+with the previous list-scanning implementation.
+
+    python benchmarks/bench_live_scheduler.py [n_seises] [n_lookups]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from tvDatafeed import Interval, Seis, TvDatafeedLive
+
+
+class LegacySeisesAndTrigger(dict):
+    # the hot paths of the scheduler TvDatafeedLive used before: every
+    # expiry lookup sorts all groups and membership scans every Seis
+
+    def _next_trigger_dt(self):
+        if not self.values():
+            return None
+        return sorted(values[1] for values in self.values())[0]
+
+    def get_seis(self, symbol, exchange, interval):
+        for seis in self:
+            if (
+                seis.symbol == symbol
+                and seis.exchange == exchange
+                and seis.interval == interval
+            ):
+                return seis
+        return None
+
+    def append(self, seis, update_dt=None):
+        if seis.interval.value in self.keys():
+            super().__getitem__(seis.interval.value)[0].append(seis)
+        else:
+            self[seis.interval.value] = [[seis], update_dt]
+        self._next_trigger_dt()
+
+    def discard(self, seis):
+        if seis not in self:
+            raise KeyError("No such Seis in the list")
+        super().__getitem__(seis.interval.value)[0].remove(seis)
+        if not super().__getitem__(seis.interval.value)[0]:
+            self.pop(seis.interval.value)
+        self._next_trigger_dt()
+
+    def __iter__(self):
+        seises = []
+        for values in super().values():
+            seises += values[0]
+        return iter(seises)
+
+    def __contains__(self, seis):
+        for values in super().values():
+            if seis in values[0]:
+                return True
+        return False
+
+
+def run(sat, seises, lookups):
+    timings = {}
+    now = datetime.datetime.now()
+
+    start = time.perf_counter()
+    for seis in seises:
+        sat.append(seis, now)
+    timings["append"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seis in lookups:
+        sat.get_seis(seis.symbol, seis.exchange, seis.interval)
+    timings["get_seis"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seis in lookups:
+        seis in sat
+    timings["contains"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seis in lookups:
+        sat.discard(seis)
+    timings["discard"] = time.perf_counter() - start
+
+    return timings
+
+
+def main(n_seises=10000, n_lookups=1000):
+    intervals = list(Interval)
+    seises = [
+        Seis(f"SYM{i}", "EXCHANGE", intervals[i % len(intervals)])
+        for i in range(n_seises)
+    ]
+    lookups = random.Random(0).sample(seises, min(n_lookups, n_seises))
+
+    current = run(TvDatafeedLive._SeisesAndTrigger(), seises, lookups)
+    legacy = run(LegacySeisesAndTrigger(), seises, lookups)
+
+    print(f"{n_seises} Seises, {len(lookups)} lookups and removals")
+    for name in current:
+        print(
+            f"{name:>9}: legacy {legacy[name] * 1000:9.2f} ms, "
+            f"current {current[name] * 1000:7.2f} ms, "
+            f"speedup {legacy[name] / current[name]:8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
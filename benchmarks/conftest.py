@@ -0,0 +1,89 @@
+"""Fixtures of the benchmark suite
+
+Every benchmark runs against local stand-ins, the websocket Simulator and
+a symbol search HTTP server, so the timings measure the client rather than
+the network and TradingView.
+"""
+
+import http.server
+import json
+import logging
+import threading
+import urllib.parse
+
+import pytest
+
+from tvDatafeed import TvDatafeed
+from tvDatafeed.simulator import Simulator
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet():
+    logging.getLogger("tvDatafeed").setLevel(logging.ERROR)
+
+
+@pytest.fixture(scope="session")
+def simulator():
+    # no live updates or heartbeats, they would only add noise
+    with Simulator(bars=20000, update_interval=None, heartbeat_interval=None) as sim:
+        ws_url = TvDatafeed.ws_url
+        TvDatafeed.ws_url = sim.url
+        yield sim
+        TvDatafeed.ws_url = ws_url
+
+
+class _SearchHandler(http.server.BaseHTTPRequestHandler):
+    # answers every search with 50 results, the matched text marked with
+    # <em> tags like hl=1 does, over keep-alive connections
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        text = query.get("text", [""])[0]
+        symbols = [
+            {
+                "symbol": f"<em>{text}</em>{i}",
+                "description": f"{text} {i} Inc",
+                "type": "stock",
+                "exchange": "NASDAQ",
+                "currency_code": "USD",
+                "provider_id": "ice",
+                "country": "US",
+            }
+            for i in range(50)
+        ]
+        body = json.dumps({"symbols_remaining": 0, "symbols": symbols}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SearchServer(http.server.ThreadingHTTPServer):
+    # the default backlog of 5 drops connections of concurrent searches,
+    # which then wait a second to retry
+    request_queue_size = 128
+    daemon_threads = True
+
+
+@pytest.fixture(scope="session")
+def search_server():
+    server = _SearchServer(("localhost", 0), _SearchHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}/search?text={{}}&exchange={{}}"
+    server.shutdown()
+    thread.join()
+
+
+@pytest.fixture
+def tv(simulator, search_server):
+    feed = TvDatafeed()
+    feed.search_url = search_server
+    yield feed
+    feed.close()
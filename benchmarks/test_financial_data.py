@@ -0,0 +1,45 @@
+"""get_financial_data end to end and the flattening of its payload"""
+
+from tvDatafeed import TvDatafeed
+from tvDatafeed.main import fields
+
+
+def frame(func, params):
+    return TvDatafeed.prepend_header(TvDatafeed.construct_message(func, params))
+
+
+def financial_payload(n_fields=400):
+    # the frames of a quote session without a field list: the values come
+    # in several qsd messages, one per line like the notebooks read them
+    values = {f"field_{i}": i * 1.5 for i in range(n_fields)}
+    chunks = [dict(list(values.items())[i : i + 50]) for i in range(0, n_fields, 50)]
+    lines = [
+        frame("qsd", ["qs_benchmark", {"n": "NASDAQ:AAPL", "s": "ok", "v": chunk}])
+        for chunk in chunks
+    ]
+    lines.append(frame("quote_completed", ["qs_benchmark", "NASDAQ:AAPL"]))
+    return "\n".join(lines)
+
+
+def test_flatten_financial_data(benchmark, tv):
+    benchmark.group = "get_financial_data"
+    raw_data = financial_payload()
+
+    def flatten():
+        return tv.flatten_list_of_dicts(tv.raw_data_to_json_section(raw_data))
+
+    flattened = benchmark(flatten)
+    assert sum(len(values) for values in flattened) == 400
+
+
+def test_get_financial_data(benchmark, tv):
+    benchmark.group = "get_financial_data"
+    data = benchmark(tv.get_financial_data, "AAPL", "NASDAQ")
+    assert data["lp"]
+
+
+def test_get_financial_data_many(benchmark, tv):
+    benchmark.group = "get_financial_data"
+    symbols = [f"SYM{i}" for i in range(250)]
+    data = benchmark(tv.get_financial_data_many, symbols, "NASDAQ", fields[:10])
+    assert data.shape[1] == 250
@@ -0,0 +1,31 @@
+"""End-to-end get_hist latency against the Simulator
+
+A new connection per request as by default, and over one persistent
+connection.
+"""
+
+import pytest
+
+from tvDatafeed import Interval, TvDatafeed
+
+
+@pytest.mark.parametrize("n_bars", [10, 1000, 5000])
+def test_get_hist(benchmark, tv, n_bars):
+    benchmark.group = "get_hist"
+    data = benchmark(tv.get_hist, "AAPL", "NASDAQ", Interval.in_1_minute, n_bars)
+    assert len(data) == n_bars
+
+
+@pytest.mark.parametrize("n_bars", [10, 1000, 5000])
+def test_get_hist_persistent(benchmark, simulator, n_bars):
+    benchmark.group = "get_hist persistent"
+    with TvDatafeed(persistent=True) as tv:
+        data = benchmark(tv.get_hist, "AAPL", "NASDAQ", Interval.in_1_minute, n_bars)
+    assert len(data) == n_bars
+
+
+def test_get_hist_many(benchmark, tv):
+    benchmark.group = "get_hist_many"
+    symbols = [f"SYM{i}" for i in range(100)]
+    data = benchmark(tv.get_hist_many, symbols, "NASDAQ", Interval.in_1_hour, 100)
+    assert all(len(bars) == 100 for bars in data.values())
@@ -0,0 +1,66 @@
+"""TvDatafeedLive refresh time for one interval expiry
+
+Times the retrieval of the bar closed at an interval expiry for every
+Seis of the interval, the work the live loop hands to its workers, both
+per Seis and batched as for batch consumers.
+"""
+
+import concurrent.futures
+
+import pytest
+
+from tvDatafeed import Interval, Seis, TvDatafeedLive
+from tvDatafeed.datafeed import BATCH_SIZE
+
+
+@pytest.fixture(scope="module")
+def live(simulator):
+    tvl = TvDatafeedLive()
+    with concurrent.futures.ThreadPoolExecutor(tvl._workers) as executor:
+        yield tvl, executor
+    for feed in tvl._worker_feeds:
+        feed.close()
+
+
+def seises(tvl, n):
+    result = [Seis(f"SYM{i}", "NASDAQ", Interval.in_1_minute) for i in range(n)]
+    for seis in result:
+        seis.tvdatafeed = tvl
+    return result
+
+
+def reset(seises):
+    # forget the last bar so every round retrieves a new one
+    for seis in seises:
+        seis._updated = None
+
+
+@pytest.mark.parametrize("n_seises", [10, 100, 1000])
+def test_refresh(benchmark, live, n_seises):
+    benchmark.group = "live refresh per Seis"
+    tvl, executor = live
+    group = seises(tvl, n_seises)
+
+    def refresh():
+        futures = [executor.submit(tvl._refresh, seis, None) for seis in group]
+        concurrent.futures.wait(futures)
+
+    benchmark.pedantic(refresh, setup=lambda: reset(group), rounds=5, warmup_rounds=1)
+    assert all(seis._updated is not None for seis in group)
+
+
+@pytest.mark.parametrize("n_seises", [10, 100, 1000])
+def test_refresh_batched(benchmark, live, n_seises):
+    benchmark.group = "live refresh batched"
+    tvl, executor = live
+    group = seises(tvl, n_seises)
+    chunks = [group[i : i + BATCH_SIZE] for i in range(0, len(group), BATCH_SIZE)]
+
+    def refresh():
+        futures = [executor.submit(tvl._refresh_many, chunk, None) for chunk in chunks]
+        return sum(len(future.result()) for future in futures)
+
+    closed = benchmark.pedantic(
+        refresh, setup=lambda: reset(group), rounds=5, warmup_rounds=1
+    )
+    assert closed == n_seises
@@ -0,0 +1,49 @@
+"""Parse throughput of the websocket payloads"""
+
+import json
+
+import pytest
+
+from bench_create_hist_df import synthetic_payload
+from tvDatafeed import TvDatafeed
+
+
+@pytest.mark.parametrize("n_bars", [1000, 5000])
+def test_create_hist_df(benchmark, n_bars):
+    benchmark.group = "create_hist_df"
+    raw_data = synthetic_payload(n_bars)
+    data = benchmark(TvDatafeed.create_hist_df, raw_data, "BENCH:SYM")
+    assert len(data) == n_bars
+
+
+def frame(func, params):
+    return TvDatafeed.prepend_header(TvDatafeed.construct_message(func, params))
+
+
+def quote_message(n_symbols):
+    # one websocket message of qsd frames, as a quote session receives
+    return (
+        "".join(
+            frame(
+                "qsd",
+                [
+                    "qs_benchmark",
+                    {
+                        "n": f"NASDAQ:SYM{i}",
+                        "s": "ok",
+                        "v": {"lp": 100.0 + i, "ch": 0.5, "volume": 1000 * i},
+                    },
+                ],
+            )
+            for i in range(n_symbols)
+        )
+        + "~m~4~m~~h~1"
+    )
+
+
+@pytest.mark.parametrize("n_frames", [10, 1000])
+def test_parse_m_format(benchmark, n_frames):
+    benchmark.group = "parse_m_format"
+    message = quote_message(n_frames)
+    result = benchmark(TvDatafeed.parse_m_format, message)
+    assert len(result) == n_frames
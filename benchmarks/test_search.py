@@ -0,0 +1,23 @@
+"""search_symbol throughput against a local search server"""
+
+
+def test_search_symbol(benchmark, tv):
+    benchmark.group = "search_symbol"
+    result = benchmark(tv.search_symbol, "AAPL", cache=False)
+    assert len(result["symbols"]) == 50
+
+
+def test_search_symbol_cached(benchmark, tv):
+    benchmark.group = "search_symbol"
+    tv.search_symbol("AAPL")
+    result = benchmark(tv.search_symbol, "AAPL")
+    assert len(result["symbols"]) == 50
+
+
+def test_search_symbols(benchmark, tv):
+    benchmark.group = "search_symbol"
+    texts = [f"SYM{i}" for i in range(100)]
+    results = benchmark.pedantic(
+        tv.search_symbols, (texts,), setup=tv._search_cache.clear, rounds=10
+    )
+    assert len(results) == 100
@@ -23,8 +23,17 @@ setup(
     long_description=long_description,
     install_requires=[
         "setuptools",
+        "numpy",
         "pandas",
+        "python-dateutil",
         "websocket-client",
         "requests"
     ],
+    extras_require={
+        "async": ["websockets>=14"],
+        "cache": ["pyarrow"],
+        "arrow": ["pyarrow"],
+        "simulator": ["websockets>=14"],
+        "otel": ["opentelemetry-api"],
+    },
 )
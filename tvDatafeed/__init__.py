@@ -1,6 +1,12 @@
 from .main import TvDatafeed, Interval
 from .seis import Seis
 from .datafeed import TvDatafeedLive
-from .consumer import Consumer
+from .consumer import Consumer, BatchConsumer
+from .dispatcher import Dispatcher, AsyncDispatcher
+from .async_datafeed import AsyncTvDatafeed
+from .cache import BarCache
+from .store import BarStore
+from .quotes import QuoteStream
+from .aggregate import BarAggregator, BarAggregatorGroup
 
 __version__ = "2.1.0"
@@ -0,0 +1,323 @@
+import datetime
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from .main import TvDatafeed, bar_dtype
+from .store import to_epoch
+
+logger = logging.getLogger(__name__)
+
+_units = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_timeframe(timeframe):
+    """length of a timeframe in seconds
+
+    Args:
+        timeframe (int, timedelta or str): seconds, a timedelta or a string like "90s", "2m", "90m", "4h" or "1d"
+
+    Returns:
+        int
+    """
+    if isinstance(timeframe, datetime.timedelta):
+        seconds = timeframe.total_seconds()
+    elif isinstance(timeframe, str):
+        match = re.fullmatch(r"(\d+)\s*([smhd])", timeframe.strip().lower())
+        if match is None:
+            raise ValueError(f"unknown timeframe {timeframe!r}")
+        seconds = int(match.group(1)) * _units[match.group(2)]
+    else:
+        seconds = timeframe
+
+    if seconds <= 0 or seconds != int(seconds):
+        raise ValueError(f"timeframe must be a whole no of seconds, got {timeframe!r}")
+    return int(seconds)
+
+
+class BarAggregator:
+    """builds OHLCV bars of any timeframe from ticks or shorter bars
+
+    Every update is folded into the forming bar in O(1). Once an update of
+    a later bar arrives, or close_until is called past its end, the bar is
+    closed and written to a ring buffer of the last capacity bars, records
+    of bar_dtype (time in epoch seconds of the bar open, then ohlcv).
+    Bars are aligned to multiples of the timeframe since the epoch plus
+    offset, and no bars are produced for periods without updates.
+
+    Args:
+        timeframe (int, timedelta or str): bar length, see parse_timeframe
+        capacity (int, optional): no of closed bars kept. Defaults to 1024.
+        offset (int, optional): seconds to shift the bar boundaries by, e.g. 30 * 60 to align hourly bars to a 09:30 open. Defaults to 0.
+        on_bar (callable, optional): called with each closed bar record. Defaults to None.
+    """
+
+    def __init__(self, timeframe, capacity=1024, offset=0, on_bar=None):
+        self.timeframe = parse_timeframe(timeframe)
+        self.capacity = capacity
+        self.offset = offset
+        self.on_bar = on_bar
+
+        self._bars = np.zeros(capacity, dtype=bar_dtype)
+        self._next = 0  # ring buffer slot of the next closed bar
+        self._count = 0
+
+        # forming bar, start is None until the first update
+        self._start = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._volume = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def bar_start(self, timestamp):
+        """open time of the bar a timestamp falls in, epoch seconds"""
+        timestamp = int(timestamp) - self.offset
+        return timestamp - timestamp % self.timeframe + self.offset
+
+    def add_tick(self, timestamp, price, volume=0.0):
+        """fold a trade into the bars
+
+        Args:
+            timestamp (float): epoch seconds of the trade
+            price (float): trade price
+            volume (float, optional): traded volume. Defaults to 0.0.
+        """
+        self.add_bar(timestamp, price, price, price, price, volume)
+
+    def add_bar(self, timestamp, open, high, low, close, volume=0.0):
+        """fold a shorter bar, e.g. a 1 minute bar, into the bars
+
+        Args:
+            timestamp (float): epoch seconds of the bar open
+            open, high, low, close (float): bar prices
+            volume (float, optional): bar volume. Defaults to 0.0.
+        """
+        start = self.bar_start(timestamp)
+        if self._start is not None and start != self._start:
+            if start < self._start:
+                logger.debug(f"ignoring late update for {timestamp}")
+                return
+            self._close_bar()
+
+        if self._start is None:
+            self._start = start
+            self._open, self._high, self._low = open, high, low
+            self._volume = 0.0
+        else:
+            if high > self._high:
+                self._high = high
+            if low < self._low:
+                self._low = low
+        self._close = close
+        self._volume += volume
+
+    def close_until(self, timestamp):
+        """close the forming bar if it ends at or before a timestamp, so a
+        bar is produced even when no later update arrives
+
+        Returns:
+            bool: True if a bar was closed
+        """
+        if self._start is None or self._start + self.timeframe > timestamp:
+            return False
+        self._close_bar()
+        return True
+
+    def _close_bar(self):
+        slot = self._next
+        self._bars[slot] = (
+            self._start,
+            self._open,
+            self._high,
+            self._low,
+            self._close,
+            self._volume,
+        )
+        self._next = (slot + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self._start = None
+
+        if self.on_bar is not None:
+            self.on_bar(self._bars[slot].copy())
+
+    def current(self):
+        """the forming bar as a record of bar_dtype, None if there is none"""
+        if self._start is None:
+            return None
+        return np.array(
+            (
+                self._start,
+                self._open,
+                self._high,
+                self._low,
+                self._close,
+                self._volume,
+            ),
+            dtype=bar_dtype,
+        )[()]
+
+    def bars(self, n=None):
+        """the last n closed bars, oldest first
+
+        Args:
+            n (int, optional): no of bars. Defaults to all kept.
+
+        Returns:
+            np.ndarray: records of bar_dtype
+        """
+        n = self._count if n is None else min(n, self._count)
+        return self._bars[(self._next - n + np.arange(n)) % self.capacity]
+
+    def to_frame(self, symbol, n=None, partial=False):
+        """the last n closed bars as a dataframe like get_hist returns
+
+        Args:
+            symbol (str): value of the symbol column
+            n (int, optional): no of bars. Defaults to all kept.
+            partial (bool, optional): append the forming bar. Defaults to False.
+        """
+        bars = self.bars(n)
+        if partial and self._start is not None:
+            bars = np.append(bars, self.current())
+        columns = np.vstack(
+            [bars[name].astype(np.float64) for name in bars.dtype.names]
+        )
+        return TvDatafeed._columns_to_output(columns, symbol, "pandas")
+
+
+class BarAggregatorGroup:
+    """bar aggregators for many symbols and timeframes
+
+    Routes ticks and bars per symbol to one BarAggregator per timeframe.
+    The methods are thread safe, so updates can come from a QuoteStream or
+    live feed thread while other threads read the bars.
+
+    Args:
+        timeframes (list): bar lengths, see parse_timeframe
+        capacity (int, optional): no of closed bars kept per symbol and timeframe. Defaults to 1024.
+        offset (int, optional): seconds to shift the bar boundaries by. Defaults to 0.
+        on_bar (callable, optional): called with symbol, timeframe in seconds and each closed bar record. Defaults to None.
+    """
+
+    def __init__(self, timeframes, capacity=1024, offset=0, on_bar=None):
+        self.timeframes = [parse_timeframe(timeframe) for timeframe in timeframes]
+        self.capacity = capacity
+        self.offset = offset
+        self.on_bar = on_bar
+
+        self._aggregators = {}  # symbol to list of BarAggregator
+        self._volumes = {}  # symbol to last cumulative volume of its quotes
+        self._lock = threading.RLock()
+
+    def aggregators(self, symbol):
+        """the BarAggregator of every timeframe for a symbol, created on first use"""
+        with self._lock:
+            if (aggregators := self._aggregators.get(symbol)) is None:
+                aggregators = self._aggregators[symbol] = [
+                    BarAggregator(
+                        timeframe,
+                        self.capacity,
+                        self.offset,
+                        self._bar_callback(symbol, timeframe),
+                    )
+                    for timeframe in self.timeframes
+                ]
+            return aggregators
+
+    def _bar_callback(self, symbol, timeframe):
+        if self.on_bar is None:
+            return None
+        return lambda bar: self.on_bar(symbol, timeframe, bar)
+
+    def aggregator(self, symbol, timeframe):
+        """the BarAggregator of a symbol and timeframe"""
+        index = self.timeframes.index(parse_timeframe(timeframe))
+        return self.aggregators(symbol)[index]
+
+    def symbols(self):
+        with self._lock:
+            return list(self._aggregators)
+
+    def add_tick(self, symbol, timestamp, price, volume=0.0):
+        """fold a trade of symbol into its bars, see BarAggregator.add_tick"""
+        with self._lock:
+            for aggregator in self.aggregators(symbol):
+                aggregator.add_tick(timestamp, price, volume)
+
+    def add_bar(self, symbol, timestamp, open, high, low, close, volume=0.0):
+        """fold a shorter bar of symbol into its bars, see BarAggregator.add_bar"""
+        with self._lock:
+            for aggregator in self.aggregators(symbol):
+                aggregator.add_bar(timestamp, open, high, low, close, volume)
+
+    def add_frame(self, data):
+        """fold the bars of a dataframe as returned by get_hist or passed to
+        a Seis consumer into the bars"""
+        if data is None or data.empty:
+            return
+        epoch = to_epoch(data.index)
+        symbols = data["symbol"].to_numpy()
+        values = data[["open", "high", "low", "close", "volume"]].to_numpy(np.float64)
+        with self._lock:
+            for i in range(len(epoch)):
+                self.add_bar(symbols[i], epoch[i], *values[i])
+
+    def close_until(self, timestamp=None):
+        """close the forming bars which end at or before timestamp, e.g.
+        from a timer so bars of quiet symbols are produced on time
+
+        Args:
+            timestamp (float, optional): epoch seconds. Defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for aggregators in self._aggregators.values():
+                for aggregator in aggregators:
+                    aggregator.close_until(timestamp)
+
+    def on_quote(self, symbol, changes):
+        """QuoteStream.on_change callback folding the last price updates in
+
+        Trades are taken from the lp (last price) field at lp_time, the
+        volume traded is the increase of the cumulative volume field.
+        """
+        if (price := changes.get("lp")) is None:
+            return
+        timestamp = changes.get("lp_time") or time.time()
+
+        with self._lock:
+            volume = 0.0
+            if (cumulative := changes.get("volume")) is not None:
+                last = self._volumes.get(symbol)
+                # the cumulative volume restarts with every session
+                volume = (
+                    cumulative - last
+                    if last is not None and cumulative >= last
+                    else 0.0
+                )
+                self._volumes[symbol] = cumulative
+            self.add_tick(symbol, timestamp, price, volume)
+
+    def on_seis_bar(self, seis, data):
+        """Seis consumer callback folding the bars of a live feed in, e.g.
+        seis.new_consumer(group.on_seis_bar) for a 1 minute Seis"""
+        self.add_frame(data)
+
+    def bars(self, symbol, timeframe, n=None):
+        """the last n closed bars of symbol and timeframe, see BarAggregator.bars"""
+        with self._lock:
+            return self.aggregator(symbol, timeframe).bars(n)
+
+    def current(self, symbol, timeframe):
+        """the forming bar of symbol and timeframe, see BarAggregator.current"""
+        with self._lock:
+            return self.aggregator(symbol, timeframe).current()
+
+    def to_frame(self, symbol, timeframe, n=None, partial=False):
+        """the bars of symbol and timeframe as a dataframe, see BarAggregator.to_frame"""
+        with self._lock:
+            return self.aggregator(symbol, timeframe).to_frame(symbol, n, partial)
@@ -0,0 +1,496 @@
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+
+import pandas as pd
+
+from .main import (
+    TvDatafeed,
+    Interval,
+    fields,
+    output_formats,
+    set_auth_token_msg,
+    chart_create_session_msg,
+    quote_create_session_msg,
+    quote_set_fields_msg,
+    quote_add_symbols_msg,
+    quote_remove_symbols_msg,
+    resolve_symbol_msg,
+    create_series_msg,
+    remove_series_msg,
+    symbol_resolved,
+    symbol_error,
+    series_error,
+    series_completed,
+    timescale_update,
+)
+
+try:
+    import websockets
+except ImportError:  # optional dependency, see extras_require in setup.py
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    # One websocket with its own chart and quote session. A reader task
+    # decodes every incoming frame and routes it to the queue of the
+    # request that owns the series, symbol or quote session id in it, so
+    # any number of requests can share the socket at the same time.
+
+    def __init__(self, feed):
+        self._feed = feed
+        self._lock = asyncio.Lock()
+        self._waiters = {}
+        self._request_id = 0
+        self._reader = None
+        self.ws = None
+        self.chart_session = None
+        self.session = None
+
+    def __len__(self):
+        # number of requests currently using this connection
+        return len(set(map(id, self._waiters.values())))
+
+    async def open(self):
+        async with self._lock:
+            if self.ws is not None:
+                return
+
+            logger.debug("creating websocket connection")
+            self.ws = await websockets.connect(
+                self._feed.ws_url,
+                additional_headers=self._feed.ws_headers,
+                open_timeout=self._feed.timeout,
+                max_size=None,
+            )
+            self.chart_session = TvDatafeed.generate_chart_session()
+            self.session = TvDatafeed.generate_session()
+
+            await self.send(set_auth_token_msg, [self._feed.token])
+            await self.send(chart_create_session_msg, [self.chart_session, ""])
+            await self.send(quote_create_session_msg, [self.session])
+            await self.send(quote_set_fields_msg, [self.session] + fields)
+
+            self._reader = asyncio.create_task(self._read(self.ws))
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+
+    async def send(self, func, args):
+        await self.ws.send(
+            TvDatafeed.prepend_header(TvDatafeed.construct_message(func, args))
+        )
+
+    def next_ids(self):
+        self._request_id += 1
+        return f"symbol_{self._request_id}", f"s{self._request_id}"
+
+    @contextlib.contextmanager
+    def subscribe(self, *keys):
+        # route frames carrying any of the keys into one queue
+        queue = asyncio.Queue()
+        for key in keys:
+            self._waiters[key] = queue
+        try:
+            yield queue
+        finally:
+            for key in keys:
+                self._waiters.pop(key, None)
+
+    async def _read(self, ws):
+        try:
+            async for message in ws:
+                for payload in TvDatafeed.iter_frames(message):
+                    if payload.startswith("~h~"):
+                        await ws.send(TvDatafeed.prepend_header(payload))
+                        continue
+
+                    try:
+                        self._dispatch(json.loads(payload))
+                    except json.JSONDecodeError:
+                        logger.error(f"error processing segment: {payload}")
+        except websockets.ConnectionClosed as e:
+            logger.warning(f"websocket connection lost: {e}")
+        finally:
+            if self.ws is ws:
+                self.ws = None
+            # wake up everyone waiting on this socket
+            for queue in set(self._waiters.values()):
+                queue.put_nowait(ConnectionError("websocket connection lost"))
+
+    def _dispatch(self, json_entry):
+        params = json_entry.get("p", [])
+        if not params:
+            return
+
+        if params[0] != self.chart_session:  # quote session messages
+            keys = params[0:1]
+        elif len(params) > 1 and isinstance(params[1], dict):  # series updates
+            keys = params[1].keys()
+        else:  # symbol and series messages
+            keys = params[1:2]
+
+        for key in keys:
+            if (queue := self._waiters.get(key)) is not None:
+                queue.put_nowait(json_entry)
+
+
+class AsyncTvDatafeed:
+    """asyncio client for TradingView data
+
+    Requests are spread over a pool of websocket connections and can run
+    concurrently; frames are routed back to the awaiting request by their
+    series, symbol or quote session id.
+
+    Args:
+        username (str, optional): tradingview username. Defaults to None.
+        password (str, optional): tradingview password. Defaults to None.
+        connections (int, optional): no of websocket connections in the pool. Defaults to 4.
+        max_concurrency (int, optional): max no of requests in flight at the same time. Defaults to 32.
+        timeout (float, optional): default per-request timeout in seconds. Defaults to 30.
+        ws_url (str, optional): websocket url, e.g. a local test server. Defaults to TradingView.
+    """
+
+    ws_headers = {"Origin": "https://data.tradingview.com"}
+
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        connections: int = 4,
+        max_concurrency: int = 32,
+        timeout: float = 30,
+        ws_url: str = TvDatafeed.ws_url,
+    ) -> None:
+        if websockets is None:
+            raise ImportError(
+                "AsyncTvDatafeed requires websockets, install with pip install tvdatafeed[async]"
+            )
+
+        # the sync client is only used for sign in, symbol search and parsing
+        self._tv = TvDatafeed(username, password)
+        self.token = self._tv.token
+        self.ws_url = ws_url
+        self.timeout = timeout
+
+        self._pool = [_Connection(self) for _ in range(connections)]
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """close all the websocket connections in the pool"""
+        await asyncio.gather(*(connection.close() for connection in self._pool))
+
+    async def _request(self, func, *args, timeout=None):
+        # run a request on the least busy connection, retrying once on a
+        # new socket if the connection is lost while waiting
+        async with self._semaphore:
+            for attempt in range(2):
+                connection = min(self._pool, key=len)
+                try:
+                    await connection.open()
+                    return await asyncio.wait_for(
+                        func(connection, *args), timeout or self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise
+                except (ConnectionError, OSError, websockets.ConnectionClosed) as e:
+                    logger.warning(f"websocket connection lost: {e}")
+                    await connection.close()
+
+            logger.error("failed to re-establish websocket connection")
+            return None
+
+    @staticmethod
+    async def _next(queue):
+        json_entry = await queue.get()
+        if isinstance(json_entry, Exception):
+            raise json_entry
+        return json_entry
+
+    async def get_hist(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 10,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        timeout: float = None,
+        output: str = "pandas",
+    ) -> pd.DataFrame:
+        """get historical data
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            interval (str, optional): chart interval. Defaults to 'D'.
+            n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            timeout (float, optional): seconds to wait before raising asyncio.TimeoutError. Defaults to the client timeout.
+            output (str, optional): "pandas", "numpy" or "arrow", see TvDatafeed.get_hist. Defaults to "pandas".
+
+        Returns:
+            pd.Dataframe: dataframe with sohlcv as columns, or the bars in the requested output format
+        """
+        if output not in output_formats:
+            raise ValueError(
+                f'unknown output {output!r}, use "pandas", "numpy" or "arrow"'
+            )
+
+        symbol = TvDatafeed.format_symbol(
+            symbol=symbol, exchange=exchange, contract=fut_contract
+        )
+        logger.debug(f"getting data for {symbol}...")
+
+        bars = await self._request(
+            self._fetch_hist,
+            symbol,
+            interval.value,
+            n_bars,
+            extended_session,
+            timeout=timeout,
+        )
+
+        return TvDatafeed.bars_to_output(bars, symbol, output)
+
+    async def _fetch_hist(self, connection, symbol, interval, n_bars, extended_session):
+        symbol_id, series_id = connection.next_ids()
+        bars = []
+
+        with connection.subscribe(symbol_id, series_id) as queue:
+            await connection.send(
+                resolve_symbol_msg,
+                [
+                    connection.chart_session,
+                    symbol_id,
+                    TvDatafeed.symbol_spec(symbol, extended_session),
+                ],
+            )
+            await connection.send(
+                create_series_msg,
+                [
+                    connection.chart_session,
+                    series_id,
+                    series_id,
+                    symbol_id,
+                    interval,
+                    n_bars,
+                ],
+            )
+
+            try:
+                while True:
+                    json_entry = await self._next(queue)
+                    message = json_entry["m"]
+
+                    if message == timescale_update:
+                        bars.extend(json_entry["p"][1][series_id].get("s", []))
+                    elif message == series_completed:
+                        break
+                    elif message in (symbol_error, series_error):
+                        logger.error(f"{message} for {symbol}: {json_entry['p'][2:]}")
+                        break
+            finally:
+                if connection.ws is not None:
+                    await connection.send(
+                        remove_series_msg, [connection.chart_session, series_id]
+                    )
+
+        return bars
+
+    async def get_symbol_data(
+        self,
+        symbol: str,
+        exchange: str,
+        timeout: float = None,
+    ) -> dict:
+        """get symbol data
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            timeout (float, optional): seconds to wait before raising asyncio.TimeoutError. Defaults to the client timeout.
+
+        Returns:
+            dict
+        """
+        symbol = TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+
+        return await self._request(self._fetch_symbol_data, symbol, timeout=timeout)
+
+    async def _fetch_symbol_data(self, connection, symbol):
+        symbol_id, _ = connection.next_ids()
+
+        with connection.subscribe(symbol_id) as queue:
+            await connection.send(
+                resolve_symbol_msg,
+                [connection.chart_session, symbol_id, TvDatafeed.symbol_spec(symbol)],
+            )
+
+            json_entry = await self._next(queue)
+
+        if json_entry["m"] != symbol_resolved:
+            logger.error(f"{json_entry['m']} for {symbol}: {json_entry['p'][2:]}")
+            return None
+
+        return json_entry["p"][2]
+
+    async def get_financial_data(
+        self,
+        symbol: str,
+        exchange: str,
+        timeout: float = None,
+    ) -> dict:
+        """get financial ratios
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            timeout (float, optional): seconds to wait before raising asyncio.TimeoutError. Defaults to the client timeout.
+
+        Returns:
+            dict
+        """
+        symbol = TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+
+        return await self._request(self._fetch_financial_data, symbol, timeout=timeout)
+
+    async def _fetch_financial_data(self, connection, symbol):
+        # a dedicated quote session without a field list, so the server
+        # sends every field rather than the overview subset
+        session = TvDatafeed.generate_session()
+        data = {}
+
+        with connection.subscribe(session) as queue:
+            await connection.send(quote_create_session_msg, [session])
+            await connection.send(quote_add_symbols_msg, [session, symbol])
+
+            try:
+                while True:
+                    json_entry = await self._next(queue)
+                    if json_entry["m"] == "quote_completed":
+                        break
+                    if json_entry["m"] == "qsd":
+                        data.update(json_entry["p"][1].get("v", {}))
+            finally:
+                if connection.ws is not None:
+                    await connection.send("quote_delete_session", [session])
+
+        return data
+
+    async def get_financial_data_many(
+        self,
+        symbols: list,
+        exchange: str = "",
+        fields: list = None,
+        chunk_size: int = 100,
+        timeout: float = None,
+    ) -> pd.DataFrame:
+        """get financial ratios for many symbols over one quote session, see
+        TvDatafeed.get_financial_data_many
+
+        Args:
+            symbols (list): symbol names
+            exchange (str, optional): exchange, not required if symbols are in format EXCHANGE:SYMBOL. Defaults to "".
+            fields (list, optional): only request these fields. Defaults to all fields.
+            chunk_size (int, optional): max no of symbols on the session at the same time. Defaults to 100.
+            timeout (float, optional): seconds to wait for all symbols before raising asyncio.TimeoutError. Defaults to the client timeout.
+
+        Returns:
+            pd.DataFrame: fields as rows and EXCHANGE:SYMBOL as columns
+        """
+        symbols = list(
+            dict.fromkeys(
+                TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+                for symbol in symbols
+            )
+        )
+
+        data = await self._request(
+            self._fetch_financial_data_many,
+            symbols,
+            fields,
+            chunk_size,
+            timeout=timeout,
+        )
+
+        return TvDatafeed.financial_data_to_df(data or {}, symbols)
+
+    async def _fetch_financial_data_many(self, connection, symbols, fields, chunk_size):
+        session = TvDatafeed.generate_session()
+        pending = collections.deque(symbols)
+        in_flight = set()
+        data = {}
+
+        async def submit():
+            added = []
+            while pending and len(in_flight) < chunk_size:
+                added.append(pending.popleft())
+                in_flight.add(added[-1])
+            if added:
+                await connection.send(quote_add_symbols_msg, [session] + added)
+
+        with connection.subscribe(session) as queue:
+            await connection.send(quote_create_session_msg, [session])
+            if fields:
+                await connection.send(quote_set_fields_msg, [session] + list(fields))
+            await submit()
+
+            try:
+                while in_flight:
+                    json_entry = await self._next(queue)
+                    if json_entry["m"] == "qsd":
+                        quote = json_entry["p"][1]
+                        symbol = quote.get("n")
+                        if symbol not in in_flight:
+                            continue
+                        if quote.get("s") != "error":
+                            # merge the field updates as they arrive
+                            data.setdefault(symbol, {}).update(quote.get("v", {}))
+                            continue
+                        logger.error(
+                            f"no financial data for {symbol}: {quote.get('errmsg')}"
+                        )
+                    elif json_entry["m"] == "quote_completed":
+                        symbol = json_entry["p"][1]
+                        if symbol not in in_flight:
+                            continue
+                    else:
+                        continue
+
+                    in_flight.discard(symbol)
+                    await connection.send(quote_remove_symbols_msg, [session, symbol])
+                    await submit()
+            finally:
+                if connection.ws is not None:
+                    await connection.send("quote_delete_session", [session])
+
+        return data
+
+    async def search_symbol(self, text: str, exchange: str = ""):
+        """search for symbols, see TvDatafeed.search_symbol
+
+        The HTTP request runs in the default executor so it does not block
+        the event loop.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, self._tv.search_symbol, text, exchange
+            )
@@ -0,0 +1,458 @@
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import time
+
+from .main import Interval, TvDatafeed
+from .ratelimit import Priority, RateLimits
+from .store import BarStore
+
+logger = logging.getLogger(__name__)
+
+formats = ("store", "parquet")
+
+# fields of a job which identify it in the checkpoint
+_job_fields = ("symbol", "interval", "start", "end", "n_bars", "extended_session")
+
+
+def symbols_from(symbols, exchange=""):
+    """EXCHANGE:SYMBOL names of a symbol list
+
+    Args:
+        symbols (list or dict): symbol names, symbol_search result dicts or a whole search_symbol result
+        exchange (str, optional): exchange of names not in format EXCHANGE:SYMBOL. Defaults to "".
+
+    Returns:
+        list: unique names in the order given
+    """
+    if isinstance(symbols, dict):
+        symbols = symbols.get("symbols", [])
+
+    names = []
+    for item in symbols:
+        if isinstance(item, dict):
+            names.append(TvDatafeed.format_symbol(item["symbol"], item["exchange"]))
+        else:
+            names.append(TvDatafeed.format_symbol(item, exchange))
+    return list(dict.fromkeys(names))
+
+
+class RateLimit:
+    """spaces requests at least 1 / rate seconds apart across processes
+
+    The time of the next free slot is kept in shared memory, so one
+    instance passed to worker processes limits them all together.
+
+    Args:
+        rate (float): max no of requests per second
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = multiprocessing.Value("d", 0.0)  # monotonic time of next slot
+
+    def wait(self, cost=1):
+        """block until a request of cost slots may be sent"""
+        with self._next.get_lock():
+            now = time.monotonic()
+            slot = max(now, self._next.value)
+            self._next.value = slot + self.interval * cost
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """completed backfill jobs in an append only JSON lines file
+
+    One line is written and flushed to disk per job, so after a crash the
+    file holds every job finished before it. A line torn by the crash is
+    ignored.
+
+    Args:
+        path (str): checkpoint file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._done = {}
+
+        torn = False
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.debug(f"ignoring torn checkpoint line {line!r}")
+                        continue
+                    self._done[self.key(entry)] = entry
+
+        self._file = open(path, "a")
+        if torn:
+            self._file.write("\n")
+
+    @staticmethod
+    def key(job):
+        return tuple(job[field] for field in _job_fields)
+
+    def __contains__(self, job):
+        return self.key(job) in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def add(self, job, bars):
+        """record a job as completed with the no of bars it wrote"""
+        entry = dict(job, bars=bars, completed=time.time())
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._done[self.key(job)] = entry
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Backfill:
+    """download the history of many symbols and intervals with a process pool
+
+    Every (symbol, interval) pair is one job. Jobs are spread over worker
+    processes, each holding a persistent connection, and each worker pages
+    through the history with iter_hist and writes the bars to disk itself,
+    holding one page in memory at a time: to a BarStore, or to one parquet
+    file per symbol and interval (DIRECTORY/SYMBOL/INTERVAL.parquet). The
+    requests of all workers share one rate limit, and each worker also
+    backs off on its own when its requests fail or time out, see
+    tvDatafeed.ratelimit. Completed jobs are recorded in a checkpoint file,
+    so running the same backfill again only does the jobs still missing.
+    Jobs which fail or return no bars are not recorded and are retried on
+    the next run.
+
+    Args:
+        directory (str): output directory, created if missing
+        symbols (list or dict): symbol names or search_symbol results, see symbols_from
+        intervals (list): chart intervals. Defaults to [Interval.in_daily].
+        start (datetime, optional): first bar to get. Defaults to None.
+        end (datetime, optional): last bar to get. Defaults to None.
+        n_bars (int, optional): no of bars per job if no start is given, all available if None. Defaults to None.
+        extended_session (bool, optional): regular session if False, extended session if True. Defaults to False.
+        exchange (str, optional): exchange of symbols not in format EXCHANGE:SYMBOL. Defaults to "".
+        format (str, optional): "store" for a BarStore or "parquet". Defaults to "store".
+        checkpoint (str, optional): checkpoint file. Defaults to checkpoint.jsonl in directory.
+        workers (int, optional): no of worker processes. Defaults to 4.
+        rate (float, optional): max no of requests per second over all workers, None for no limit. Defaults to 4.
+        tv (TvDatafeed, optional): client whose sign in the workers use. Defaults to a nologin client.
+    """
+
+    def __init__(
+        self,
+        directory,
+        symbols,
+        intervals=(Interval.in_daily,),
+        start=None,
+        end=None,
+        n_bars=None,
+        extended_session=False,
+        exchange="",
+        format="store",
+        checkpoint=None,
+        workers=4,
+        rate=4,
+        tv=None,
+    ):
+        if format not in formats:
+            raise ValueError(f'unknown format {format!r}, use "store" or "parquet"')
+        if format == "parquet":
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    'format="parquet" requires pyarrow, install with pip install tvdatafeed[arrow]'
+                ) from None
+
+        self.directory = directory
+        self.symbols = symbols_from(symbols, exchange)
+        self.intervals = list(intervals)
+        self.start = start
+        self.end = end
+        self.n_bars = n_bars
+        self.extended_session = extended_session
+        self.format = format
+        self.checkpoint = checkpoint or os.path.join(directory, "checkpoint.jsonl")
+        self.workers = workers
+        self.rate = rate
+        self.tv = tv
+        os.makedirs(directory, exist_ok=True)
+
+    def jobs(self):
+        """every job of the backfill as a dict, see Checkpoint"""
+        return [
+            {
+                "symbol": symbol,
+                "interval": interval.value,
+                "start": None if self.start is None else self.start.isoformat(),
+                "end": None if self.end is None else self.end.isoformat(),
+                "n_bars": self.n_bars,
+                "extended_session": self.extended_session,
+            }
+            for symbol in self.symbols
+            for interval in self.intervals
+        ]
+
+    def pending(self):
+        """the jobs not yet recorded as completed in the checkpoint"""
+        with Checkpoint(self.checkpoint) as checkpoint:
+            return [job for job in self.jobs() if job not in checkpoint]
+
+    def run(self):
+        """do the pending jobs
+
+        Returns:
+            dict: (EXCHANGE:SYMBOL, interval value) to no of bars written
+            for every job run, 0 if there were no bars and None if the job
+            failed
+        """
+        jobs = self.jobs()
+        pending = self.pending()
+        logger.info(f"{len(pending)} of {len(jobs)} backfill jobs to do")
+        if not pending:
+            return {}
+
+        tv = self.tv or TvDatafeed()
+        rate_limit = RateLimit(self.rate) if self.rate else None
+        executor = concurrent.futures.ProcessPoolExecutor(
+            min(self.workers, len(pending)),
+            initializer=_init_worker,
+            initargs=(tv.token, tv.ws_url, rate_limit, self.directory, self.format),
+        )
+
+        results = {}
+        try:
+            with Checkpoint(self.checkpoint) as checkpoint:
+                futures = {executor.submit(_backfill, job): job for job in pending}
+                for future in concurrent.futures.as_completed(futures):
+                    job = futures[future]
+                    key = (job["symbol"], job["interval"])
+                    try:
+                        results[key] = bars = future.result()
+                    except Exception as e:
+                        logger.error(f"backfill of {key} failed: {e!r}")
+                        results[key] = None
+                        continue
+
+                    if bars:
+                        checkpoint.add(job, bars)
+                        logger.info(
+                            f"{len(checkpoint)} of {len(jobs)} done, {bars} bars of {key}"
+                        )
+                    else:
+                        logger.warning(f"no bars for {key}, retried on the next run")
+        finally:
+            # on an interrupt only the jobs already running are waited for
+            executor.shutdown(cancel_futures=True)
+
+        return results
+
+
+# per worker process: client, store and output format
+_worker = None
+
+
+class _WorkerClient(TvDatafeed):
+    # client of a worker process, its requests also wait for the rate
+    # limit shared by all workers, so only requests really sent are charged
+
+    def __init__(self, rate_limit, **kwargs):
+        super().__init__(**kwargs)
+        self.shared_rate_limit = rate_limit
+
+    def _acquire(self, endpoint, cost=1, priority=None):
+        super()._acquire(endpoint, cost, priority)
+        if endpoint == "data" and self.shared_rate_limit is not None:
+            self.shared_rate_limit.wait(cost)
+
+
+def _init_worker(token, ws_url, rate_limit, directory, format):
+    global _worker
+    tv = _WorkerClient(
+        rate_limit, persistent=True, token=token, rate_limits=RateLimits()
+    )
+    tv.ws_url = ws_url
+    tv.priority = Priority.background
+    _worker = (tv, BarStore(directory), format)
+
+
+def _backfill(job):
+    tv, store, format = _worker
+    interval = Interval(job["interval"])
+    start, end = (
+        None if job[bound] is None else datetime.datetime.fromisoformat(job[bound])
+        for bound in ("start", "end")
+    )
+    path = store.path(job["symbol"], interval)
+
+    # pages arrive newest first but are written oldest first, BarStore only
+    # appends newer bars, so each page goes to a segment on disk as it
+    # arrives and only one page is held in memory at a time
+    segment = path + ".pages"
+    shutil.rmtree(segment, ignore_errors=True)  # left by a crashed run
+    os.makedirs(segment)
+    try:
+        pages, bars = 0, 0
+        with contextlib.closing(
+            tv.iter_hist(
+                job["symbol"],
+                "",
+                interval,
+                job["n_bars"],
+                extended_session=job["extended_session"],
+                start=start,
+                end=end,
+                output="arrow" if format == "parquet" else "pandas",
+            )
+        ) as iterator:
+            for page in iterator:
+                with open(os.path.join(segment, str(pages)), "wb") as file:
+                    pickle.dump(page, file, pickle.HIGHEST_PROTOCOL)
+                pages += 1
+                bars += len(page)
+
+        if not pages:
+            return 0
+
+        oldest_first = (
+            _load_page(os.path.join(segment, str(page)))
+            for page in reversed(range(pages))
+        )
+        if format == "parquet":
+            _write_parquet(path + ".parquet", oldest_first)
+        else:
+            for page in oldest_first:
+                store.append(page, interval, job["symbol"])
+    finally:
+        shutil.rmtree(segment, ignore_errors=True)
+
+    return bars
+
+
+def _load_page(path):
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def _write_parquet(path, pages):
+    # one row group per page, written next to it and renamed so a crash
+    # never leaves half a file
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for page in pages:
+            if writer is None:
+                writer = pq.ParquetWriter(path + ".tmp", page.schema)
+            writer.write_table(page)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tvDatafeed.backfill",
+        description="download the history of many symbols to disk, resumable",
+    )
+    parser.add_argument("directory", help="output directory")
+    parser.add_argument("--symbols", nargs="+", default=[], help="EXCHANGE:SYMBOL")
+    parser.add_argument(
+        "--symbols-file",
+        help="one symbol per line, or a search_symbol result saved as JSON",
+    )
+    parser.add_argument("--search", help="backfill every search_symbol result")
+    parser.add_argument("--exchange", default="")
+    parser.add_argument("--type", dest="search_type")
+    parser.add_argument("--country")
+    parser.add_argument(
+        "--interval",
+        nargs="+",
+        default=[Interval.in_daily.value],
+        choices=[interval.value for interval in Interval],
+    )
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--bars", type=int, dest="n_bars")
+    parser.add_argument("--extended-session", action="store_true")
+    parser.add_argument("--format", choices=formats, default="store")
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=4, help="requests per second")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    tv = TvDatafeed(args.username, args.password)
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        with open(args.symbols_file) as file:
+            text = file.read()
+        try:
+            symbols += symbols_from(json.loads(text), args.exchange)
+        except json.JSONDecodeError:
+            symbols += [line.strip() for line in text.splitlines() if line.strip()]
+    if args.search is not None:
+        symbols += symbols_from(
+            tv.search_symbol(
+                args.search,
+                args.exchange,
+                all_pages=True,
+                search_type=args.search_type,
+                country=args.country,
+            )
+            or {}
+        )
+    if not symbols:
+        parser.error("no symbols, give --symbols, --symbols-file or --search")
+
+    backfill = Backfill(
+        args.directory,
+        symbols,
+        [Interval(value) for value in args.interval],
+        start=args.start,
+        end=args.end,
+        n_bars=args.n_bars,
+        extended_session=args.extended_session,
+        exchange=args.exchange,
+        format=args.format,
+        checkpoint=args.checkpoint,
+        workers=args.workers,
+        rate=args.rate,
+        tv=tv,
+    )
+    results = backfill.run()
+    failed = sum(bars is None for bars in results.values())
+    empty = sum(bars == 0 for bars in results.values())
+    print(
+        f"{len(results) - failed - empty} jobs completed, {empty} without bars, "
+        f"{failed} failed, {len(backfill.pending())} left for the next run"
+    )
+
+
+if __name__ == "__main__":
+    main()
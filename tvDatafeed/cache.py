@@ -0,0 +1,257 @@
+import contextlib
+import datetime
+import logging
+import os
+import re
+import time
+
+import pandas as pd
+
+from .main import Interval
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# approximate length of a bar, used to estimate how many bars are missing
+_interval_seconds = {
+    Interval.in_1_minute: 60,
+    Interval.in_3_minute: 3 * 60,
+    Interval.in_5_minute: 5 * 60,
+    Interval.in_15_minute: 15 * 60,
+    Interval.in_30_minute: 30 * 60,
+    Interval.in_45_minute: 45 * 60,
+    Interval.in_1_hour: 60 * 60,
+    Interval.in_2_hour: 2 * 60 * 60,
+    Interval.in_3_hour: 3 * 60 * 60,
+    Interval.in_4_hour: 4 * 60 * 60,
+    Interval.in_daily: 24 * 60 * 60,
+    Interval.in_weekly: 7 * 24 * 60 * 60,
+    Interval.in_monthly: 31 * 24 * 60 * 60,
+}
+
+# by default cached bars are served without asking TradingView for as long
+# as a new bar cannot have been produced yet, and at most for an hour
+default_staleness = {
+    interval: datetime.timedelta(seconds=min(seconds, 60 * 60))
+    for interval, seconds in _interval_seconds.items()
+}
+
+
+class FileLock:
+    """exclusive lock on a file, shared between processes
+
+    The holder may remove the lock file on release, whoever was waiting
+    for it then locks a new file at the same path instead.
+
+    Args:
+        path (str): lock file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """take the lock, waiting for it unless blocking is False
+
+        Returns:
+            bool: True once taken, False if held by another and not blocking
+        """
+        while True:
+            self._file = open(self.path, "a+")
+            try:
+                if fcntl is not None:
+                    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                    fcntl.flock(self._file.fileno(), flags)
+                else:
+                    self._file.seek(0)
+                    mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                    msvcrt.locking(self._file.fileno(), mode, 1)
+            except OSError:
+                self._file.close()
+                self._file = None
+                if blocking:
+                    raise
+                return False
+
+            if self._is_current():
+                return True
+            # removed by the holder before we got it, see release
+            self._file.close()
+
+    def _is_current(self):
+        # the locked file is still the one at path, windows does not
+        # remove files held open
+        if fcntl is None:
+            return True
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def release(self, remove=False):
+        """release the lock, removing the lock file first if remove is True"""
+        if remove:
+            # a file held open by another process is not removed on windows
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class BarCache:
+    """on-disk cache of historical bars for TvDatafeed.get_hist
+
+    Bars are stored as one Parquet file per (symbol, interval, session,
+    adjustment). get_hist serves the cached bars and only asks TradingView
+    for the bars missing since the last cached one. The directory can be
+    shared by several processes, each file is guarded by a file lock.
+
+    Args:
+        directory (str): cache directory, created if missing
+        max_bytes (int, optional): evict least recently used files above this total size. Defaults to 1 GiB.
+        staleness (dict, optional): Interval to timedelta, how long cached bars are served without a top-up. Defaults to default_staleness.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30, staleness=None):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "BarCache requires pyarrow, install with pip install tvdatafeed[cache]"
+            ) from None
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.staleness = dict(default_staleness)
+        self.staleness.update(staleness or {})
+
+        os.makedirs(directory, exist_ok=True)
+
+    def lock(self, path):
+        """lock a cache file for the calling process"""
+        return FileLock(path + ".lock")
+
+    def path(self, symbol, interval, extended_session=False, adjustment="splits"):
+        session = "extended" if extended_session else "regular"
+        name = f"{symbol}_{interval.value}_{session}_{adjustment}"
+        return os.path.join(self.directory, re.sub(r"[^\w.!-]", "_", name) + ".parquet")
+
+    def load(self, path):
+        """read cached bars, None if there are none"""
+        if not os.path.exists(path):
+            return None
+
+        try:
+            data = pd.read_parquet(path)
+        except FileNotFoundError:  # evicted by another process
+            return None
+        except Exception as e:
+            logger.warning(f"dropping unreadable cache file {path}: {e}")
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return None
+
+        # access time drives eviction, modification time staleness
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        return data
+
+    def store(self, path, data):
+        """write bars atomically and evict old files if over max_bytes"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        data.to_parquet(tmp)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def is_stale(self, path, interval):
+        age = time.time() - os.stat(path).st_mtime
+        return age >= self.staleness[interval].total_seconds()
+
+    def missing_bars(self, data, interval):
+        """estimate of the bars produced since the last cached one"""
+        elapsed = datetime.datetime.now() - data.index[-1].to_pydatetime()
+        return int(elapsed.total_seconds() // _interval_seconds[interval]) + 2
+
+    def _remove(self, path):
+        # remove a cache file and its lock file unless another process or
+        # thread holds the lock, returns False if it does
+        lock = self.lock(path)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        finally:
+            lock.release(remove=True)
+        return True
+
+    def _remove_orphan_locks(self, locks, keep=None):
+        # lock files of cache files gone, e.g. dropped as unreadable
+        for path in locks:
+            path = path[: -len(".lock")]
+            if path != keep and not os.path.exists(path):
+                self._remove(path)
+
+    def evict(self, keep=None):
+        """remove least recently used files until the cache is within
+        max_bytes, skipping files in use and keep"""
+        files = []
+        locks = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".parquet") and entry.path != keep:
+                    stat = entry.stat()
+                    files.append((stat.st_atime, stat.st_size, entry.path))
+                elif entry.name.endswith(".parquet.lock"):
+                    locks.append(entry.path)
+
+        self._remove_orphan_locks(locks, keep)
+
+        total = sum(size for _, size, _ in files)
+        if keep is not None and os.path.exists(keep):
+            total += os.stat(keep).st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if not self._remove(path):
+                logger.debug(f"not evicting {path} from cache, in use")
+                continue
+            logger.debug(f"evicted {path} from cache")
+            total -= size
+
+    def clear(self):
+        """remove all cached bars"""
+        with os.scandir(self.directory) as entries:
+            paths = [entry.path for entry in entries]
+
+        for path in paths:
+            if path.endswith(".parquet"):
+                lock = self.lock(path)
+                lock.acquire()
+                try:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                finally:
+                    lock.release(remove=True)
+        self._remove_orphan_locks(
+            path for path in paths if path.endswith(".parquet.lock")
+        )
@@ -1,4 +1,5 @@
 import threading, queue, traceback
+from tvDatafeed.metrics import phase
 
 class Consumer(threading.Thread):
     '''
@@ -8,7 +9,7 @@ class Consumer(threading.Thread):
     which will be called when new data bar becomes available for
     that Seis. Data reception and calling callback function is 
     done in a separate thread which the user must start by calling
-    start() method.
+    start() method, or by a shared Dispatcher if one is given.
     
     Parameters
     ----------
@@ -17,6 +18,12 @@ class Consumer(threading.Thread):
     callback : func
         reference to a function to be called when new data available,
         function protoype must be func_name(seis, data)
+    dispatcher : Dispatcher or AsyncDispatcher, optional
+        calls the callback from its shared workers instead of a 
+        thread of this consumer (default None)
+    metrics : Sink, optional
+        report queue depth and callback duration to this sink,
+        see tvDatafeed.metrics (default None)
     
     Methods
     -------
@@ -29,13 +36,16 @@ class Consumer(threading.Thread):
     stop()
         Stop the data processing and callback thread
     '''
-    def __init__(self, seis, callback):
+    def __init__(self, seis, callback, dispatcher=None, metrics=None):
         super().__init__()
 
-        self._buffer=queue.Queue()               
+        self._dispatcher=dispatcher
+        self.metrics=metrics
+        self._buffer=queue.Queue() if dispatcher is None else None
         self.seis=seis
         self.callback=callback
-        self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
+        if seis is not None:
+            self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
     
     def __repr__(self):
         return f'Consumer({repr(self.seis)},{self.callback.__name__})'
@@ -51,7 +61,12 @@ class Consumer(threading.Thread):
                 break
 
             try: # in case user provided function throws an exception
-                self.callback(self.seis, data)
+                if self.metrics is None:
+                    self.call(data)
+                else:
+                    self.metrics.gauge('queue_depth', self._buffer.qsize(), consumer=self.name)
+                    with phase(self.metrics, 'callback', consumer=self.name):
+                        self.call(data)
             except Exception as e: # remove the consumer from Seis and close down gracefully
                 self.del_consumer()
                 self.seis=None # delete references
@@ -63,6 +78,10 @@ class Consumer(threading.Thread):
         self.callback=None
         self._buffer=None
     
+    def call(self, data):
+        # call the callback with data, not for direct use
+        return self.callback(self.seis, data)
+    
     def put(self, data):
         '''
         Put new data into buffer to be processed
@@ -72,7 +91,10 @@ class Consumer(threading.Thread):
         data : pandas.DataFrame
             contains single bar data retrieved from TradingView
         '''
-        self._buffer.put(data)
+        if self._dispatcher is not None:
+            self._dispatcher.put(self, data)
+        else:
+            self._buffer.put(data)
     
     def del_consumer(self, timeout=-1):
         '''
@@ -91,9 +113,89 @@ class Consumer(threading.Thread):
         '''
         return self.seis.del_consumer(self, timeout)
     
+    def start(self):
+        '''
+        Start data processing and callback thread
+        '''
+        if self._dispatcher is not None: # callbacks are called by dispatcher workers
+            self._dispatcher.register(self)
+        else:
+            super().start()
+    
     def stop(self):
         '''
         Stop the data processing and callback thread
         '''
-        self._buffer.put(None)
-        
\ No newline at end of file
+        self.put(None)
+        
+class BatchConsumer(Consumer):
+    '''
+    Interval group data consumer and processor
+    
+    Like Consumer, but registered on TvDatafeedLive for an interval
+    instead of a Seis. The callback is called once per bar close 
+    with the bars of all the Seises with that interval which closed
+    at that time, as a single DataFrame.
+    
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeedLive
+        live feed where the consumer is registered
+    interval : tvDatafeed.Interval
+        Consumer receives the bars of Seises with this interval
+    callback : func
+        reference to a function to be called when new data available,
+        function protoype must be func_name(interval, data) where data
+        is a DataFrame indexed by symbol (EXCHANGE:SYMBOL) with datetime, 
+        open, high, low, close and volume columns
+    dispatcher : Dispatcher or AsyncDispatcher, optional
+        calls the callback from its shared workers instead of a 
+        thread of this consumer (default None)
+    metrics : Sink, optional
+        report queue depth and callback duration to this sink,
+        see tvDatafeed.metrics (default None)
+    
+    Methods
+    -------
+    put(data)
+        Put new data into buffer to be processed
+    del_consumer()
+        Shutdown the callback thread and remove from live feed
+    start()
+        start data processing and callback thread
+    stop()
+        Stop the data processing and callback thread
+    '''
+    def __init__(self, tvdatafeed, interval, callback, dispatcher=None, metrics=None):
+        super().__init__(None, callback, dispatcher, metrics)
+        
+        self.tvdatafeed=tvdatafeed
+        self.interval=interval
+        self.name=self.callback.__name__+"_"+interval.value
+    
+    def __repr__(self):
+        return f'BatchConsumer({self.interval},{self.callback.__name__})'
+    
+    def __str__(self):
+        return f'interval={self.interval.name},callback={self.callback.__name__}'
+    
+    def call(self, data):
+        # call the callback with data, not for direct use
+        return self.callback(self.interval, data)
+    
+    def del_consumer(self, timeout=-1):
+        '''
+        Stop the callback thread and remove from live feed
+        
+        Parameters
+        ----------
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        '''
+        return self.tvdatafeed.del_batch_consumer(self, timeout)
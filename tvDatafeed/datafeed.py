@@ -1,11 +1,25 @@
-import threading, queue, time, logging
+import threading, queue, time, logging, json, concurrent.futures, heapq
 import tvDatafeed 
+from tvDatafeed.main import resolve_symbol_msg, create_series_msg, remove_series_msg, set_auth_token_msg, chart_create_session_msg, \
+    timescale_update, data_update, series_completed, symbol_error, series_error
+from tvDatafeed.sessions import SessionCalendar
+from tvDatafeed.metrics import phase
+from tvDatafeed.ratelimit import Priority
+from websocket import create_connection, WebSocketException, WebSocketTimeoutException
 from datetime import datetime as dt
 from dateutil.relativedelta import relativedelta as rd
 
 logger = logging.getLogger(__name__)
 
-RETRY_LIMIT=50 # max number of retries to get valid data from tvDatafeed; TODO: think about creating a conf file for such parameters
+RETRY_LIMIT=10 # max number of retries to get valid data from tvDatafeed; TODO: think about creating a conf file for such parameters
+RETRY_DELAY=0.1 # seconds to wait before the first retry, doubled for every next retry
+RETRY_DELAY_MAX=5 # max seconds to wait between retries
+BATCH_SIZE=50 # max number of Seises retrieved together by one worker for batch consumers
+BATCH_GRACE=1 # max seconds to hold a closed bar for the other Seises of its interval in streaming mode
+
+def _seis_key(seis):
+    # hashable identity of a Seis
+    return (seis.symbol, seis.exchange, seis.interval.value)
 
 class TvDatafeedLive(tvDatafeed.TvDatafeed):
     """                 
@@ -26,6 +40,40 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         TradingView username (default None)
     password : str, optional
         TradingView password (default None)
+    symbol_master : SymbolMaster, optional
+        local symbol index used to validate new Seis without
+        searching TradingView (default None)
+    streaming : bool, optional
+        receive bars pushed by TradingView over one open websocket 
+        instead of requesting them at every interval (default False)
+    chart_sessions : int, optional
+        number of chart sessions the Seises are spread over in 
+        streaming mode (default 1)
+    workers : int, optional
+        max number of Seises retrieved at the same time when 
+        an interval expires, each worker keeps its own
+        connection (default 8)
+    max_failures : int, optional
+        remove a Seis from live feed after failing to retrieve
+        its data this many intervals in a row, None to keep
+        retrying (default None)
+    sessions : bool, optional
+        schedule retrieval by the trading sessions of each 
+        symbol, so no requests are made while its exchange is
+        closed (default True)
+    dispatcher : Dispatcher or AsyncDispatcher, optional
+        call the callbacks of all consumers from a shared pool
+        with bounded queues instead of a thread per consumer
+        (default None)
+    metrics : Sink, optional
+        report request phases, retrieval time, retries, failures,
+        consumer queue depth and callback time to this sink, see
+        tvDatafeed.metrics (default None)
+    rate_limits : RateLimits, optional
+        send requests through these adaptive rate limiters, see 
+        tvDatafeed.ratelimit; refreshes and streaming reconnects 
+        go ahead of the other requests waiting on them (default 
+        None)
     
     Methods
     -------
@@ -37,6 +85,10 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         Create a new consumer for Seis with provided callback
     del_consumer(consumer, timeout)
         Remove the consumer from Seis consumers list
+    new_batch_consumer(interval, callback, timeout)
+        Create a new consumer for all Seises with interval
+    del_batch_consumer(consumer, timeout)
+        Remove the batch consumer from live feed
     get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, timeout)
         Get historic ticker data
     del_tvdatafeed
@@ -46,12 +98,26 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
     class _SeisesAndTrigger(dict):
         # Internal class to contain an array of Seis objects
         # and to manage/track their interval update times
+        #
+        # Maps group key to its group [Seises by key, next expiry, interval,
+        # calendar, bar close]. Seises are grouped by interval and trading
+        # session calendar; groups with a calendar expire when their next
+        # bar really closes and sleep through closed periods, groups 
+        # without one every interval. The expiries are kept in a min-heap 
+        # of (expiry, group key) with stale entries skipped when popped, 
+        # and every Seis is indexed by (symbol, exchange, interval), so 
+        # scheduling is O(log n) and lookups are O(1). Expiries are 
+        # time.monotonic() values so waiting is not affected by wall clock 
+        # changes (DST, NTP).
         def __init__(self):
             super().__init__()
             
             self._trigger_quit=False
-            self._trigger_dt=None
+            self._trigger=None # expiry being waited on
             self._trigger_interrupt=threading.Event()
+            self._heap=[] # (expiry, group key), may hold stale entries
+            self._index={} # (symbol, exchange, interval) -> Seis
+            self._group_keys={} # (symbol, exchange, interval) -> group key
             
             # time periods available in TradingView 
             self._timeframes={"1":rd(minutes=1), "3":rd(minutes=3), "5":rd(minutes=5), \
@@ -59,28 +125,55 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
                              "1H":rd(hours=1), "2H":rd(hours=2), "3H":rd(hours=3), "4H":rd(hours=4), \
                              "1D":rd(days=1), "1W":rd(weeks=1), "1M":rd(months=1)}
         
-        def _next_trigger_dt(self):
-            # Get the next closest expiry datetime
-            if not self.values(): # if Seis list is empty
+        def _next_trigger(self):
+            # Get the next closest expiry, None if Seis list is empty
+            while self._heap:
+                expiry, interval=self._heap[0]
+                if interval in self.keys() and super().__getitem__(interval)[1] == expiry:
+                    return expiry
+                heapq.heappop(self._heap) # group was removed or rescheduled
+            
+            return None
+        
+        def _reschedule(self):
+            # interrupt waiting if the closest expiry changed
+            if ((trigger := self._next_trigger()) != self._trigger) and (self._trigger_quit is False):
+                self._trigger=trigger
+                self._trigger_interrupt.set()
+        
+        def _period(self, interval):
+            # length of the interval in seconds, months and weeks are
+            # counted from now as their length varies; by timestamps as
+            # datetimes subtract in wall clock time, an hour off over DST
+            now=dt.now()
+            return (now + self._timeframes[interval]).timestamp() - now.timestamp()
+        
+        @staticmethod
+        def group_key(seis, calendar=None):
+            # key of the interval group for a Seis
+            return (seis.interval.value, "" if calendar is None else calendar.key)
+        
+        @staticmethod
+        def _bar_close(group):
+            # next bar close of a group with a calendar as (expiry, datetime),
+            # None if the calendar cannot tell. Counted from the previous 
+            # close if the clock is behind it, so no bar triggers twice
+            if group[3] is None:
                 return None
             
-            interval_dt_list=[]
-            for values in self.values():
-                interval_dt_list.append(values[1])
+            now=dt.now(group[3].tz)
+            if (close := group[3].next_bar_close(now if group[4] is None else max(now, group[4]), group[2])) is None:
+                return None
             
-            interval_dt_list.sort()
-
-            return interval_dt_list[0]
+            # by timestamps, datetimes of the same tzinfo subtract in wall
+            # clock time which is an hour off across a DST change
+            return time.monotonic() + (close.timestamp() - now.timestamp()), close
 
         def get_seis(self, symbol, exchange, interval):
             # Returns Seis object listed in SAT based on
             # symbol, exchange and interval. If not listed then 
             # None is returned
-            for seis in self:
-                if seis.symbol==symbol and seis.exchange==exchange and seis.interval==interval:
-                    return seis
-            
-            return None
+            return self._index.get((symbol, exchange, interval.value))
             
         def wait(self):
             # Wait until next interval(s) expire
@@ -89,26 +182,51 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             if not self._trigger_quit: # if not quitting then we can clear interrupt before sarting the wait
                 self._trigger_interrupt.clear() # in case it was set by adding/removing new Seis
             
-            self._trigger_dt=self._next_trigger_dt() # get new expiry datetime
+            self._trigger=self._next_trigger() # get new expiry
             
-            while True: # might need to restart waiting if trigger_dt changes and interrupted when waiting
-                wait_time=self._trigger_dt-dt.now() # calculate the time to next expiry
+            while True: # might need to restart waiting if trigger changes and interrupted when waiting
+                wait_time=None if self._trigger is None else max(self._trigger - time.monotonic(), 0) # calculate the time to next expiry
                 
-                if (interrupted := self._trigger_interrupt.wait(wait_time.total_seconds())) and self._trigger_quit: # if we received a shutdown event during waiting
-                    return False 
-                elif not interrupted: # if not interrupted then no more waiting needed
-                    self._trigger_interrupt.clear() # in case waiting was interrupted, but not quit - reset the event flag
+                if not self._trigger_interrupt.wait(wait_time): # if not interrupted then no more waiting needed
                     break
+                elif self._trigger_quit: # if we received a shutdown event during waiting
+                    return False 
+                
+                self._trigger_interrupt.clear() # waiting was interrupted because the trigger changed - reset the event flag and wait again
+                if self._trigger_quit: # in case quit came in just before resetting
+                    return False
 
             return True
             
         def get_expired(self):
-            # return expired intervals in a list, update expiry values
+            # return expired intervals in a list of (group key, cutoff, 
+            # next expiry), update expiry values
+            #
+            # cutoff is the epoch seconds the bar closed at expiry opened
+            # before: the bar close of a group with a calendar, for the
+            # others half an interval before the expiry so the bar which
+            # just started forming is not taken as closed
             expired_intervals=[]
-            for interval, values in self.items():
-                if dt.now() >= values[1]:
-                    expired_intervals.append(interval)
-                    values[1]= values[1] + self._timeframes[interval] # add interval to get new expiry dt in future
+            now=time.monotonic()
+            while (expiry := self._next_trigger()) is not None and expiry <= now:
+                interval=heapq.heappop(self._heap)[1]
+                group=super().__getitem__(interval)
+                period=self._period(group[2])
+                if group[4] is not None:
+                    cutoff=group[4].timestamp()
+                else:
+                    cutoff=time.time() - (now - expiry) - period/2
+                
+                # next expiry in future, if we were not woken up for a while
+                # (e.g. suspended) then missed expiries are not triggered again
+                if (bar_close := self._bar_close(group)) is not None:
+                    group[1], group[4] = bar_close
+                else:
+                    group[1]=expiry + period * (1 + (now - expiry) // period) 
+                    group[4]=None
+                heapq.heappush(self._heap, (group[1], interval))
+                
+                expired_intervals.append((interval, cutoff, group[1]))
             
             return expired_intervals
         
@@ -121,82 +239,310 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             # clear the list of interval groups and Seises
             raise NotImplementedError
         
-        def append(self, seis, update_dt=None):
-            # append new Seis instance into list
-            if self: # if empty then reset flags
+        def append(self, seis, update_dt=None, calendar=None):
+            # append new Seis instance into list, grouped with the Seises
+            # of same interval and trading session calendar
+            if not self: # if empty then reset flags
                 self._trigger_quit=False
                 self._trigger_interrupt.clear()
-                
-            if seis.interval.value in self.keys(): # interval group already exists
-                super().__getitem__(seis.interval.value)[0].append(seis)
+            
+            group_key=self.group_key(seis, calendar)
+            if group_key in self.keys(): # interval group already exists
+                super().__getitem__(group_key)[0][_seis_key(seis)]=seis
             else: # new interval group needs to be created
-                if update_dt is None:
+                group=[{_seis_key(seis):seis}, None, seis.interval.value, calendar, None]
+                if (bar_close := self._bar_close(group)) is not None:
+                    group[1], group[4] = bar_close
+                elif update_dt is None:
                     raise ValueError("Missing update datetime for new interval group")
                 else:
                     update_dt= update_dt + self._timeframes[seis.interval.value] # change the time to next update datetime (result will be datetime object)
-                    self.__setitem__(seis.interval.value, [[seis], update_dt]) 
-                    
-                    if (trigger_dt := self._next_trigger_dt()) != self._trigger_dt: # if new interval group expiry is sooner than current expiry being waited on
-                        self._trigger_dt=trigger_dt
-                        self._trigger_interrupt.set()
+                    group[1]=time.monotonic() + (update_dt.timestamp() - time.time()) # same moment on the monotonic clock, by timestamps to be right across DST
+                
+                self.__setitem__(group_key, group) 
+                heapq.heappush(self._heap, (group[1], group_key))
+                
+                self._reschedule() # if new interval group expiry is sooner than current expiry being waited on
+            
+            self._index[_seis_key(seis)]=seis
+            self._group_keys[_seis_key(seis)]=group_key
            
         def discard(self, seis):
             # remove Seis instance from the list
             if seis not in self:
                 raise KeyError("No such Seis in the list")
             else:
-                super().__getitem__(seis.interval.value)[0].remove(seis)
-                if not super().__getitem__(seis.interval.value)[0]: # if interval group now empty then remove it
-                    self.pop(seis.interval.value)    
+                del self._index[_seis_key(seis)]
+                group_key=self._group_keys.pop(_seis_key(seis))
+                group=super().__getitem__(group_key)[0]
+                del group[_seis_key(seis)]
+                if not group: # if interval group now empty then remove it
+                    self.pop(group_key)    
                     
-                    if ((trigger_dt := self._next_trigger_dt()) != self._trigger_dt) and (self._trigger_quit is False): # if interval group expiry dt was being waited on and havent quit
-                        self._trigger_dt=trigger_dt
-                        self._trigger_interrupt.set()
+                    self._reschedule() # if interval group expiry was being waited on
             
         def intervals(self):
-            # return list of interval groups
+            # return list of interval group keys
             return self.keys()
         
-        def __getitem__(self, interval_key):
-            return super().__getitem__(interval_key)[0]
+        def count(self, interval):
+            # number of Seises with interval value
+            return sum(len(group[0]) for group in self.values() if group[2] == interval)
+        
+        def __getitem__(self, group_key):
+            return list(super().__getitem__(group_key)[0].values())
         
         def __iter__(self):
-            seises_list=[]
+            # iterate over a snapshot so Seises can be discarded meanwhile
+            return iter(list(self._index.values()))
+        
+        def __contains__(self, seis):
+            return self._index.get(_seis_key(seis)) == seis
+    
+    class _Stream(object):
+        # Internal class to receive pushed bar updates in streaming mode
+        #
+        # Keeps one websocket open with a few chart sessions on it. Every
+        # Seis is subscribed as a series of 2 bars after which the server
+        # pushes an update (du message) whenever the forming bar changes.
+        # A bar is closed once a bar with a later timestamp arrives, the
+        # bars closed by a received message are then passed together to
+        # on_bars([(seis, bar), ...]) as decoded bars, it is also called
+        # with no bars when nothing was received for a while. If the socket
+        # is lost then it is reconnected with exponential backoff and all
+        # series are subscribed again.
+        def __init__(self, tvdatafeed, chart_sessions, on_bars):
+            self._tv=tvdatafeed
+            self._on_bars=on_bars
+            self._n_sessions=chart_sessions
             
-            for seis_list in super().values():
-                seises_list+=seis_list[0]
+            self._lock=threading.Lock() # guards the series table and sending
+            self._quit=threading.Event()
+            self._ws=None
+            self._chart_sessions=[]
+            self._series={} # series id -> state of the subscribed Seis
+            self._series_ids={} # (symbol, exchange, interval) -> series id
+            self._request_id=0
+        
+        def _send(self, func, args):
+            self._ws.send(tvDatafeed.TvDatafeed.prepend_header(tvDatafeed.TvDatafeed.construct_message(func, args)))
+        
+        def _send_subscribe(self, state):
+            self._send(resolve_symbol_msg, [state['chart_session'], state['symbol_id'], tvDatafeed.TvDatafeed.symbol_spec(state['symbol'])])
+            self._send(create_series_msg, [state['chart_session'], state['series_id'], state['series_id'], state['symbol_id'], state['seis'].interval.value, 2])
+        
+        def __len__(self):
+            return len(self._series)
+        
+        def subscribe(self, seis):
+            # add Seis to the stream, sent right away if connected
+            # otherwise once the connection is made
+            with self._lock:
+                if _seis_key(seis) in self._series_ids:
+                    return
+                
+                self._request_id+=1
+                series_id=f"s{self._request_id}"
+                state={'seis':seis, 
+                       'symbol':tvDatafeed.TvDatafeed.format_symbol(seis.symbol, seis.exchange), 
+                       'symbol_id':f"symbol_{self._request_id}", 
+                       'series_id':series_id, 
+                       'index':self._request_id % self._n_sessions, # spread the series over the chart sessions
+                       'chart_session':None,
+                       'bar':None, # forming bar
+                       'live':False, # False until the snapshot sent on subscribing is complete
+                       'initial':True} # False once subscribed again after a reconnect
+                self._series[series_id]=state
+                self._series_ids[_seis_key(seis)]=series_id
+                
+                if self._ws is not None:
+                    state['chart_session']=self._chart_sessions[state['index']]
+                    try:
+                        self._send_subscribe(state)
+                    except (WebSocketException, OSError) as e: # receiving thread reconnects and subscribes again
+                        logger.warning(f"failed to subscribe {seis}: {e}")
+        
+        def unsubscribe(self, seis):
+            # remove Seis from the stream
+            with self._lock:
+                if (series_id := self._series_ids.pop(_seis_key(seis), None)) is None:
+                    return
+                
+                state=self._series.pop(series_id)
+                if self._ws is not None and state['chart_session'] is not None:
+                    try:
+                        self._send(remove_series_msg, [state['chart_session'], series_id])
+                    except (WebSocketException, OSError) as e:
+                        logger.debug(f"failed to remove series for {seis}: {e}")
+        
+        def _connect(self):
+            # open socket and chart sessions and (re)subscribe every Seis,
+            # waiting for the rate limit ahead of other requests
+            cost=1+len(self._series) # the connection and every subscription
+            self._tv._acquire('data', cost, Priority.live)
+            with self._lock:
+                if self._quit.is_set():
+                    return
+                
+                logger.debug("creating streaming websocket connection")
+                self._ws=create_connection(self._tv.ws_url, headers=self._tv.ws_headers, timeout=self._tv.ws_timeout, skip_utf8_validation=True)
+                self._chart_sessions=[tvDatafeed.TvDatafeed.generate_chart_session() for _ in range(self._n_sessions)]
+                
+                self._send(set_auth_token_msg, [self._tv.token])
+                for chart_session in self._chart_sessions:
+                    self._send(chart_create_session_msg, [chart_session, ""])
+                
+                for state in self._series.values():
+                    state['chart_session']=self._chart_sessions[state['index']]
+                    state['live']=False
+                    self._send_subscribe(state)
             
-            return seises_list.__iter__()
+            self._tv._feedback('data', True, cost)
         
-        def __contains__(self, seis):
-            for seis_list in super().values():
-                if seis in seis_list[0]:
-                    return True
+        def _close(self):
+            with self._lock:
+                ws, self._ws = self._ws, None
             
-            return False
+            if ws is not None:
+                try:
+                    ws.close()
+                except Exception as e:
+                    logger.debug(f"error while closing websocket: {e}")
+        
+        def stop(self):
+            # stop the receiving thread, closing the socket interrupts
+            # a blocking receive
+            self._quit.set()
+            self._close()
+        
+        def run(self):
+            # receive and process updates until stopped
+            backoff=1
+            while not self._quit.is_set():
+                try:
+                    if self._ws is None:
+                        self._connect()
+                        backoff=1
+                    
+                    if (ws := self._ws) is None: # stopped while connecting
+                        continue
+                    
+                    try:
+                        message=ws.recv()
+                    except WebSocketTimeoutException: # no updates for a while, only check if stopped
+                        message=None
+                    
+                    closed=self._process(ws, message) if message is not None else []
+                except (WebSocketException, OSError) as e:
+                    if self._quit.is_set():
+                        break
+                    
+                    logger.warning(f"streaming connection lost, reconnecting in {backoff} s: {e}")
+                    self._tv._feedback('data', False)
+                    if self._tv.metrics is not None:
+                        self._tv.metrics.count('reconnects')
+                    self._close()
+                    self._quit.wait(backoff)
+                    backoff=min(backoff*2, 60)
+                    continue
+                
+                self._on_bars(closed) # deliver outside the lock so slow delivery cannot block subscribing
+            
+            self._close()
+        
+        def _process(self, ws, message):
+            # process received frames, returns list of (seis, closed bar)
+            closed=[]
+            for payload in tvDatafeed.TvDatafeed.iter_frames(message):
+                if payload.startswith("~h~"): # answer heartbeats so the socket is kept open
+                    ws.send(tvDatafeed.TvDatafeed.prepend_header(payload))
+                    continue
+                
+                try:
+                    json_entry=json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.error(f"error processing segment: {payload}")
+                    continue
+                
+                message_type=json_entry.get('m')
+                params=json_entry.get('p', [])
+                
+                with self._lock:
+                    if message_type in (timescale_update, data_update):
+                        for series_id, series in params[1].items():
+                            if (state := self._series.get(series_id)) is not None and isinstance(series, dict):
+                                for bar in series.get('s', []):
+                                    if (closed_bar := self._update(state, bar)) is not None:
+                                        closed.append((state['seis'], closed_bar))
+                    elif message_type == series_completed:
+                        if (state := self._series.get(params[1])) is not None:
+                            state['live']=True
+                            state['initial']=False
+                    elif message_type in (symbol_error, series_error):
+                        for state in self._series.values():
+                            if params[1] in (state['symbol_id'], state['series_id']):
+                                logger.error(f"{message_type} for {state['seis']}: {params[2:]}")
+            
+            return closed
+        
+        def _update(self, state, bar):
+            # track the forming bar, returns the bar that was closed by 
+            # this update or None if no bar was closed
+            forming=state['bar']
+            if forming is not None and bar['v'][0] < forming['v'][0]: # late update of an older bar
+                return None
+            
+            state['bar']=bar
+            if forming is None or bar['v'][0] == forming['v'][0]:
+                return None
+            
+            if not state['seis'].is_new_bar(forming['v'][0]): # already delivered before a reconnect
+                return None
+            
+            # bars closed in the first snapshot only set the starting point,
+            # after a reconnect they are bars that were missed
+            if not state['live'] and state['initial']:
+                return None
+            
+            return forming
     
-    def __init__(self, username=None, password=None):
-        super().__init__(username, password)
+    def __init__(self, username=None, password=None, symbol_master=None, streaming=False, chart_sessions=1, workers=8, max_failures=None, sessions=True, dispatcher=None, metrics=None, rate_limits=None):
+        super().__init__(username, password, symbol_master=symbol_master, metrics=metrics, rate_limits=rate_limits)
         
         self._lock=threading.Lock()
         self._main_thread = None  
         self._sat = self._SeisesAndTrigger() 
+        self._streaming=streaming
+        self._chart_sessions=chart_sessions
+        self._stream=None
+        self._workers=workers
+        self._max_failures=max_failures
+        self._sessions=sessions
+        self._dispatcher=dispatcher
+        self._failures={} # (symbol, exchange, interval) -> intervals failed in a row
+        self._calendars={} # (exchange, symbol) -> SessionCalendar or None, see _calendar
+        self._batch_consumers={} # interval value -> list of BatchConsumer
+        self._held_batches={} # (interval value, bar timestamp) -> [[(seis, bar), ...], monotonic time first held], streaming mode only
+        self._worker_feeds=[] # connections of the live loop workers, see _worker_feed
+        self._worker_local=threading.local()
+        self._worker_quit=threading.Event() # set to stop the workers retrying
     
     def _args_invalid(self, symbol, exchange):
         # check if provided arguemnts are valid and that such
         # symbol, exchange and interval set exists in TradingView
         # 
         # returns True if does not exist, False otherwise
-        result_list=self.search_symbol(symbol, exchange)
-        
-        if not result_list: # if does not exists then empty
-            return True
-        
-        for item in result_list:
-            if item['symbol']==symbol and item['exchange']==exchange:
-                return False
-        
-        return True
+        # (resolved from the symbol master or the search cache when possible)
+        return self.lookup_symbol(symbol, exchange) is None
+    
+    def _calendar(self, symbol, exchange):
+        # trading session calendar of a symbol, None if it has none; 
+        # fetched once per symbol, must be called holding self._lock as
+        # it uses the socket
+        key=(exchange, symbol)
+        if key not in self._calendars:
+            self._calendars[key]=SessionCalendar.from_symbol_info(super().get_symbol_data(symbol, exchange))
+        return self._calendars[key]
     
     def new_seis(self, symbol, exchange, interval, timeout=-1): 
         '''
@@ -250,23 +596,41 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         # if this seis is already in list 
         if new_seis in self._sat:
+            self._lock.release()
             return self._sat.get_seis(symbol, exchange, interval)
         
+        calendar=None
+        if self._sessions and not self._streaming: # trading sessions of the symbol to schedule retrieval by
+            calendar=self._calendar(symbol, exchange)
+        
         # add to interval group - if interval group does not exists then create one
-        interval_key=new_seis.interval.value
-        if interval_key not in self._sat.intervals():
-            # get last bar update datetime value for the Seis
-            ticker_data=super().get_hist(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2) # get ticker data bar for this symbol from TradingView
-            update_dt=ticker_data.index.to_pydatetime()[0] # extract datetime of when this bar was produced/released
+        group_key=self._sat.group_key(new_seis, calendar)
+        if group_key not in self._sat.intervals():
+            if self._streaming: # bars are pushed by the server, interval expiry is not used
+                update_dt=dt.now()
+            elif calendar is not None and calendar.next_bar_close(dt.now(calendar.tz), interval.value) is not None: # next bar close is known from the sessions
+                update_dt=None
+            else:
+                # get last bar update datetime value for the Seis
+                ticker_data=super().get_hist(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2) # get ticker data bar for this symbol from TradingView
+                update_dt=ticker_data.index.to_pydatetime()[0] # extract datetime of when this bar was produced/released
             # append this seis into SAT
-            self._sat.append(new_seis, update_dt)
+            self._sat.append(new_seis, update_dt, calendar)
         else:
-            self._sat.append(new_seis)
+            self._sat.append(new_seis, calendar=calendar)
+        
+        if self._streaming:
+            if self._stream is None:
+                self._stream=self._Stream(self, self._chart_sessions, self._stream_bars)
+            self._stream.subscribe(new_seis)
         
         self._lock.release()
         
         if self._main_thread is None: # if main thread is not running then start 
-            self._main_thread = threading.Thread(name="main_loop", target=self._main_loop)
+            if self._streaming:
+                self._main_thread = threading.Thread(name="stream_loop", target=self._stream_loop)
+            else:
+                self._main_thread = threading.Thread(name="main_loop", target=self._main_loop)
             self._main_thread.start() 
         
         return new_seis
@@ -305,10 +669,14 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         # remove Seis from MAR list
         self._sat.discard(seis)
         del seis.tvdatafeed
+        if self._stream is not None:
+            self._stream.unsubscribe(seis)
         
         # if SAT list empty now then close down main loop
         if not self._sat:
             self._sat.quit()
+            if self._stream is not None:
+                self._stream.stop()
         
         self._lock.release()
         
@@ -344,7 +712,7 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             raise ValueError("Seis is not listed")
         
         # new consumer to hold callback related info
-        consumer=tvDatafeed.Consumer(seis, callback)
+        consumer=tvDatafeed.Consumer(seis, callback, self._dispatcher, self.metrics)
         if self._lock.acquire(timeout=timeout) is False:
             return False
         seis.add_consumer(consumer)     
@@ -377,6 +745,76 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         self._lock.release()
         
         return True
+    
+    def new_batch_consumer(self, interval, callback, timeout=-1):
+        '''
+        Create a new consumer for all Seises with interval
+        
+        The callback is called once per bar close with a single
+        DataFrame holding the closed bars of all the Seises with
+        this interval, one row per symbol, instead of once per Seis.
+        
+        Parameters
+        ----------
+        interval : tvDatafeed.Interval
+            chart interval of the Seises
+        callback : func
+            Callback function to be called with interval and data
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        ----------
+        BatchConsumer
+            Contains reference to provided interval and callback 
+            function. If timeout was specified and expired then 
+            False will be returned.
+        '''
+        consumer=tvDatafeed.BatchConsumer(self, interval, callback, self._dispatcher, self.metrics)
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        self._batch_consumers.setdefault(interval.value, []).append(consumer)
+        consumer.start()
+        self._lock.release()
+        
+        return consumer
+    
+    def del_batch_consumer(self, consumer, timeout=-1):
+        '''
+        Remove the batch consumer from live feed
+        
+        Parameters
+        ----------
+        consumer : BatchConsumer
+            BatchConsumer to be removed
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        
+        Raises
+        ----------
+        ValueError
+            If consumer is not registered in live feed
+        '''
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        consumers=self._batch_consumers.get(consumer.interval.value, [])
+        if consumer not in consumers:
+            self._lock.release()
+            raise ValueError("Batch consumer is not listed")
+        consumers.remove(consumer)
+        if not consumers:
+            del self._batch_consumers[consumer.interval.value]
+        consumer.stop()
+        self._lock.release()
+        
+        return True
         
     def _main_loop(self):
         # Main thread to return ticker data
@@ -389,44 +827,294 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         # case first all the consumer threads are closed and then this 
         # main thread is closed. Once wait() method returns then we
         # get a list of intervals which were under monitor and have 
-        # expired. We loop through every Seis which has that 
-        # interval and retrieve new data and push it into all the 
-        # consumer threads that are added for that particular Seis.
+        # expired. Every Seis with that interval is then retrieved 
+        # in a pool of worker threads, each with its own connection,
+        # and new data is pushed into all the consumer threads that 
+        # are added for that particular Seis. The lock is only held 
+        # while collecting the expired Seises.
         #
-        # If fail to retrieve data then retry up to RETRY_LIMIT times 
-        # and if still fail then log the event (critical) and close
-        # down the consumer threads and the main loop itself.
+        # If fail to retrieve data then retry with exponential backoff
+        # (see _refresh) and if still fail then log the event and 
+        # carry on with the other Seises; after max_failures intervals 
+        # in a row the failing Seis is removed from live feed.
+        
+        self._worker_quit.clear() # the loop is restarted once Seises are added after removing all
+        in_flight=set() # Seises still being retrieved from an earlier interval
         
-        while self._sat.wait(): # waits until soonest expiry and returns True; returns False if closed                     
+        with concurrent.futures.ThreadPoolExecutor(self._workers, thread_name_prefix="live_refresh") as executor:
+            while self._sat.wait(): # waits until soonest expiry and returns True; returns False if closed                     
+                with self._lock:
+                    # Seises of the interval groups that have expired, retried
+                    # until the next expiry of their own group (deadline)
+                    expired=[(self._sat[group_key], cutoff, deadline) for group_key, cutoff, deadline in self._sat.get_expired()]
+                    batched={seises[0].interval.value for seises, _, _ in expired if seises[0].interval.value in self._batch_consumers}
+                
+                for seises, cutoff, deadline in expired:
+                    for seis in seises:
+                        if _seis_key(seis) in in_flight:
+                            logger.warning(f"skipping {seis}, data for previous interval is still being retrieved")
+                    seises=[seis for seis in seises if _seis_key(seis) not in in_flight]
+                    in_flight.update(_seis_key(seis) for seis in seises)
+                    
+                    if seises and seises[0].interval.value in batched: # retrieved together and delivered as one batch
+                        self._refresh_batch(executor, seises, deadline, in_flight, cutoff)
+                        continue
+                    
+                    for seis in seises:
+                        future=executor.submit(self._refresh, seis, deadline, cutoff)
+                        future.add_done_callback(lambda _, key=_seis_key(seis): in_flight.discard(key))
+            
+            self._worker_quit.set() # stop retrying, then wait for the workers
+        
+        with self._lock:
+            feeds, self._worker_feeds = self._worker_feeds, []
+        for feed in feeds:
+            feed.close()
+        
+        self._close_consumers()
+    
+    def _stream_loop(self):
+        # Main thread to return ticker data in streaming mode
+        #
+        # The stream receives bar updates pushed by TradingView until
+        # it is stopped, each closed bar is delivered to the consumers
+        # of its Seis as soon as the stream detects it (see _deliver).
+        self._stream.run()
+        
+        self._stream_bars([], flush=True)
+        self._close_consumers()
+    
+    def _worker_feed(self):
+        # connection of the calling worker thread, the workers keep 
+        # their connections open between intervals and their requests
+        # go ahead of others waiting for the rate limit
+        if (feed := getattr(self._worker_local, 'feed', None)) is None:
+            feed=self._worker_local.feed=self.fork(persistent=True)
+            feed.priority=Priority.live
             with self._lock:
-                for interval in self._sat.get_expired(): # returns a list of intervals that have expired
-                    for seis in self._sat[interval]: # go through all the seises in this interval group 
-                        for _ in range(0, RETRY_LIMIT): # re-try maximum of RETRY_LIMIT times
-                            data=super().get_hist(seis.symbol, seis.exchange, interval=seis.interval, n_bars=2) # get_hist returns bars starting with currently open so need to read 2 to get first closed
-                            if data is not None: # check that we did get any data
-                                if seis.is_new_data(data): # check that it is new data not old 
-                                    data=data.drop(labels=data.index[1]) # drop the row (last) which has yet un-closed bar data 
-                                    break
-                            
-                            time.sleep(0.1) # little time before retrying
-                        else: # limit reached, print an error into logs and gracefully shut down the main loop and consumer threads
-                            self._sat.quit()
-                            logger.critical("Failed to retrieve new data from TradingView")
-                        
-                        # push new data into all consumers that are expecting data for this Seis
-                        for consumer in seis.get_consumers():
-                            consumer.put(data)
+                self._worker_feeds.append(feed)
+        
+        return feed
+    
+    @staticmethod
+    def _closed_bar(data, cutoff):
+        # the bar closed at interval expiry out of the 2 retrieved as a 
+        # one row DataFrame, None if there is none: the newest bar opened 
+        # before cutoff (epoch seconds, see get_expired) as at a session 
+        # close no new bar forms, without cutoff the older one
+        if cutoff is None:
+            return data.iloc[:1] if len(data) > 1 else None
+        
+        closed=data[data.index < dt.fromtimestamp(cutoff)]
+        return closed.iloc[-1:] if len(closed) else None
+    
+    @staticmethod
+    def _closed_raw_bar(bars, cutoff):
+        # same as _closed_bar for decoded bars, oldest first
+        if cutoff is None:
+            return bars[0] if len(bars) > 1 else None
         
+        closed=[bar for bar in bars if bar['v'][0] < cutoff]
+        return closed[-1] if closed else None
+    
+    def _refresh(self, seis, deadline, cutoff=None):
+        # Retrieve the bar closed at interval expiry for one Seis
+        #
+        # TradingView may take a moment to produce the new bar so
+        # retry with exponential backoff, up to RETRY_LIMIT times 
+        # but not past the next expiry (deadline).
+        with phase(self.metrics, 'refresh', interval=seis.interval.value):
+            feed=self._worker_feed()
+            key=_seis_key(seis)
+            delay=RETRY_DELAY
+            
+            for _ in range(0, RETRY_LIMIT): 
+                try:
+                    data=feed.get_hist(seis.symbol, seis.exchange, interval=seis.interval, n_bars=2) # get_hist returns bars starting with currently open so need to read 2 to get first closed
+                except Exception as e:
+                    logger.warning(f"error while retrieving data for {seis}: {e}")
+                    data=None
+            
+                if data is not None and (data := self._closed_bar(data, cutoff)) is not None: # check that we did get the closed bar
+                    if seis.is_new_data(data): # check that it is new data not old 
+                        self._failures.pop(key, None)
+                        self._deliver(seis, data)
+                        return
+            
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    break
+            
+                if self.metrics is not None:
+                    self.metrics.count('retries', interval=seis.interval.value)
+                if self._worker_quit.wait(delay): # wait before retrying, longer every time
+                    return
+                delay=min(delay*2, RETRY_DELAY_MAX)
+            
+            # limit reached, log an error and apply the failure policy for this Seis only
+            self._failed(seis)
+    
+    def _refresh_batch(self, executor, seises, deadline, in_flight, cutoff=None):
+        # Retrieve the bars closed at interval expiry for an interval 
+        # group with batch consumers
+        #
+        # The Seises are split into chunks of BATCH_SIZE which the workers
+        # retrieve over one connection each (see _refresh_many), once all
+        # chunks are done the bars are delivered together.
+        chunks=[seises[i:i+BATCH_SIZE] for i in range(0, len(seises), BATCH_SIZE)]
+        results=[None]*len(chunks)
+        remaining=[len(chunks)]
+        lock=threading.Lock()
+        
+        def done(index, future):
+            for seis in chunks[index]:
+                in_flight.discard(_seis_key(seis))
+            results[index]=future.result() if future.exception() is None else []
+            
+            with lock:
+                remaining[0]-=1
+                if remaining[0]:
+                    return
+            self._deliver_bars([closed for result in results for closed in result])
+        
+        for index, chunk in enumerate(chunks):
+            future=executor.submit(self._refresh_many, chunk, deadline, cutoff)
+            future.add_done_callback(lambda future, index=index: done(index, future))
+    
+    def _refresh_many(self, seises, deadline, cutoff=None):
+        # Retrieve the bars closed at interval expiry for Seises of
+        # the same interval, returns list of (seis, closed bar)
+        #
+        # All Seises are requested at once over the worker connection,
+        # the ones without a new bar yet are retried like in _refresh.
+        with phase(self.metrics, 'refresh', interval=seises[0].interval.value):
+            feed=self._worker_feed()
+            interval=seises[0].interval.value
+            pending={tvDatafeed.TvDatafeed.format_symbol(seis.symbol, seis.exchange):seis for seis in seises}
+            closed=[]
+            delay=RETRY_DELAY
+            
+            for _ in range(0, RETRY_LIMIT):
+                try:
+                    bars=feed._request(feed._fetch_hist_many, list(pending), interval, 2, False, BATCH_SIZE, cost=len(pending)) # 2 bars to get first closed, like in _refresh
+                except Exception as e:
+                    logger.warning(f"error while retrieving data for {len(pending)} Seises: {e}")
+                    bars=None
+            
+                for symbol, symbol_bars in (bars or {}).items():
+                    if symbol_bars is not None and (bar := self._closed_raw_bar(symbol_bars, cutoff)) is not None and pending[symbol].is_new_bar(bar['v'][0]):
+                        seis=pending.pop(symbol)
+                        self._failures.pop(_seis_key(seis), None)
+                        closed.append((seis, bar))
+            
+                if not pending:
+                    return closed
+            
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    break
+            
+                if self.metrics is not None:
+                    self.metrics.count('retries', len(pending), interval=interval)
+                if self._worker_quit.wait(delay): # wait before retrying, longer every time
+                    return closed
+                delay=min(delay*2, RETRY_DELAY_MAX)
+            
+            for seis in pending.values():
+                self._failed(seis)
+            
+            return closed
+    
+    def _failed(self, seis):
+        # count a failed interval for Seis and remove it from live
+        # feed once it has failed max_failures intervals in a row
+        key=_seis_key(seis)
+        failures=self._failures[key]=self._failures.get(key, 0)+1
+        if self.metrics is not None:
+            self.metrics.count('failures', interval=seis.interval.value)
+        logger.error(f"Failed to retrieve new data for {seis} from TradingView ({failures} intervals in a row)")
+        
+        if self._max_failures is not None and failures >= self._max_failures:
+            logger.critical(f"Removing {seis} from live feed after {failures} failed intervals")
+            self._failures.pop(key, None)
+            try:
+                self.del_seis(seis)
+            except ValueError: # already removed by the user
+                pass
+    
+    def _deliver(self, seis, data):
+        # push new data into all consumers that are expecting data for this Seis,
+        # outside the lock as a dispatcher may block until a consumer catches up
+        with self._lock:
+            consumers=list(seis.get_consumers())
+        
+        for consumer in consumers:
+            consumer.put(data)
+    
+    def _deliver_bars(self, closed):
+        # push closed bars [(seis, bar), ...] into the consumers of each Seis
+        # and as one batch per interval into the batch consumers
+        batches={}
+        for seis, bar in closed:
+            self._deliver_bar(seis, bar)
+            batches.setdefault(seis.interval.value, []).append((seis, bar))
+        
+        for interval, rows in batches.items():
+            self._deliver_batch(interval, rows)
+    
+    def _stream_bars(self, closed, flush=False):
+        # push closed bars [(seis, bar), ...] received in streaming mode
+        #
+        # The bars of each Seis arrive separately, so for batch consumers
+        # they are held until every Seis of the interval has closed the 
+        # bar, a later bar closes or BATCH_GRACE seconds have passed. 
+        # Only called from the streaming thread.
+        now=time.monotonic()
+        with self._lock: # new_seis and del_seis change the Seises from other threads
+            batched={interval:self._sat.count(interval) for interval in self._batch_consumers} # interval value -> number of Seises
+        
+        for seis, bar in closed:
+            self._deliver_bar(seis, bar)
+            if seis.interval.value in batched:
+                self._held_batches.setdefault((seis.interval.value, bar['v'][0]), [[], now])[0].append((seis, bar))
+        
+        for key in sorted(self._held_batches, key=lambda key: key[1]):
+            interval, timestamp=key
+            rows, held=self._held_batches[key]
+            later=any(other[0] == interval and other[1] > timestamp for other in self._held_batches)
+            if flush or later or now - held >= BATCH_GRACE or len(rows) >= batched.get(interval, 0):
+                del self._held_batches[key]
+                self._deliver_batch(interval, rows)
+    
+    def _deliver_bar(self, seis, bar):
+        # push a closed bar into the consumers of Seis, the DataFrame is
+        # only built if there are consumers to receive it
+        if seis.get_consumers():
+            self._deliver(seis, tvDatafeed.TvDatafeed.bars_to_df([bar], tvDatafeed.TvDatafeed.format_symbol(seis.symbol, seis.exchange)))
+    
+    def _deliver_batch(self, interval, rows):
+        # push closed bars [(seis, bar), ...] of an interval into its batch
+        # consumers as one DataFrame
+        with self._lock:
+            consumers=list(self._batch_consumers.get(interval, []))
+        
+        if not consumers or not rows:
+            return
+        
+        data=tvDatafeed.TvDatafeed.bars_to_batch([bar for _, bar in rows], [tvDatafeed.TvDatafeed.format_symbol(seis.symbol, seis.exchange) for seis, _ in rows])
+        for consumer in consumers:
+            consumer.put(data)
+    
+    def _close_consumers(self):
         # send a shutdown signal to all the callback threads
         with self._lock:
             for seis in self._sat:
-                for consumer in seis.get_consumers():
+                for consumer in list(seis.get_consumers()):
                     seis.pop_consumer(consumer)
                     consumer.stop()
                 
                 self._sat.discard(seis)
                 
             self._main_thread = None
+            self._stream = None
     
     def get_hist(self,  
         symbol: str,
@@ -436,6 +1124,9 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         fut_contract: int = None,
         extended_session: bool = False,
         timeout=-1,
+        start=None,
+        end=None,
+        output="pandas",
     ): 
         '''
         Get historical data
@@ -450,23 +1141,35 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         interval : tvDatafeed.Interval, optional
             chart interval. Defaults to Interval.in_daily
         n_bars : int, optional
-            no of bars to download, max 5000. Defaults to 10.
+            no of bars to download, more than 5000 are fetched
+            in pages. Defaults to 10.
         fut_contract : int, optional
             None for cash, 1 for continuous current contract in front,
             2 for continuous next contract in front. Defaults to None.
         extended_session : bool, optional 
             regular session if False, extended session if True, 
             Defaults to False.
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        start : datetime, optional
+            get all bars from this datetime on. Defaults to None.
+        end : datetime, optional
+            get bars up to this datetime only. Defaults to None.
+        output : str, optional
+            "pandas", "numpy" or "arrow", see TvDatafeed.get_hist.
+            Defaults to "pandas".
 
         Returns
         -------
         pd.Dataframe
-            dataframe with sohlcv as columns. If timeout was specified 
+            dataframe with sohlcv as columns, or the bars in the 
+            requested output format. If timeout was specified 
             and expired then False will be returned.
         '''
         if self._lock.acquire(timeout=timeout) is False:
             return False
-        data=super().get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session)
+        data=super().get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, start, end, output)
         self._lock.release()
         
         return data
@@ -474,10 +1177,19 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
     def __del__(self):
         with self._lock:
             self._sat.quit() #shutdown the main_loop
+            if self._stream is not None:
+                self._stream.stop()
         
         # wait until all threads are closed down - they are closed in the main_loop
         if self._main_thread is not None:
             self._main_thread.join() 
+        
+        # batch consumers are not tied to a Seis so close them here
+        with self._lock:
+            for consumers in self._batch_consumers.values():
+                for consumer in consumers:
+                    consumer.stop()
+            self._batch_consumers.clear()
     
     def del_tvdatafeed(self): 
         '''
@@ -0,0 +1,319 @@
+import threading, collections, concurrent.futures, asyncio, time, logging
+
+logger = logging.getLogger(__name__)
+
+# overflow policies, what to do when a consumer queue is full
+BLOCK="block" # producer waits until the consumer catches up
+DROP_OLDEST="drop_oldest" # oldest queued bar is dropped
+COALESCE="coalesce" # queued bars are replaced by the latest one
+
+class _ConsumerQueue(object):
+    # Bounded queue of one Consumer with its metrics
+    #
+    # Items are (put time, data) tuples. The queue is scheduled
+    # on at most one worker at a time so that the callbacks of
+    # a Consumer are called one by one and in order.
+    def __init__(self, consumer, maxsize, policy):
+        self.consumer=consumer
+        self.maxsize=maxsize
+        self.policy=policy
+
+        self.items=collections.deque()
+        self.cond=threading.Condition()
+        self.scheduled=False # drain task submitted or running
+        self.closed=False # no more items accepted, removed when drained
+
+        self.delivered=0
+        self.dropped=0
+        self.coalesced=0
+        self.max_depth=0
+        self.wait_total=0.0
+        self.wait_max=0.0
+        self.run_total=0.0
+        self.run_max=0.0
+
+    def put(self, data):
+        # queue data according to overflow policy, returns True if
+        # the queue needs to be scheduled
+        with self.cond:
+            if self.closed:
+                return False
+
+            if len(self.items) >= self.maxsize:
+                if self.policy == BLOCK:
+                    self.cond.wait_for(lambda: len(self.items) < self.maxsize or self.closed)
+                    if self.closed:
+                        return False
+                elif self.policy == DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped+=1
+                else: # COALESCE
+                    self.coalesced+=len(self.items)
+                    self.items.clear()
+
+            self.items.append((time.monotonic(), data))
+            self.max_depth=max(self.max_depth, len(self.items))
+
+            return self._schedule()
+
+    def close(self):
+        # accept no more items, returns True if the queue needs to be
+        # scheduled to be removed
+        with self.cond:
+            self.closed=True
+            self.cond.notify_all()
+            return self._schedule()
+
+    def _schedule(self):
+        if self.scheduled:
+            return False
+        self.scheduled=True
+        return True
+
+    def get(self):
+        # next (put time, data) to process, None when nothing to do in
+        # which case the queue is no longer scheduled
+        with self.cond:
+            if not self.items:
+                self.scheduled=False
+                return None
+
+            item=self.items.popleft()
+            self.cond.notify()
+            return item
+
+    def record(self, queued, started, finished):
+        # update callback latency metrics, and report them to the
+        # metrics sink of the consumer if it has one
+        with self.cond:
+            self.delivered+=1
+            self.wait_total+=started-queued
+            self.wait_max=max(self.wait_max, started-queued)
+            self.run_total+=finished-started
+            self.run_max=max(self.run_max, finished-started)
+            depth=len(self.items)
+
+        if (sink := self.consumer.metrics) is not None:
+            sink.timing("callback", time.time()-(time.monotonic()-started), finished-started, consumer=self.consumer.name)
+            sink.gauge("queue_depth", depth, consumer=self.consumer.name)
+
+    def metrics(self):
+        with self.cond:
+            return {"depth":len(self.items), "max_depth":self.max_depth, "delivered":self.delivered,
+                    "dropped":self.dropped, "coalesced":self.coalesced,
+                    "wait_avg":self.wait_total/self.delivered if self.delivered else 0.0, "wait_max":self.wait_max,
+                    "run_avg":self.run_total/self.delivered if self.delivered else 0.0, "run_max":self.run_max}
+
+class _BaseDispatcher(object):
+    # Consumer registration and metrics shared by the dispatchers
+    def __init__(self, maxsize, policy):
+        if policy not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown overflow policy {policy}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize=maxsize
+        self.policy=policy
+        self._queues={} # Consumer -> _ConsumerQueue
+        self._lock=threading.Lock()
+
+    def register(self, consumer):
+        '''
+        Start dispatching data to a Consumer
+
+        Parameters
+        ----------
+        consumer : Consumer
+            consumer to dispatch data to, called by Consumer.start()
+        '''
+        with self._lock:
+            self._queues[consumer]=_ConsumerQueue(consumer, self.maxsize, self.policy)
+
+    def put(self, consumer, data):
+        '''
+        Queue data for a Consumer
+
+        The overflow policy is applied if the queue of the consumer
+        is full. None closes the consumer once the data queued
+        before it has been processed.
+
+        Parameters
+        ----------
+        consumer : Consumer
+            registered consumer
+        data : pandas.DataFrame
+            data bar to pass to the callback, or None
+        '''
+        if (q := self._queues.get(consumer)) is None:
+            return
+
+        if q.close() if data is None else q.put(data):
+            self._schedule(q)
+
+    def metrics(self):
+        '''
+        Return queue depth and callback latency of every Consumer
+
+        Returns
+        -------
+        dict
+            Consumer to dict of depth (bars queued now), max_depth,
+            delivered, dropped (by drop_oldest), coalesced (replaced
+            by a later bar), wait_avg and wait_max (seconds from put to
+            callback), run_avg and run_max (seconds in callback)
+        '''
+        with self._lock:
+            queues=list(self._queues.values())
+
+        return {q.consumer:q.metrics() for q in queues}
+
+    def _finish(self, q):
+        # remove a closed and drained queue, references are dropped
+        # like the callback thread of a Consumer does when it ends
+        with self._lock:
+            self._queues.pop(q.consumer, None)
+        q.consumer.seis=None
+        q.consumer.callback=None
+
+    def _failed(self, q, e):
+        # callback raised an exception, stop queueing data for the
+        # consumer, which is then removed with _remove
+        logger.error(f"callback of {q.consumer} raised {e!r}, removing consumer", exc_info=e)
+        with q.cond:
+            q.items.clear()
+        q.close()
+
+    def _remove(self, q):
+        # remove the consumer from Seis like the callback thread of a
+        # Consumer does when its callback raised an exception
+        try:
+            q.consumer.del_consumer()
+        except Exception: # Seis already removed
+            pass
+
+class Dispatcher(_BaseDispatcher):
+    '''
+    Calls Consumer callbacks from a fixed size pool of threads
+
+    By default every Consumer runs its own callback thread with an
+    unbounded queue. Consumers created with a Dispatcher share its
+    worker threads instead and each has a bounded queue, so a slow
+    callback can neither hold up the other consumers nor let its
+    queue grow without limit. The callbacks of one consumer are
+    still called one at a time and in order.
+
+    Parameters
+    ----------
+    workers : int, optional
+        number of callback threads (default 4)
+    maxsize : int, optional
+        maximum number of bars queued per consumer (default 100)
+    policy : str, optional
+        what to do when the queue of a consumer is full, "block"
+        waits for the callback to catch up, "drop_oldest" drops
+        the oldest queued bar and "coalesce" replaces the queued
+        bars with the latest one (default "block")
+
+    Methods
+    -------
+    metrics()
+        Return queue depth and callback latency of every Consumer
+    close()
+        Shutdown the worker threads
+    '''
+    def __init__(self, workers=4, maxsize=100, policy=BLOCK):
+        super().__init__(maxsize, policy)
+
+        self._executor=concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="dispatcher")
+
+    def _schedule(self, q):
+        self._executor.submit(self._drain, q)
+
+    def _drain(self, q):
+        # process one item then yield the worker to the other
+        # consumers, so one busy consumer cannot starve them
+        if (item := q.get()) is None:
+            if q.closed:
+                self._finish(q)
+            return
+
+        queued, data=item
+        started=time.monotonic()
+        try:
+            q.consumer.call(data)
+        except Exception as e:
+            self._failed(q, e)
+            self._remove(q)
+        q.record(queued, started, time.monotonic())
+
+        self._schedule(q)
+
+    def close(self, wait=True):
+        '''
+        Shutdown the worker threads
+
+        Parameters
+        ----------
+        wait : bool, optional
+            wait for queued callbacks to finish (default True)
+        '''
+        self._executor.shutdown(wait=wait)
+
+class AsyncDispatcher(_BaseDispatcher):
+    '''
+    Calls Consumer callbacks on an asyncio event loop
+
+    Like Dispatcher, but the callbacks run as tasks of an event loop
+    so they can be coroutine functions. Plain functions are called
+    on the loop directly and must not block it. Data is put from
+    the live feed threads, with the "block" policy they wait for
+    the loop to catch up.
+
+    Parameters
+    ----------
+    loop : asyncio.AbstractEventLoop, optional
+        event loop to run callbacks on, defaults to the running loop
+    maxsize : int, optional
+        maximum number of bars queued per consumer (default 100)
+    policy : str, optional
+        "block", "drop_oldest" or "coalesce", see Dispatcher
+        (default "block")
+
+    Methods
+    -------
+    metrics()
+        Return queue depth and callback latency of every Consumer
+    '''
+    def __init__(self, loop=None, maxsize=100, policy=BLOCK):
+        super().__init__(maxsize, policy)
+
+        self._loop=asyncio.get_running_loop() if loop is None else loop
+        self._tasks=set() # keep references to running tasks
+
+    def _schedule(self, q):
+        self._loop.call_soon_threadsafe(self._start, q)
+
+    def _start(self, q):
+        task=self._loop.create_task(self._drain(q))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, q):
+        while (item := q.get()) is not None:
+            queued, data=item
+            started=time.monotonic()
+            try:
+                result=q.consumer.call(data)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self._failed(q, e)
+                # del_consumer waits for the lock of the live feed, which
+                # is held while it refreshes, so it must not block the loop
+                await self._loop.run_in_executor(None, self._remove, q)
+            q.record(queued, started, time.monotonic())
+
+            await asyncio.sleep(0) # let the other consumers run
+
+        if q.closed:
+            self._finish(q)
@@ -1,3 +1,5 @@
+import collections
+import concurrent.futures
 import datetime
 import enum
 import json
@@ -5,10 +7,21 @@ import logging
 import random
 import re
 import string
+import threading
+import time
+import urllib.parse
+import numpy as np
 import pandas as pd
-from websocket import create_connection
+from dateutil.tz import gettz
+from websocket import (
+    create_connection,
+    WebSocketConnectionClosedException,
+    WebSocketException,
+)
 import requests
-import json
+
+from .metrics import phase
+from .ratelimit import Priority
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +32,26 @@ chart_create_session_msg = "chart_create_session"
 quote_create_session_msg = "quote_create_session"
 quote_set_fields_msg = "quote_set_fields"
 quote_add_symbols_msg = "quote_add_symbols"
+quote_remove_symbols_msg = "quote_remove_symbols"
 resolve_symbol_msg = "resolve_symbol"
 quote_fast_symbols_msg = "quote_fast_symbols"
 create_series_msg = "create_series"
+request_more_data_msg = "request_more_data"
+remove_series_msg = "remove_series"
 symbol_resolved = "symbol_resolved"
+symbol_error = "symbol_error"
+series_error = "series_error"
 series_completed = "series_completed"
+timescale_update = "timescale_update"
+data_update = "du"
 price_cash_flow_current = "price_cash_flow_current"
 
+ohlcv_columns = ("open", "high", "low", "close", "volume")
+output_formats = ("pandas", "numpy", "arrow")
+
+# record of a bar for output="numpy", time in epoch seconds
+bar_dtype = [("time", np.int64)] + [(column, np.float64) for column in ohlcv_columns]
+
 fields = [
     "ch",
     "chp",
@@ -72,25 +98,85 @@ class Interval(enum.Enum):
 class TvDatafeed:
     sign_in_url = "https://www.tradingview.com/accounts/signin/"
     search_url = "https://symbol-search.tradingview.com/symbol_search/v3/?text={}&hl=1&exchange={}&lang=en&&search_type=undefined&domain=production&sort_by_country=US"
+    ws_url = "wss://data.tradingview.com/socket.io/websocket"
     ws_headers = json.dumps({"Origin": "https://data.tradingview.com"})
     signin_headers = {"Referer": "https://www.tradingview.com"}
+    search_headers = {
+        "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0",
+        "Accept": "*/*",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate, br, zstd",
+        "Referer": "https://www.tradingview.com/",
+        "Origin": "https://www.tradingview.com",
+        "Sec-Fetch-Dest": "empty",
+        "Sec-Fetch-Mode": "cors",
+        "Sec-Fetch-Site": "same-site",
+        "Priority": "u=4",
+    }
     ws_timeout = 5
+    max_bars_per_request = 5000
+    # symbol search results are reused for this many seconds, keeping at
+    # most search_cache_size of them
+    search_cache_ttl = 300
+    search_cache_size = 1024
+    # attributes set by __init__ which forks share, see fork
+    _fork_attributes = (
+        "ws_debug",
+        "persistent",
+        "cache",
+        "symbol_master",
+        "metrics",
+        "rate_limits",
+        "priority",
+        "http",
+        "_search_cache",
+        "_search_lock",
+        "token",
+    )
 
     def __init__(
         self,
         username: str = None,
         password: str = None,
+        persistent: bool = False,
+        cache=None,
+        symbol_master=None,
+        metrics=None,
+        token: str = None,
+        rate_limits=None,
     ) -> None:
         """Create TvDatafeed object
 
         Args:
             username (str, optional): tradingview username. Defaults to None.
             password (str, optional): tradingview password. Defaults to None.
+            persistent (bool, optional): keep one websocket open and reuse it across requests instead of connecting per request. Defaults to False.
+            cache (BarCache, optional): serve get_hist from this on-disk cache, fetching only the missing bars. Defaults to None.
+            symbol_master (SymbolMaster, optional): resolve lookup_symbol from this local index before searching TradingView. Defaults to None.
+            metrics (Sink, optional): report request phase timings and traffic to this sink, see tvDatafeed.metrics. Defaults to None.
+            token (str, optional): auth token of an earlier sign in, e.g. of another process, used instead of signing in again. Defaults to None.
+            rate_limits (RateLimits, optional): send websocket and symbol search requests through these adaptive rate limiters, see tvDatafeed.ratelimit. Defaults to None.
         """
 
         self.ws_debug = False
-
-        self.token = self.auth(username, password)
+        self.persistent = persistent
+        self.cache = cache
+        self.symbol_master = symbol_master
+        self.metrics = metrics
+        self.rate_limits = rate_limits
+        # position of the requests of this client in the rate limit queues
+        self.priority = Priority.normal
+        self._request_id = 0
+        self._first_byte = None  # perf_counter of a request until its first message
+        self._timed_out = False  # a receive of the current request timed out
+
+        # one HTTP session so sign in and symbol searches reuse connections
+        self.http = requests.Session()
+        self.http.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+        self._search_cache = collections.OrderedDict()
+        self._search_lock = threading.Lock()
+
+        self.token = token if token is not None else self.auth(username, password)
 
         if self.token is None:
             self.token = "unauthorized_user_token"
@@ -102,6 +188,42 @@ class TvDatafeed:
         self.session = self.generate_session()
         self.chart_session = self.generate_chart_session()
 
+    def fork(self, persistent: bool = None):
+        """new client with its own websocket, for use from another thread
+
+        The fork is a shallow copy of the TvDatafeed attributes of this
+        client, so it shares the sign in, HTTP session, search cache, bar
+        cache, symbol master, metrics sink, rate limits and every other
+        setting, but no connection state, so requests can run on both at
+        the same time. Forks of subclasses such as TvDatafeedLive are plain
+        clients without the state of the subclass.
+
+        Args:
+            persistent (bool, optional): persistent mode of the fork. Defaults to that of this client.
+
+        Returns:
+            TvDatafeed
+        """
+        # copy.copy, but a plain TvDatafeed as the live feed of a subclass
+        # must not be stopped when a fork is garbage collected, with the
+        # attributes of __init__ and overrides of the class attributes only
+        clone = TvDatafeed.__new__(TvDatafeed)
+        clone.__dict__.update(
+            (name, value)
+            for name, value in vars(self).items()
+            if name in self._fork_attributes or name in vars(TvDatafeed)
+        )
+
+        if persistent is not None:
+            clone.persistent = persistent
+        clone.ws = None
+        clone.session = self.generate_session()
+        clone.chart_session = self.generate_chart_session()
+        clone._request_id = 0
+        clone._first_byte = None
+        clone._timed_out = False
+        return clone
+
     def auth(self, username, password):
 
         if username is None or password is None:
@@ -110,7 +232,7 @@ class TvDatafeed:
         else:
             data = {"username": username, "password": password, "remember": "on"}
             try:
-                response = requests.post(
+                response = self.http.post(
                     url=self.sign_in_url, data=data, headers=self.signin_headers
                 )
                 token = response.json()["user"]["auth_token"]
@@ -121,12 +243,134 @@ class TvDatafeed:
         return token
 
     def create_connection(self):
+        self.close()
         logging.debug("creating websocket connection")
-        self.ws = create_connection(
-            "wss://data.tradingview.com/socket.io/websocket",
-            headers=self.ws_headers,
-            timeout=self.ws_timeout,
-        )
+        self._acquire("data")
+        try:
+            with phase(self.metrics, "connect"):
+                self.ws = create_connection(
+                    self.ws_url,
+                    headers=self.ws_headers,
+                    timeout=self.ws_timeout,
+                    # the pure python check costs more than decoding the frames
+                    skip_utf8_validation=True,
+                )
+        except (WebSocketException, OSError):
+            # e.g. the upgrade refused with 429 Too Many Requests
+            self._feedback("data", False)
+            raise
+        self._feedback("data", True)
+
+    def close(self):
+        """close the websocket connection, if one is open"""
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception as e:
+                logger.debug(f"error while closing websocket: {e}")
+            self.ws = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def connected(self):
+        return self.ws is not None and self.ws.connected
+
+    def open_session(self):
+        """connect and set up the auth token, chart session and quote session.
+
+        In persistent mode this is done once and reused by every request
+        until the socket dies, in which case it is transparently redone.
+        """
+        self.create_connection()
+
+        # TradingView does not answer these, the server setting up the
+        # session shows in the first_byte time of the first request
+        self.send_set_auth_token()
+        self.send_chart_create_session_msg()
+        self.send_quote_create_session_msg()
+        self.send_quote_set_fields_overview_msg()
+
+    def _ensure_session(self):
+        if not self.persistent or not self.connected:
+            self.open_session()
+
+    def _next_ids(self):
+        # fresh symbol and series ids so requests on a reused chart
+        # session never collide with earlier ones
+        self._request_id += 1
+        return f"symbol_{self._request_id}", f"s{self._request_id}"
+
+    def _request(self, func, *args, cost=1, **kwargs):
+        # run a request on an open session, re-establishing the
+        # connection once if the socket turns out to be dead; cost is
+        # the no of rate limit tokens it takes, e.g. one per symbol
+        request = func.__name__.removeprefix("_fetch_")
+        for attempt in range(2):
+            self._ensure_session()
+            self._acquire("data", cost)
+            started = self._begin_request(request)
+            try:
+                result = func(*args, **kwargs)
+                self._feedback("data", not self._timed_out, cost)
+                return result
+            except (WebSocketConnectionClosedException, OSError) as e:
+                logger.warning(f"websocket connection lost: {e}")
+                self._feedback("data", False)
+                if self.metrics is not None:
+                    self.metrics.count("reconnects")
+                self.close()
+                if attempt:
+                    logger.error("failed to re-establish websocket connection")
+            finally:
+                self._end_request(request, started)
+                if not self.persistent:
+                    self.close()
+
+        return None
+
+    def _acquire(self, endpoint, cost=1, priority=None):
+        # wait for the rate limit of an endpoint ("data" or "search"),
+        # a no-op without rate limits
+        if self.rate_limits is None:
+            return
+        self._timed_out = False
+        limiter = getattr(self.rate_limits, endpoint)
+        with phase(self.metrics, "throttle", endpoint=endpoint):
+            limiter.acquire(self.priority if priority is None else priority, cost)
+
+    def _feedback(self, endpoint, ok, cost=1):
+        # adapt the rate limit of an endpoint to the outcome of a request
+        # of cost tokens, errors and timeouts slow it down
+        if self.rate_limits is None:
+            return
+        limiter = getattr(self.rate_limits, endpoint)
+        if ok:
+            limiter.success(cost)
+        else:
+            limiter.throttled()
+        if self.metrics is not None:
+            self.metrics.gauge("rate_limit", limiter.rate, endpoint=endpoint)
+
+    def _begin_request(self, request):
+        # count a request and start timing it, returns the perf_counter
+        # it started at or None without a metrics sink
+        if self.metrics is None:
+            return None
+        self.metrics.count("requests", request=request)
+        self._first_byte = time.perf_counter()
+        return self._first_byte
+
+    def _end_request(self, request, started):
+        if started is not None:
+            seconds = time.perf_counter() - started
+            self.metrics.timing(
+                "completion", time.time() - seconds, seconds, request=request
+            )
 
     @staticmethod
     def filter_raw_message(text):
@@ -156,6 +400,16 @@ class TvDatafeed:
     def prepend_header(st):
         return "~m~" + str(len(st)) + "~m~" + st
 
+    @staticmethod
+    def symbol_spec(symbol, extended_session: bool = False):
+        return (
+            '={"symbol":"'
+            + symbol
+            + '","adjustment":"splits","session":'
+            + ('"regular"' if not extended_session else '"extended"')
+            + "}"
+        )
+
     @staticmethod
     def construct_message(func, param_list):
         return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
@@ -171,56 +425,162 @@ class TvDatafeed:
 
     @staticmethod
     def create_hist_df(raw_data, symbol):
-        try:
-            out = re.search('"s":\[(.+?)\}\]', raw_data).group(1)
-            x = out.split(',{"')
-            data = list()
-            volume_data = True
+        # the first "s":[...] block is the series' bar list, decode it in one go
+        start = raw_data.find('"s":[')
+        end = raw_data.find("}]", start)
+        if start == -1 or end == -1:
+            logger.error("no data, please check the exchange and symbol")
+            return None
 
-            for xi in x:
-                xi = re.split("\[|:|,|\]", xi)
-                ts = datetime.datetime.fromtimestamp(float(xi[4]))
+        return TvDatafeed.bars_to_df(json.loads(raw_data[start + 4 : end + 2]), symbol)
 
-                row = [ts]
+    @staticmethod
+    def bars_to_df(bars, symbol):
+        """build the sohlcv dataframe from decoded bars, i.e. the "s" list
+        of a timescale_update message: [{"i": 0, "v": [ts, o, h, l, c, v]}, ...]
+        """
+        if not bars:
+            logger.error(f"no data for {symbol}, please check the exchange and symbol")
+            return None
 
-                for i in range(5, 10):
+        return TvDatafeed._columns_to_output(
+            TvDatafeed._bar_columns(bars), symbol, "pandas"
+        )
 
-                    # skip converting volume data if does not exists
-                    if not volume_data and i == 9:
-                        row.append(0.0)
-                        continue
-                    try:
-                        row.append(float(xi[i]))
+    @staticmethod
+    def bars_to_output(bars, symbol, output="pandas"):
+        """build bars in the requested output format from decoded bars
+
+        Args:
+            bars (list): decoded bars, [{"i": 0, "v": [ts, o, h, l, c, v]}, ...]
+            symbol (str): symbol in EXCHANGE:SYMBOL format
+            output (str, optional): "pandas", "numpy" or "arrow". Defaults to "pandas".
 
-                    except ValueError:
-                        volume_data = False
-                        row.append(0.0)
-                        logger.debug("no volume data")
+        Returns:
+            pd.DataFrame, np.ndarray or pyarrow.Table, see get_hist
+        """
+        if not bars:
+            logger.error(f"no data for {symbol}, please check the exchange and symbol")
+            return None
 
-                data.append(row)
+        return TvDatafeed._columns_to_output(
+            TvDatafeed._bar_columns(bars), symbol, output
+        )
 
-            data = pd.DataFrame(
-                data, columns=["datetime", "open", "high", "low", "close", "volume"]
-            ).set_index("datetime")
-            data.insert(0, "symbol", value=symbol)
+    @staticmethod
+    def frame_to_output(data, output="pandas"):
+        """convert a dataframe as returned by get_hist to another output format"""
+        if data is None or output == "pandas":
             return data
-        except AttributeError:
-            logger.error("no data, please check the exchange and symbol")
 
-    def parse_symbol_data(self, raw_data):
-        results = raw_data.split("\n")
-        for result in results:
-            if symbol_resolved in result:
-                input = result.replace('\\\\"', "")
-                parsed_data = self.parse_m_format(input)
+        from .store import to_epoch
 
-                for json_entry in parsed_data:
-                    if "m" in json_entry:
-                        if json_entry["m"] == symbol_resolved:
-                            raw_data = json_entry["p"][2]
-                            break
+        columns = np.vstack(
+            [to_epoch(data.index)]
+            + [data[column].to_numpy(np.float64) for column in ohlcv_columns]
+        )
+        return TvDatafeed._columns_to_output(columns, data["symbol"].iloc[0], output)
 
-        return raw_data
+    @staticmethod
+    def _columns_to_output(columns, symbol, output):
+        # columns is the (6, n) float64 block of _bar_columns, the arrow
+        # columns are zero-copy views of it
+        if output == "numpy":
+            data = np.empty(
+                len(columns[0]), dtype=np.dtype(bar_dtype, metadata={"symbol": symbol})
+            )
+            data["time"] = columns[0]
+            for i, column in enumerate(ohlcv_columns, 1):
+                data[column] = columns[i]
+            return data
+
+        if output == "arrow":
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ImportError(
+                    'output="arrow" requires pyarrow, install with pip install tvdatafeed[arrow]'
+                ) from None
+
+            arrays = [
+                pa.array(columns[0].astype(np.int64), pa.timestamp("s", tz="UTC"))
+            ]
+            arrays += [pa.array(columns[i]) for i in range(1, 6)]
+            return pa.Table.from_arrays(
+                arrays,
+                names=["time", *ohlcv_columns],
+                metadata={"symbol": symbol},
+            )
+
+        index = TvDatafeed._epoch_index(columns[0])
+
+        return pd.DataFrame(
+            {
+                # stored once, the codes are the same for every bar
+                "symbol": pd.Categorical.from_codes(
+                    np.zeros(len(index), np.int8), [symbol]
+                ),
+                "open": columns[1],
+                "high": columns[2],
+                "low": columns[3],
+                "close": columns[4],
+                "volume": columns[5],
+            },
+            index=index,
+        )
+
+    @staticmethod
+    def bars_to_batch(bars, symbols):
+        """build a dataframe of one bar per symbol, e.g. the bars of many
+        symbols closed at the same time
+
+        Args:
+            bars (list): decoded bars, [{"i": 0, "v": [ts, o, h, l, c, v]}, ...]
+            symbols (list): symbol of each bar in EXCHANGE:SYMBOL format
+
+        Returns:
+            pd.DataFrame: datetime and ohlcv as columns, indexed by symbol
+        """
+        columns = TvDatafeed._bar_columns(bars)
+
+        return pd.DataFrame(
+            {
+                "datetime": TvDatafeed._epoch_index(columns[0]),
+                "open": columns[1],
+                "high": columns[2],
+                "low": columns[3],
+                "close": columns[4],
+                "volume": columns[5],
+            },
+            index=pd.Index(symbols, name="symbol"),
+        )
+
+    @staticmethod
+    def _bar_columns(bars):
+        # one contiguous float64 array per column of the bars,
+        # timestamp, open, high, low, close and volume
+        values = [bar["v"] for bar in bars]
+        try:
+            data = np.array(values, dtype=np.float64)
+        except ValueError:  # bars of different lengths
+            data = np.array([(row + [0.0] * 6)[:6] for row in values], dtype=np.float64)
+
+        if data.shape[1] < 6:
+            # volume is missing for symbols which do not report it
+            logger.debug("no volume data")
+            data = np.hstack([data, np.zeros((len(data), 6 - data.shape[1]))])
+
+        return np.ascontiguousarray(data[:, :6].T)
+
+    @staticmethod
+    def _epoch_index(epoch):
+        # naive local time, as datetime.fromtimestamp gives
+        return (
+            pd.to_datetime(epoch.astype(np.int64), unit="s", utc=True)
+            .tz_convert(gettz())
+            .tz_localize(None)
+            .rename("datetime")
+        )
 
     @staticmethod
     def format_symbol(symbol, exchange, contract: int = None):
@@ -238,21 +598,40 @@ class TvDatafeed:
 
         return symbol
 
+    @staticmethod
+    def iter_frames(message):
+        """yield the payload of every ~m~len~m~ frame in a websocket message
+
+        Heartbeat payloads (~h~N) are yielded as they are, everything else
+        is a JSON message.
+        """
+        pos = 0
+        while (start := message.find("~m~", pos)) != -1:
+            sep = message.find("~m~", start + 3)
+            if sep == -1:
+                logger.error(f"truncated frame header: {message[start:start + 20]}")
+                return
+
+            try:
+                length = int(message[start + 3 : sep])
+            except ValueError:
+                logger.error(f"invalid frame length: {message[start:sep + 3]}")
+                pos = start + 3
+                continue
+
+            pos = sep + 3 + length
+            yield message[sep + 3 : pos]
+
     @staticmethod
     def parse_m_format(input_string):
-        pattern = r"~m~(\d+)~m~"
-        segments = re.split(pattern, input_string)
         result = []
-
-        i = 1  # Start from the first number-length indicator
-        while i < len(segments):
+        for payload in TvDatafeed.iter_frames(input_string):
+            if payload.startswith("~h~"):
+                continue
             try:
-                length = int(segments[i])
-                payload = segments[i + 1][:length]
                 result.append(json.loads(payload))
-            except (ValueError, json.JSONDecodeError) as e:
-                print(f"Error processing segment: {segments[i + 1]}")
-            i += 2  # Move to the next number-length indicator
+            except json.JSONDecodeError:
+                logger.error(f"error processing segment: {payload}")
 
         return result
 
@@ -291,8 +670,7 @@ class TvDatafeed:
         self.send_message(quote_create_session_msg, [self.session])
 
     def send_quote_set_fields_overview_msg(self, fields=fields):
-        fields.insert(0, self.session)
-        self.send_message(quote_set_fields_msg, fields)
+        self.send_message(quote_set_fields_msg, [self.session] + fields)
 
     def send_quote_add_symbols_msg(self, symbol):
         self.send_message(
@@ -303,43 +681,81 @@ class TvDatafeed:
     def send_quote_fast_symbols_msg(self, symbol):
         self.send_message(quote_fast_symbols_msg, [self.session, symbol])
 
-    def send_resolve_symbol_msg(self, symbol, extended_session: bool = False):
+    def send_resolve_symbol_msg(
+        self, symbol, extended_session: bool = False, symbol_id: str = "symbol_1"
+    ):
         self.send_message(
             resolve_symbol_msg,
             [
                 self.chart_session,
-                "symbol_1",
-                '={"symbol":"'
-                + symbol
-                + '","adjustment":"splits","session":'
-                + ('"regular"' if not extended_session else '"extended"')
-                + "}",
+                symbol_id,
+                self.symbol_spec(symbol, extended_session),
             ],
         )
 
-    def send_create_series_msg(self, interval, n_bars):
+    def send_create_series_msg(
+        self, interval, n_bars, series_id: str = "s1", symbol_id: str = "symbol_1"
+    ):
         self.send_message(
             create_series_msg,
-            [self.chart_session, "s1", "s1", "symbol_1", interval, n_bars],
+            [self.chart_session, series_id, series_id, symbol_id, interval, n_bars],
         )
 
+    def send_remove_series_msg(self, series_id):
+        self.send_message(remove_series_msg, [self.chart_session, series_id])
+
     def send_switch_timezone_msg(self):
         self.send_message(switch_timezone_msg, [self.chart_session, "exchange"])
 
-    def receive_data(self, sentinel):
-        raw_data = ""
+    def receive_messages(self, handlers):
+        """decode frames as they arrive and dispatch them by message type
+
+        Args:
+            handlers (dict): message type ("m") to a callable taking the decoded
+                message. Reading stops once a handler returns True.
+
+        Returns:
+            bool: True if stopped by a handler, False if the receive timed out
+        """
         while True:
             try:
                 result = self.ws.recv()
-                raw_data = raw_data + result + "\n"
+            except (WebSocketConnectionClosedException, OSError):
+                raise
             except Exception as e:
                 logger.error(e)
-                break
-
-            if sentinel in result:
-                break
-
-        return raw_data
+                self._timed_out = True
+                return False
+
+            if self.metrics is not None:
+                self._record_received(result)
+
+            for payload in self.iter_frames(result):
+                if payload.startswith("~h~"):
+                    # answer heartbeats so a long-lived socket is kept open
+                    self.ws.send(self.prepend_header(payload))
+                    continue
+
+                try:
+                    json_entry = json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.error(f"error processing segment: {payload}")
+                    continue
+
+                handler = handlers.get(json_entry.get("m"))
+                if handler is not None and handler(json_entry):
+                    return True
+
+    def _record_received(self, message):
+        # traffic of a received message, the first reply to a request
+        # gives the time to first byte (the hello sent on connect and
+        # heartbeats have no "m")
+        self.metrics.count("bytes_received", len(message))
+        self.metrics.count("frames_received", message.count("~m~") // 2)
+        if self._first_byte is not None and '"m":' in message:
+            seconds = time.perf_counter() - self._first_byte
+            self.metrics.timing("first_byte", time.time() - seconds, seconds)
+            self._first_byte = None
 
     def get_hist(
         self,
@@ -349,6 +765,9 @@ class TvDatafeed:
         n_bars: int = 10,
         fut_contract: int = None,
         extended_session: bool = False,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        output: str = "pandas",
     ) -> pd.DataFrame:
         """get historical data
 
@@ -356,33 +775,380 @@ class TvDatafeed:
             symbol (str): symbol name
             exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
             interval (str, optional): chart interval. Defaults to 'D'.
-            n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
+            n_bars (int, optional): no of bars to download, more than 5000 are fetched in pages. Ignored if start is given. Defaults to 10.
             fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
             extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            start (datetime, optional): get all bars from this datetime on, paging back through history as needed. Defaults to None.
+            end (datetime, optional): get bars up to this datetime only. Defaults to None.
+            output (str, optional): "pandas" for a dataframe, "numpy" for a structured array with time (epoch seconds) and ohlcv fields, "arrow" for a pyarrow.Table with the same columns. The symbol is in dtype.metadata and in the table metadata. Defaults to "pandas".
 
         Returns:
-            pd.Dataframe: dataframe with sohlcv as columns
+            pd.Dataframe: dataframe with sohlcv as columns, or the bars in the requested output format
         """
+        if output not in output_formats:
+            raise ValueError(
+                f'unknown output {output!r}, use "pandas", "numpy" or "arrow"'
+            )
+
+        if start is not None or end is not None or n_bars > self.max_bars_per_request:
+            pages = list(
+                self.iter_hist(
+                    symbol,
+                    exchange,
+                    interval,
+                    n_bars if start is None else None,
+                    fut_contract,
+                    extended_session,
+                    start,
+                    end,
+                    output,
+                )
+            )
+            # pages arrive newest first and do not overlap
+            return self._concat_output(pages[::-1], output) if pages else None
+
         symbol = self.format_symbol(
             symbol=symbol, exchange=exchange, contract=fut_contract
         )
         logger.debug(f"getting data for {symbol}...")
 
-        interval = interval.value
+        if self.cache is not None:
+            return self.frame_to_output(
+                self._get_hist_cached(symbol, interval, n_bars, extended_session),
+                output,
+            )
 
-        self.create_connection()
+        bars = self._request(
+            self._fetch_hist, symbol, interval.value, n_bars, extended_session
+        )
 
-        self.send_set_auth_token()
-        self.send_chart_create_session_msg()
-        self.send_quote_create_session_msg()
-        self.send_quote_set_fields_overview_msg()
-        self.send_quote_add_symbols_msg(symbol)
-        self.send_resolve_symbol_msg(symbol, extended_session)
-        self.send_create_series_msg(interval, n_bars)
+        with phase(self.metrics, "parse"):
+            return self.bars_to_output(bars, symbol, output)
+
+    @staticmethod
+    def _concat_output(parts, output):
+        if output == "numpy":
+            # concatenate drops the dtype metadata holding the symbol
+            return np.concatenate(parts).view(parts[0].dtype)
+        if output == "arrow":
+            import pyarrow as pa
+
+            return pa.concat_tables(parts)
+        return pd.concat(parts)
+
+    def _get_hist_cached(self, symbol, interval, n_bars, extended_session):
+        def fetch(n_bars):
+            bars = self._request(
+                self._fetch_hist, symbol, interval.value, n_bars, extended_session
+            )
+            return self.bars_to_df(bars, symbol)
+
+        path = self.cache.path(symbol, interval, extended_session)
+
+        with self.cache.lock(path):
+            cached = self.cache.load(path)
+
+            fetched = None
+            if cached is not None and len(cached) >= n_bars:
+                if not self.cache.is_stale(path, interval):
+                    logger.debug(f"serving {symbol} from cache")
+                    return cached.iloc[-n_bars:]
+
+                # only the bars since the last cached one are missing
+                fetched = fetch(
+                    min(
+                        self.cache.missing_bars(cached, interval),
+                        self.max_bars_per_request,
+                    )
+                )
+                if fetched is not None and fetched.index[0] > cached.index[-1]:
+                    fetched = None  # more were missing than estimated
+
+            if fetched is None:
+                fetched = fetch(n_bars)
+
+            if fetched is None:
+                return cached.iloc[-n_bars:] if cached is not None else None
+
+            if cached is not None and fetched.index[0] <= cached.index[-1]:
+                # the newest cached bar may not have been closed yet, the
+                # fetched one replaces it
+                data = pd.concat([cached[cached.index < fetched.index[0]], fetched])
+            else:
+                data = fetched
+
+            self.cache.store(path, data)
+
+        return data.iloc[-n_bars:]
 
-        raw_data = self.receive_data(sentinel=series_completed)
+    def _fetch_hist(self, symbol, interval, n_bars, extended_session):
+        if not self.persistent:
+            self.send_quote_add_symbols_msg(symbol)
 
-        return self.create_hist_df(raw_data, symbol)
+        bars = self._fetch_hist_many([symbol], interval, n_bars, extended_session, 1)
+
+        return bars.get(symbol)
+
+    def iter_hist(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = None,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        output: str = "pandas",
+    ):
+        """get historical data page by page, newest page first
+
+        The series is created once and older bars are requested on the same
+        chart session until the range is covered, so only one page is held
+        in memory at a time. If the socket dies in between, paging resumes
+        on a new connection from where it stopped.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            interval (str, optional): chart interval. Defaults to 'D'.
+            n_bars (int, optional): no of bars to download, all available if None and no start is given. Defaults to None.
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            start (datetime, optional): stop paging once bars older than this are reached. Defaults to None.
+            end (datetime, optional): skip bars newer than this. Defaults to None.
+            output (str, optional): "pandas", "numpy" or "arrow", see get_hist. Defaults to "pandas".
+
+        Yields:
+            pd.Dataframe: dataframe with sohlcv as columns, one per page
+        """
+        symbol = self.format_symbol(
+            symbol=symbol, exchange=exchange, contract=fut_contract
+        )
+        logger.debug(f"getting paged data for {symbol}...")
+
+        start_ts = start.timestamp() if start is not None else None
+        end_ts = end.timestamp() if end is not None else None
+        remaining = n_bars
+        oldest = None  # timestamp of the oldest bar seen so far
+
+        try:
+            for attempt in range(2):
+                if not self.connected:
+                    self.open_session()
+                pages = self._iter_series_pages(
+                    symbol, interval.value, extended_session
+                )
+                try:
+                    for bars in pages:
+                        if not bars:
+                            return  # no more history
+
+                        if oldest is not None:
+                            # pages may overlap, and after a reconnect the
+                            # newest bars come again
+                            bars = [bar for bar in bars if bar["v"][0] < oldest]
+                            if not bars:
+                                continue
+                        oldest = bars[0]["v"][0]
+
+                        bars = [
+                            bar
+                            for bar in bars
+                            if (start_ts is None or bar["v"][0] >= start_ts)
+                            and (end_ts is None or bar["v"][0] <= end_ts)
+                        ]
+                        if remaining is not None:
+                            bars = bars[-remaining:] if remaining else []
+                            remaining -= len(bars)
+
+                        if bars:
+                            with phase(self.metrics, "parse"):
+                                page = self.bars_to_output(bars, symbol, output)
+                            yield page
+
+                        if (start_ts is not None and oldest <= start_ts) or (
+                            remaining == 0
+                        ):
+                            return
+                    return
+                except (WebSocketConnectionClosedException, OSError) as e:
+                    logger.warning(f"websocket connection lost: {e}")
+                    self.close()
+                    if attempt:
+                        logger.error("failed to re-establish websocket connection")
+                finally:
+                    pages.close()
+        finally:
+            if not self.persistent:
+                self.close()
+
+    def _iter_series_pages(self, symbol, interval, extended_session):
+        # yield the bars of the series page by page, requesting the next
+        # older page on the same series after each one
+        symbol_id, series_id = self._next_ids()
+        bars = []
+
+        def on_update(json_entry):
+            series = json_entry["p"][1].get(series_id)
+            if isinstance(series, dict):
+                bars.extend(series.get("s", []))
+
+        def on_completed(json_entry):
+            return json_entry["p"][1] in (series_id, symbol_id)
+
+        def on_error(json_entry):
+            if on_completed(json_entry):
+                logger.error(f"{json_entry['m']} for {symbol}: {json_entry['p'][2:]}")
+                return True
+
+        handlers = {
+            timescale_update: on_update,
+            series_completed: on_completed,
+            symbol_error: on_error,
+            series_error: on_error,
+        }
+
+        self._acquire("data")
+        started = self._begin_request("hist_page")
+        self.send_resolve_symbol_msg(symbol, extended_session, symbol_id)
+        self.send_create_series_msg(
+            interval, self.max_bars_per_request, series_id, symbol_id
+        )
+
+        try:
+            while self.receive_messages(handlers):
+                self._feedback("data", True)
+                self._end_request("hist_page", started)
+                # bars of a page come in time order
+                page = sorted(bars, key=lambda bar: bar["v"][0])
+                bars.clear()
+                yield page
+
+                self._acquire("data")
+                started = self._begin_request("hist_page")
+                self.send_message(
+                    request_more_data_msg,
+                    [self.chart_session, series_id, self.max_bars_per_request],
+                )
+            self._feedback("data", not self._timed_out)
+        finally:
+            if self.connected:
+                self.send_remove_series_msg(series_id)
+
+    def get_hist_many(
+        self,
+        symbols: list,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 10,
+        extended_session: bool = False,
+        max_in_flight: int = 50,
+        combine: bool = False,
+    ):
+        """get historical data for many symbols over one websocket
+
+        All series are requested on the same chart session and the incoming
+        frames are demultiplexed by series id, so the symbols are fetched
+        concurrently rather than one round trip after another.
+
+        Args:
+            symbols (list): symbol names
+            exchange (str, optional): exchange, not required if symbols are in format EXCHANGE:SYMBOL. Defaults to 'NSE'.
+            interval (str, optional): chart interval. Defaults to 'D'.
+            n_bars (int, optional): no of bars to download per symbol, max 5000. Defaults to 10.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            max_in_flight (int, optional): max no of series requested at the same time. Defaults to 50.
+            combine (bool, optional): return one long dataframe instead of a dict. Defaults to False.
+
+        Returns:
+            dict: EXCHANGE:SYMBOL to dataframe with sohlcv as columns, None for
+            symbols which returned no data. If combine is True then a single
+            dataframe of all the symbols is returned instead.
+        """
+        symbols = list(
+            dict.fromkeys(
+                self.format_symbol(symbol=symbol, exchange=exchange)
+                for symbol in symbols
+            )
+        )
+        logger.debug(f"getting data for {len(symbols)} symbols...")
+
+        bars = self._request(
+            self._fetch_hist_many,
+            symbols,
+            interval.value,
+            n_bars,
+            extended_session,
+            max_in_flight,
+            cost=len(symbols),
+        )
+
+        if bars is None:
+            bars = {}
+
+        data = {symbol: self.bars_to_df(bars.get(symbol), symbol) for symbol in symbols}
+
+        if combine:
+            frames = [df for df in data.values() if df is not None]
+            return pd.concat(frames) if frames else None
+
+        return data
+
+    def _fetch_hist_many(
+        self, symbols, interval, n_bars, extended_session, max_in_flight
+    ):
+        pending = collections.deque(symbols)
+        in_flight = {}  # series id to symbol
+        series_ids = {}  # symbol id to series id
+        bars = {}
+        completed = {}
+
+        def submit():
+            while pending and len(in_flight) < max_in_flight:
+                symbol = pending.popleft()
+                symbol_id, series_id = self._next_ids()
+                self.send_resolve_symbol_msg(symbol, extended_session, symbol_id)
+                self.send_create_series_msg(interval, n_bars, series_id, symbol_id)
+                in_flight[series_id] = symbol
+                series_ids[symbol_id] = series_id
+
+        def finish(series_id):
+            symbol = in_flight.pop(series_id)
+            completed[symbol] = bars.pop(series_id, None)
+            # stop the server streaming updates for a series nobody reads
+            self.send_remove_series_msg(series_id)
+            submit()
+            return not in_flight
+
+        def on_update(json_entry):
+            for series_id, series in json_entry["p"][1].items():
+                if series_id in in_flight and isinstance(series, dict):
+                    bars.setdefault(series_id, []).extend(series.get("s", []))
+
+        def on_completed(json_entry):
+            series_id = json_entry["p"][1]
+            return series_id in in_flight and finish(series_id)
+
+        def on_error(json_entry):
+            message, params = json_entry["m"], json_entry["p"]
+            series_id = series_ids.get(params[1], params[1])
+            if series_id in in_flight:
+                logger.error(f"{message} for {in_flight[series_id]}: {params[2:]}")
+                return finish(series_id)
+
+        submit()
+
+        handlers = {
+            timescale_update: on_update,
+            series_completed: on_completed,
+            symbol_error: on_error,
+            series_error: on_error,
+        }
+        if in_flight and not self.receive_messages(handlers):
+            logger.error(f"{len(in_flight) + len(pending)} symbols not received")
+
+        return completed
 
     def get_symbol_data(
         self,
@@ -400,17 +1166,28 @@ class TvDatafeed:
         """
         symbol = self.format_symbol(symbol=symbol, exchange=exchange)
 
-        self.create_connection()
+        logger.debug(f"getting data for {symbol}...")
 
-        self.send_set_auth_token()
-        self.send_chart_create_session_msg()
-        self.send_resolve_symbol_msg(symbol)
+        return self._request(self._fetch_symbol_data, symbol)
 
-        logger.debug(f"getting data for {symbol}...")
+    def _fetch_symbol_data(self, symbol):
+        symbol_id, _ = self._next_ids()
+        data = {}
 
-        raw_data = self.receive_data(sentinel=symbol_resolved)
+        def on_resolved(json_entry):
+            if json_entry["p"][1] != symbol_id:
+                return False
+            if json_entry["m"] == symbol_resolved:
+                data.update(json_entry["p"][2])
+            else:
+                logger.error(f"{json_entry['m']} for {symbol}: {json_entry['p'][2:]}")
+            return True
 
-        return self.parse_symbol_data(raw_data)
+        self.send_resolve_symbol_msg(symbol, symbol_id=symbol_id)
+
+        self.receive_messages({symbol_resolved: on_resolved, symbol_error: on_resolved})
+
+        return data or None
 
     def get_financial_data(
         self,
@@ -428,57 +1205,302 @@ class TvDatafeed:
         """
         symbol = self.format_symbol(symbol=symbol, exchange=exchange)
 
-        self.create_connection()
+        return self._request(self._fetch_financial_data, symbol)
 
-        self.send_set_auth_token()
-        self.send_quote_create_session_msg()
-        self.send_message(
-            "quote_add_symbols",
-            [self.session, symbol],
+    def _fetch_financial_data(self, symbol):
+        # a dedicated quote session without a field list, so the server
+        # sends every field rather than the overview subset
+        session = self.generate_session()
+        data = {}
+
+        def on_quote_data(json_entry):
+            # merge the field updates as they arrive
+            if json_entry["p"][0] == session:
+                data.update(json_entry["p"][1].get("v", {}))
+
+        def on_quote_completed(json_entry):
+            return json_entry["p"][0] == session
+
+        self.send_message(quote_create_session_msg, [session])
+        self.send_message(quote_add_symbols_msg, [session, symbol])
+
+        self.receive_messages(
+            {"qsd": on_quote_data, "quote_completed": on_quote_completed}
         )
 
-        raw_data = self.receive_data(sentinel="quote_completed")
+        self.send_message("quote_delete_session", [session])
 
-        sections = self.raw_data_to_json_section(raw_data)
+        return data
 
-        flattened_sections = TvDatafeed.flatten_list_of_dicts(sections)
+    def get_financial_data_many(
+        self,
+        symbols: list,
+        exchange: str = "",
+        fields: list = None,
+        chunk_size: int = 100,
+    ) -> pd.DataFrame:
+        """get financial ratios for many symbols over one quote session
 
-        flattened_dict = {
-            key: value for d in flattened_sections for key, value in d.items()
-        }
+        The symbols are added to a single quote session, up to chunk_size at
+        a time, the field updates are merged per symbol as they arrive and
+        each symbol is removed from the session once it is complete.
+
+        Args:
+            symbols (list): symbol names
+            exchange (str, optional): exchange, not required if symbols are in format EXCHANGE:SYMBOL. Defaults to "".
+            fields (list, optional): only request these fields, e.g. ["market_cap_basic", "isin"]. Defaults to all fields.
+            chunk_size (int, optional): max no of symbols on the session at the same time. Defaults to 100.
+
+        Returns:
+            pd.DataFrame: fields as rows and EXCHANGE:SYMBOL as columns, all NaN for symbols which returned no data
+        """
+        symbols = list(
+            dict.fromkeys(
+                self.format_symbol(symbol=symbol, exchange=exchange)
+                for symbol in symbols
+            )
+        )
+        logger.debug(f"getting financial data for {len(symbols)} symbols...")
+
+        data = self._request(
+            self._fetch_financial_data_many,
+            symbols,
+            fields,
+            chunk_size,
+            cost=len(symbols),
+        )
+
+        return self.financial_data_to_df(data or {}, symbols)
 
-        return flattened_dict
+    @staticmethod
+    def financial_data_to_df(data, symbols):
+        """fields x symbols dataframe of the field dicts of each symbol"""
+        return pd.DataFrame(
+            {
+                symbol: pd.Series(data.get(symbol, {}), dtype=object)
+                for symbol in symbols
+            }
+        ).rename_axis("field")
+
+    def _fetch_financial_data_many(self, symbols, fields, chunk_size):
+        session = self.generate_session()
+        pending = collections.deque(symbols)
+        in_flight = set()
+        data = {}
+
+        def submit():
+            added = []
+            while pending and len(in_flight) < chunk_size:
+                added.append(pending.popleft())
+                in_flight.add(added[-1])
+            if added:
+                self.send_message(quote_add_symbols_msg, [session] + added)
+
+        def finish(symbol):
+            in_flight.discard(symbol)
+            # stop the server streaming updates for a symbol nobody reads
+            self.send_message(quote_remove_symbols_msg, [session, symbol])
+            submit()
+            return not in_flight
+
+        def on_quote_data(json_entry):
+            quote = json_entry["p"][1]
+            symbol = quote.get("n")
+            if json_entry["p"][0] != session or symbol not in in_flight:
+                return False
+            if quote.get("s") == "error":
+                logger.error(f"no financial data for {symbol}: {quote.get('errmsg')}")
+                return finish(symbol)
+            # merge the field updates as they arrive
+            data.setdefault(symbol, {}).update(quote.get("v", {}))
+
+        def on_quote_completed(json_entry):
+            symbol = json_entry["p"][1]
+            return (
+                json_entry["p"][0] == session and symbol in in_flight and finish(symbol)
+            )
 
-    def search_symbol(self, text: str, exchange: str = ""):
-        url = self.search_url.format(text, exchange)
+        self.send_message(quote_create_session_msg, [session])
+        if fields:
+            self.send_message(quote_set_fields_msg, [session] + list(fields))
+        submit()
 
-        symbols_list = []
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Host": "symbol-search.tradingview.com",
-                "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0",
-                "Accept": "*/*",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate, br, zstd",
-                "Referer": "https://www.tradingview.com/",
-                "Origin": "https://www.tradingview.com",
-                "Connection": "keep-alive",
-                "Sec-Fetch-Dest": "empty",
-                "Sec-Fetch-Mode": "cors",
-                "Sec-Fetch-Site": "same-site",
-                "Priority": "u=4",
-                "TE": "trailers",
+        handlers = {"qsd": on_quote_data, "quote_completed": on_quote_completed}
+        if in_flight and not self.receive_messages(handlers):
+            logger.error(f"{len(in_flight) + len(pending)} symbols not received")
+
+        self.send_message("quote_delete_session", [session])
+
+        return data
+
+    def search_symbol(
+        self,
+        text: str,
+        exchange: str = "",
+        start: int = 0,
+        all_pages: bool = False,
+        search_type: str = None,
+        country: str = None,
+        cache: bool = True,
+    ):
+        """search for symbols
+
+        Results are cached for search_cache_ttl seconds, so repeating a
+        search does not hit TradingView again.
+
+        Args:
+            text (str): symbol, name, ISIN or FIGI to search for
+            exchange (str, optional): limit the search to one exchange. Defaults to "".
+            start (int, optional): offset of the first result, for paging. Defaults to 0.
+            all_pages (bool, optional): keep requesting pages until no results remain. Defaults to False.
+            search_type (str, optional): limit to one type, e.g. stocks, funds or futures. Defaults to None.
+            country (str, optional): limit to listings of a country code, e.g. US. Defaults to None.
+            cache (bool, optional): use and fill the search cache. Defaults to True.
+
+        Returns:
+            dict: "symbols" list and "symbols_remaining" count, empty list on error
+        """
+        params = {}
+        if search_type is not None:
+            params["search_type"] = search_type
+        if country is not None:
+            params["country"] = params["sort_by_country"] = country
+
+        def page(start):
+            return self._search_page(text, exchange, start, params, cache)
+
+        result = page(start)
+
+        if all_pages and result:
+            result = {
+                "symbols_remaining": result.get("symbols_remaining", 0),
+                "symbols": list(result.get("symbols", [])),
             }
-            resp = requests.get(url, headers=headers)
+            while result["symbols_remaining"] > 0:
+                more = page(start + len(result["symbols"]))
+                if not more or not more.get("symbols"):
+                    break
+                result["symbols"].extend(more["symbols"])
+                result["symbols_remaining"] = more.get("symbols_remaining", 0)
+
+        return result
+
+    def search_symbols(
+        self,
+        texts: list,
+        exchange: str = "",
+        max_workers: int = 8,
+        all_pages: bool = False,
+    ) -> dict:
+        """search for many symbols concurrently
+
+        Args:
+            texts (list): texts to search for, see search_symbol
+            exchange (str, optional): limit the search to one exchange. Defaults to "".
+            max_workers (int, optional): max no of searches in flight at the same time. Defaults to 8.
+            all_pages (bool, optional): fetch every page of each search. Defaults to False.
+
+        Returns:
+            dict: search result keyed by text
+        """
+        texts = list(dict.fromkeys(texts))
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            results = executor.map(
+                lambda text: self.search_symbol(text, exchange, all_pages=all_pages),
+                texts,
+            )
+            return dict(zip(texts, results))
+
+    def _search_page(self, text, exchange, start, params=None, cache=True):
+        params = dict(params or {})
+        if start:
+            params["start"] = start
+
+        key = (text, exchange, tuple(sorted(params.items())))
+        with self._search_lock:
+            if cache and key in self._search_cache:
+                expires, result = self._search_cache[key]
+                if expires > time.monotonic():
+                    self._search_cache.move_to_end(key)
+                    return result
+                del self._search_cache[key]
+
+        url = self.search_url.format(
+            urllib.parse.quote(text), urllib.parse.quote(exchange)
+        )
+        if params:
+            parts = urllib.parse.urlsplit(url)
+            query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+            query.update(params)
+            url = parts._replace(query=urllib.parse.urlencode(query)).geturl()
 
-            symbols_list = json.loads(
-                resp.text.replace("</em>", "").replace("<em>", "")
+        self._acquire("search")
+        try:
+            resp = self.http.get(
+                url,
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    **self.search_headers,
+                },
+                timeout=self.ws_timeout,
             )
+            # 429 Too Many Requests and server errors slow the rate down
+            self._feedback("search", resp.status_code < 500 and resp.status_code != 429)
+            resp.raise_for_status()
+            # hl=1 marks the matched text with <em> tags
+            result = json.loads(resp.text.replace("</em>", "").replace("<em>", ""))
+        except requests.RequestException as e:
+            if e.response is None:  # no reply, e.g. timed out
+                self._feedback("search", False)
+            logger.error(e)
+            return []
         except Exception as e:
             logger.error(e)
+            return []
+
+        if not cache:
+            return result
+
+        with self._search_lock:
+            self._search_cache[key] = (time.monotonic() + self.search_cache_ttl, result)
+            self._search_cache.move_to_end(key)
+            while len(self._search_cache) > self.search_cache_size:
+                self._search_cache.popitem(last=False)
+
+        return result
 
-        return symbols_list
+    def lookup_symbol(self, symbol: str, exchange: str):
+        """find a symbol by exact symbol and exchange
+
+        Resolved from symbol_master when one is set, searching TradingView
+        only for symbols missing from it; symbols found that way are added
+        to the master.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str): exchange
+
+        Returns:
+            dict: symbol search result, None if TradingView does not list it
+        """
+        if self.symbol_master is not None:
+            item = self.symbol_master.get(symbol, exchange)
+            if item is not None:
+                return item
+
+        result = self.search_symbol(symbol, exchange)
+        for item in result.get("symbols", []) if result else []:
+            if item["symbol"] == symbol and item["exchange"] == exchange:
+                if self.symbol_master is not None:
+                    self.symbol_master.add([item])
+                return item
+
+        return None
+
+    def clear_search_cache(self):
+        """forget all cached symbol search results"""
+        with self._search_lock:
+            self._search_cache.clear()
 
 
 if __name__ == "__main__":
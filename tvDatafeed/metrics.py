@@ -0,0 +1,298 @@
+import contextlib
+import http.server
+import threading
+import time
+
+import pandas as pd
+
+_null_phase = contextlib.nullcontext()
+
+
+def phase(sink, name, **labels):
+    """context manager timing a block into sink, a no-op if sink is None
+
+    Args:
+        sink (Sink): where to record the timing, or None
+        name (str): metric name, e.g. "connect"
+        labels: label names to values
+    """
+    if sink is None:
+        return _null_phase
+    return _Phase(sink, name, labels)
+
+
+class _Phase:
+    __slots__ = ("sink", "name", "labels", "start", "started")
+
+    def __init__(self, sink, name, labels):
+        self.sink = sink
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sink.timing(
+            self.name, self.start, time.perf_counter() - self.started, **self.labels
+        )
+
+
+class Sink:
+    """where the clients report their metrics, subclass to plug in another system
+
+    Clients created with a sink (metrics argument) report:
+
+    - timings: connect (TCP, TLS and websocket upgrade), first_byte
+      (request sent to first reply, on a new connection this includes
+      the server setting up the auth and sessions, as it does not answer
+      those messages), completion (whole request, by request), parse
+      (bars to the output format), refresh (live feed retrieval, by
+      interval), callback (consumer callbacks, by consumer) and throttle
+      (waiting for the rate limit, by endpoint)
+    - counts: requests (by request), reconnects, bytes_received,
+      frames_received, retries and failures (live feed, by interval)
+    - gauges: queue_depth (bars queued for a consumer, by consumer) and
+      rate_limit (requests per second allowed, by endpoint)
+
+    Methods are called on the thread doing the work, so they must be thread
+    safe and quick. Without a sink nothing is measured.
+    """
+
+    def timing(self, name, start, seconds, **labels):
+        """record a phase which started at start (epoch seconds) and took seconds"""
+
+    def count(self, name, value=1, **labels):
+        """add value to a counter"""
+
+    def gauge(self, name, value, **labels):
+        """set a gauge to value"""
+
+
+class Stats(Sink):
+    """in-process sink keeping count, total, min and max of every timing,
+    the total of every counter and the last value of every gauge, per
+    name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}  # (name, labels) to [count, total, min, max]
+        self._counts = {}  # (name, labels) to total
+        self._gauges = {}  # (name, labels) to value
+
+    def timing(self, name, start, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if (summary := self._timings.get(key)) is None:
+                self._timings[key] = [1, seconds, seconds, seconds]
+            else:
+                summary[0] += 1
+                summary[1] += seconds
+                if seconds < summary[2]:
+                    summary[2] = seconds
+                if seconds > summary[3]:
+                    summary[3] = seconds
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[name, tuple(sorted(labels.items()))] = value
+
+    def get(self, name, **labels):
+        """summary of a timing as a dict of count, total, mean, min and max,
+        or the value of a counter or gauge, None if never recorded"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if (summary := self._timings.get(key)) is not None:
+                count, total, low, high = summary
+                return {
+                    "count": count,
+                    "total": total,
+                    "mean": total / count,
+                    "min": low,
+                    "max": high,
+                }
+            if key in self._counts:
+                return self._counts[key]
+            return self._gauges.get(key)
+
+    def snapshot(self):
+        """every metric recorded so far
+
+        Returns:
+            pd.DataFrame: one row per name and labels (as "key=value,..."),
+            with kind, count, total, mean, min and max of timings in seconds
+            and the value of counters and gauges
+        """
+        rows = []
+        with self._lock:
+            for (name, labels), (count, total, low, high) in self._timings.items():
+                rows.append(
+                    (name, labels, "timing", count, total, total / count, low, high)
+                )
+            for (name, labels), value in self._counts.items():
+                rows.append((name, labels, "count", None, value, None, None, None))
+            for (name, labels), value in self._gauges.items():
+                rows.append((name, labels, "gauge", None, value, None, None, None))
+
+        data = pd.DataFrame(
+            [
+                (name, ",".join(f"{k}={v}" for k, v in labels), *values)
+                for name, labels, *values in rows
+            ],
+            columns=["name", "labels", "kind", "count", "total", "mean", "min", "max"],
+        )
+        return data.set_index(["name", "labels"]).sort_index()
+
+    def reset(self):
+        """forget every metric"""
+        with self._lock:
+            self._timings.clear()
+            self._counts.clear()
+            self._gauges.clear()
+
+
+class PrometheusSink(Stats):
+    """Stats in the Prometheus text exposition format
+
+    Timings are exposed as summaries PREFIX_NAME_seconds (count and sum)
+    with a PREFIX_NAME_seconds_max gauge, counters as PREFIX_NAME_total and
+    gauges as PREFIX_NAME.
+
+    Args:
+        prefix (str, optional): prefix of the metric names. Defaults to "tvdatafeed".
+    """
+
+    def __init__(self, prefix="tvdatafeed"):
+        super().__init__()
+        self.prefix = prefix
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            for _, v in labels
+        )
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+    def exposition(self):
+        """the metrics in the Prometheus text format, version 0.0.4"""
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counts = sorted(self._counts.items())
+            gauges = sorted(self._gauges.items())
+
+        lines = []
+        declared = set()
+
+        def declare(metric, kind):
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), (count, total, _, _) in timings:
+            metric = f"{self.prefix}_{name}_seconds"
+            declare(metric, "summary")
+            lines.append(f"{metric}_count{self._labels(labels)} {count}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {total}")
+        for (name, labels), (_, _, _, high) in timings:
+            metric = f"{self.prefix}_{name}_seconds_max"
+            declare(metric, "gauge")
+            lines.append(f"{metric}{self._labels(labels)} {high}")
+        for (name, labels), value in counts:
+            metric = f"{self.prefix}_{name}_total"
+            declare(metric, "counter")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            metric = f"{self.prefix}_{name}"
+            declare(metric, "gauge")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host=""):
+        """serve the exposition over HTTP for Prometheus to scrape, on a
+        background thread
+
+        Returns:
+            http.server.ThreadingHTTPServer: call shutdown() to stop
+        """
+        sink = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="prometheus", daemon=True
+        ).start()
+        return server
+
+
+class OpenTelemetrySink(Sink):
+    """OpenTelemetry sink, timings become spans and histograms, counters
+    and gauges the matching instruments
+
+    Args:
+        tracer (opentelemetry.trace.Tracer, optional): Defaults to the tracer of the global provider.
+        meter (opentelemetry.metrics.Meter, optional): Defaults to the meter of the global provider.
+        prefix (str, optional): prefix of the span and instrument names. Defaults to "tvdatafeed".
+    """
+
+    def __init__(self, tracer=None, meter=None, prefix="tvdatafeed"):
+        try:
+            from opentelemetry import metrics, trace
+        except ImportError:
+            raise ImportError(
+                "OpenTelemetrySink requires opentelemetry-api, install with pip install tvdatafeed[otel]"
+            )
+
+        self.prefix = prefix
+        self._tracer = tracer or trace.get_tracer("tvDatafeed")
+        self._meter = meter or metrics.get_meter("tvDatafeed")
+        self._instruments = {}
+        self._lock = threading.Lock()
+
+    def _instrument(self, kind, name, **kwargs):
+        key = (kind, name)
+        if (instrument := self._instruments.get(key)) is None:
+            with self._lock:
+                if (instrument := self._instruments.get(key)) is None:
+                    create = getattr(self._meter, f"create_{kind}", None)
+                    if create is not None:
+                        instrument = create(f"{self.prefix}.{name}", **kwargs)
+                    self._instruments[key] = instrument
+        return instrument
+
+    def timing(self, name, start, seconds, **labels):
+        span = self._tracer.start_span(
+            f"{self.prefix}.{name}", start_time=int(start * 1e9), attributes=labels
+        )
+        span.end(end_time=int((start + seconds) * 1e9))
+        self._instrument("histogram", name, unit="s").record(seconds, labels)
+
+    def count(self, name, value=1, **labels):
+        self._instrument("counter", name).add(value, labels)
+
+    def gauge(self, name, value, **labels):
+        # synchronous gauges only exist in recent versions of the api
+        if (instrument := self._instrument("gauge", name)) is not None:
+            instrument.set(value, labels)
@@ -0,0 +1,373 @@
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from websocket import WebSocketException, WebSocketTimeoutException
+
+from .main import (
+    TvDatafeed,
+    fields,
+    quote_add_symbols_msg,
+    quote_create_session_msg,
+    quote_remove_symbols_msg,
+    quote_set_fields_msg,
+    set_auth_token_msg,
+)
+
+logger = logging.getLogger(__name__)
+
+# fields of the overview list holding text, every other field is stored as
+# float64 (booleans as 0.0 and 1.0, NaN until received)
+text_fields = {
+    "current_session",
+    "description",
+    "local_description",
+    "language",
+    "exchange",
+    "original_name",
+    "pro_name",
+    "short_name",
+    "type",
+    "update_mode",
+    "currency_code",
+}
+
+
+class QuoteStream:
+    """live quotes of many symbols on one quote session
+
+    Keeps a quote session open and applies the field updates (qsd messages)
+    TradingView pushes to a snapshot table with one row per symbol: a
+    float64 array for the numeric fields and an object array for the text
+    fields, preallocated and grown by doubling. Changes are passed to the
+    on_change callbacks on the receiving thread and can be awaited with
+    changes(). If the socket is lost it is reconnected with exponential
+    backoff and every symbol is added again.
+
+    Args:
+        tv (TvDatafeed, optional): client whose token is used. Defaults to a nologin client.
+        fields (list, optional): quote fields to receive. Defaults to the overview fields.
+        capacity (int, optional): no of symbol rows to preallocate. Defaults to 1024.
+        chunk_size (int, optional): max no of symbols per quote_add_symbols message. Defaults to 500.
+    """
+
+    def __init__(self, tv=None, fields=fields, capacity=1024, chunk_size=500):
+        self.fields = list(fields)
+        self.chunk_size = chunk_size
+
+        self._tv = (tv or TvDatafeed()).fork(persistent=True)
+        self._session = TvDatafeed.generate_session()
+
+        self._numeric = [field for field in self.fields if field not in text_fields]
+        self._text = [field for field in self.fields if field in text_fields]
+        # field to (is text, column)
+        self._columns = {field: (False, i) for i, field in enumerate(self._numeric)}
+        self._columns.update({field: (True, i) for i, field in enumerate(self._text)})
+
+        self._rows = {}  # symbol to row
+        self._symbols = []  # row to symbol, None once removed
+        self._free = []  # rows of removed symbols
+        self._values = np.full((capacity, len(self._numeric)), np.nan)
+        self._texts = np.full((capacity, len(self._text)), None, dtype=object)
+        self._updated = np.zeros(capacity)  # epoch seconds of the last update
+
+        self._lock = threading.Lock()  # guards the table and sending
+        self._quit = threading.Event()
+        self._thread = None
+        self._callbacks = []
+        self._iterators = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def add(self, symbols, exchange=""):
+        """stream the quotes of symbols, sent right away if connected
+
+        Args:
+            symbols (list): symbol names
+            exchange (str, optional): exchange, not required if symbols are in format EXCHANGE:SYMBOL. Defaults to "".
+        """
+        added = []
+        with self._lock:
+            for symbol in symbols:
+                symbol = TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+                if symbol in self._rows:
+                    continue
+                self._rows[symbol] = row = self._new_row()
+                self._symbols[row] = symbol
+                added.append(symbol)
+
+            self._send_symbols(quote_add_symbols_msg, added)
+
+    def remove(self, symbols, exchange=""):
+        """stop streaming the quotes of symbols
+
+        Args:
+            symbols (list): symbol names
+            exchange (str, optional): exchange, not required if symbols are in format EXCHANGE:SYMBOL. Defaults to "".
+        """
+        removed = []
+        with self._lock:
+            for symbol in symbols:
+                symbol = TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+                if (row := self._rows.pop(symbol, None)) is None:
+                    continue
+                self._symbols[row] = None
+                self._values[row] = np.nan
+                self._texts[row] = None
+                self._updated[row] = 0
+                self._free.append(row)
+                removed.append(symbol)
+
+            self._send_symbols(quote_remove_symbols_msg, removed)
+
+    def _new_row(self):
+        if self._free:
+            return self._free.pop()
+
+        row = len(self._symbols)
+        if row == len(self._values):
+            capacity = 2 * len(self._values)
+            self._values = np.resize(self._values, (capacity, len(self._numeric)))
+            self._values[row:] = np.nan
+            self._texts = np.resize(self._texts, (capacity, len(self._text)))
+            self._texts[row:] = None
+            self._updated = np.resize(self._updated, capacity)
+            self._updated[row:] = 0
+        self._symbols.append(None)
+        return row
+
+    def _send_symbols(self, func, symbols):
+        # called with the lock held, a failed send is redone on reconnect
+        if not symbols or not self._tv.connected:
+            return
+        try:
+            for i in range(0, len(symbols), self.chunk_size):
+                self._tv.send_message(
+                    func, [self._session] + symbols[i : i + self.chunk_size]
+                )
+        except (WebSocketException, OSError) as e:
+            logger.warning(f"failed to send {func}: {e}")
+
+    def on_change(self, callback):
+        """call callback(symbol, changes) for every update
+
+        changes is the dict of the fields that changed. Callbacks run on
+        the receiving thread, so they must be quick.
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    async def changes(self):
+        """async iterator of (symbol, changes) for the updates from now on
+
+        Updates of a symbol not yet consumed are merged, so a slow consumer
+        gets the latest values rather than an ever growing backlog.
+
+        Yields:
+            tuple: EXCHANGE:SYMBOL and the dict of changed fields
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        pending = {}
+        lock = threading.Lock()
+
+        def notify(symbol, changes):
+            with lock:
+                # the loop is only woken up if the consumer has caught up
+                wake = not pending
+                pending.setdefault(symbol, {}).update(changes)
+            if wake:
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:  # loop closed before the iterator
+                    with contextlib.suppress(ValueError):
+                        self._iterators.remove(notify)
+
+        self._iterators.append(notify)
+        try:
+            while True:
+                await event.wait()
+                event.clear()
+                while True:
+                    with lock:
+                        if not pending:
+                            break
+                        symbol = next(iter(pending))
+                        changes = pending.pop(symbol)
+                    yield symbol, changes
+        finally:
+            with contextlib.suppress(ValueError):
+                self._iterators.remove(notify)
+
+    def quote(self, symbol, exchange=""):
+        """latest fields of a symbol as a dict, None if not streamed"""
+        symbol = TvDatafeed.format_symbol(symbol=symbol, exchange=exchange)
+        with self._lock:
+            if (row := self._rows.get(symbol)) is None:
+                return None
+            data = dict(zip(self._numeric, self._values[row].tolist()))
+            data.update(zip(self._text, self._texts[row].tolist()))
+        return data
+
+    def snapshot(self):
+        """latest fields of all symbols
+
+        Returns:
+            pd.DataFrame: one row per EXCHANGE:SYMBOL with the fields as
+            columns and the epoch seconds of the last update as updated
+        """
+        with self._lock:
+            rows = list(self._rows.values())
+            data = pd.DataFrame(
+                self._values[rows], index=list(self._rows), columns=self._numeric
+            )
+            for i, field in enumerate(self._text):
+                data[field] = self._texts[rows, i]
+            data["updated"] = self._updated[rows]
+
+        return data[self.fields + ["updated"]].rename_axis("symbol")
+
+    def start(self):
+        """connect and start receiving quotes in a background thread"""
+        if self._thread is not None:
+            return
+        self._quit.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="quote_stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """stop receiving and close the connection"""
+        self._quit.set()
+        with self._lock:
+            self._tv.close()  # interrupts a blocking receive
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _connect(self):
+        # open the socket and the quote session on a new client, outside the
+        # lock as connecting waits for the rate limit and the handshake, then
+        # swap it in and add every symbol
+        tv = self._tv.fork(persistent=True)
+        try:
+            tv.create_connection()
+            tv.send_message(set_auth_token_msg, [tv.token])
+            tv.send_message(quote_create_session_msg, [self._session])
+            tv.send_message(quote_set_fields_msg, [self._session] + self.fields)
+        except BaseException:
+            tv.close()
+            raise
+
+        with self._lock:
+            if self._quit.is_set():
+                tv.close()
+                return
+            self._tv.close()
+            self._tv = tv
+            self._send_symbols(quote_add_symbols_msg, list(self._rows))
+
+    def _run(self):
+        backoff = 1
+        while not self._quit.is_set():
+            try:
+                if not self._tv.connected:
+                    self._connect()
+                    backoff = 1
+                if (ws := self._tv.ws) is None:  # stopped while connecting
+                    continue
+
+                try:
+                    message = ws.recv()
+                except WebSocketTimeoutException:  # only check if stopped
+                    continue
+
+                self._process(ws, message)
+            except (WebSocketException, OSError) as e:
+                if self._quit.is_set():
+                    break
+                logger.warning(
+                    f"quote connection lost, reconnecting in {backoff} s: {e}"
+                )
+                with self._lock:
+                    self._tv.close()
+                self._quit.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+        with self._lock:
+            self._tv.close()
+
+    def _process(self, ws, message):
+        for payload in TvDatafeed.iter_frames(message):
+            if payload.startswith("~h~"):
+                # answer heartbeats so the socket is kept open
+                ws.send(TvDatafeed.prepend_header(payload))
+                continue
+
+            try:
+                json_entry = json.loads(payload)
+            except json.JSONDecodeError:
+                logger.error(f"error processing segment: {payload}")
+                continue
+
+            if json_entry.get("m") != "qsd" or json_entry["p"][0] != self._session:
+                continue
+
+            quote = json_entry["p"][1]
+            symbol = quote.get("n")
+            if quote.get("s") == "error":
+                logger.error(f"no quotes for {symbol}: {quote.get('errmsg')}")
+                continue
+
+            changes = quote.get("v", {})
+            if self._apply(symbol, changes):
+                for callback in list(self._callbacks):
+                    try:
+                        callback(symbol, changes)
+                    except Exception as e:
+                        logger.error(f"quote callback raised {e!r}", exc_info=e)
+                for notify in list(self._iterators):
+                    notify(symbol, changes)
+
+    def _apply(self, symbol, changes):
+        # write the changed fields to the row of symbol, False if the
+        # symbol is not streamed (any more)
+        with self._lock:
+            if (row := self._rows.get(symbol)) is None:
+                return False
+
+            for field, value in changes.items():
+                if (column := self._columns.get(field)) is None:
+                    continue
+                is_text, i = column
+                if is_text:
+                    self._texts[row, i] = value
+                else:
+                    self._values[row, i] = _to_float(value)
+            self._updated[row] = time.time()
+        return True
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
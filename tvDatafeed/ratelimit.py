@@ -0,0 +1,150 @@
+import enum
+import heapq
+import itertools
+import threading
+import time
+
+
+class Priority(enum.IntEnum):
+    """order in which requests waiting for a rate limit are served"""
+
+    live = 0  # live feed refreshes and reconnects
+    normal = 1  # requests of the user
+    background = 2  # backfills
+
+
+class RateLimiter:
+    """adaptive token bucket with priority queueing
+
+    Tokens are added at rate per second, up to burst. Every request takes
+    cost tokens once at least one is available, so a bigger request runs
+    the bucket into debt which later requests wait out. Waiting requests
+    are served by priority, then in order of arrival, so a live refresh
+    goes ahead of every queued background request.
+
+    The rate adapts by AIMD: each success adds increase per token it cost
+    to it, up to max_rate, so batches grow it as fast as the same load
+    sent one request at a time would, and each error or timeout (throttled) multiplies it by
+    decrease, down to min_rate. Errors within cooldown seconds of a
+    decrease are taken as the same overload and do not decrease it again.
+
+    Args:
+        rate (float, optional): initial requests per second. Defaults to 5.
+        burst (float, optional): max tokens held. Defaults to 10.
+        min_rate (float, optional): Defaults to 0.2.
+        max_rate (float, optional): Defaults to 20.
+        increase (float, optional): added to the rate per token of a success. Defaults to 0.1.
+        decrease (float, optional): rate multiplier per throttle. Defaults to 0.5.
+        cooldown (float, optional): seconds after a decrease without another one. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        rate=5.0,
+        burst=10.0,
+        min_rate=0.2,
+        max_rate=20.0,
+        increase=0.1,
+        decrease=0.5,
+        cooldown=1.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._decreased = float("-inf")  # monotonic time of the last decrease
+        self._waiting = []  # heap of (priority, arrival) of the waiting requests
+        self._arrivals = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        """no of requests waiting"""
+        return len(self._waiting)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=Priority.normal, cost=1, timeout=None):
+        """wait in line until a request may be sent
+
+        Args:
+            priority (Priority, optional): Defaults to Priority.normal.
+            cost (float, optional): no of tokens the request takes. Defaults to 1.
+            timeout (float, optional): max seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True once the tokens are taken, False if timed out first
+        """
+        entry = (priority, next(self._arrivals))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    first = self._waiting[0] == entry
+                    if first and self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= cost
+                        entry = None
+                        return True
+
+                    # only the first in line waits for tokens, the others
+                    # until they move up
+                    wait = (1 - self._tokens) / self.rate if first else None
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = (
+                            deadline - now
+                            if wait is None
+                            else min(wait, deadline - now)
+                        )
+                    self._condition.wait(wait)
+            finally:
+                if entry is not None:  # timed out or interrupted
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                # the next in line may go now
+                self._condition.notify_all()
+
+    def success(self, cost=1):
+        """additive increase of the rate after a request of cost tokens
+        went through"""
+        with self._condition:
+            self.rate = min(self.max_rate, self.rate + self.increase * cost)
+
+    def throttled(self):
+        """multiplicative decrease of the rate after an error or timeout,
+        the tokens left are dropped so no burst follows"""
+        with self._condition:
+            now = time.monotonic()
+            if now - self._decreased < self.cooldown:
+                return
+            self._decreased = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0)
+
+
+class RateLimits:
+    """rate limiters of the TradingView endpoints, shared by every client
+    it is passed to (and their forks)
+
+    Args:
+        data (RateLimiter, optional): websocket connections and requests. Defaults to RateLimiter().
+        search (RateLimiter, optional): symbol search HTTP requests. Defaults to RateLimiter(2, burst=5, max_rate=10).
+    """
+
+    def __init__(self, data=None, search=None):
+        self.data = data or RateLimiter()
+        self.search = search or RateLimiter(2.0, burst=5.0, max_rate=10.0)
@@ -1,4 +1,5 @@
 import tvDatafeed
+from datetime import datetime as dt
 
 class Seis(object):
     """
@@ -190,6 +191,27 @@ class Seis(object):
             return True
         
         return False
+    
+    def is_new_bar(self, timestamp):
+        '''
+        Check if bar timestamp is newer than previous datas datetime
+        
+        Parameters
+        ----------
+        timestamp : float
+            bar timestamp in epoch seconds as received from TradingView
+        
+        Returns
+        -------
+        boolean
+            True is new, False otherwise
+        '''
+        updated=dt.fromtimestamp(timestamp) # same local datetime as in retrieved DataFrames
+        if self._updated != updated:
+            self._updated=updated
+            return True
+        
+        return False
    
     def get_hist(self, n_bars=10, timeout=-1):
         '''
@@ -0,0 +1,188 @@
+import datetime
+import hashlib
+import logging
+import re
+
+from dateutil.tz import gettz
+
+logger = logging.getLogger(__name__)
+
+# TradingView numbers the days of the week from Sunday = 1 to Saturday = 7
+_weekdays = "1234567"
+_default_days = "23456"
+
+_interval_seconds = {
+    "1": 60,
+    "3": 3 * 60,
+    "5": 5 * 60,
+    "15": 15 * 60,
+    "30": 30 * 60,
+    "45": 45 * 60,
+    "1H": 60 * 60,
+    "2H": 2 * 60 * 60,
+    "3H": 3 * 60 * 60,
+    "4H": 4 * 60 * 60,
+}
+
+
+def _tv_weekday(day):
+    # python counts from Monday = 0
+    return str((day.weekday() + 1) % 7 + 1)
+
+
+def _parse_session(session):
+    # "0930-1600:23456|0930-1300:6" to a list of (open, close, days) with
+    # open and close as minutes of the day
+    if session in ("24x7", ""):
+        return [(0, 0, _weekdays)]
+
+    result = []
+    for part in session.split("|"):
+        ranges, _, days = part.partition(":")
+        for span in ranges.split(","):
+            match = re.fullmatch(r"(\d\d)(\d\d)-(\d\d)(\d\d)", span.strip())
+            if match is None:
+                raise ValueError(f"unknown session format {session!r}")
+            hh1, mm1, hh2, mm2 = map(int, match.groups())
+            result.append((hh1 * 60 + mm1, hh2 * 60 + mm2, days or _default_days))
+    return result
+
+
+class SessionCalendar:
+    """trading sessions of a symbol, from its symbol_resolved data
+
+    Knows when the exchange is open, so the live feed can compute when the
+    next bar really closes instead of adding the interval to the last bar
+    and waking up through nights, weekends and holidays.
+
+    Args:
+        session (str): TradingView session, e.g. "0930-1600" or "1800-1700:23456"
+        timezone (str): exchange timezone, e.g. "America/New_York"
+        holidays (str, optional): comma separated YYYYMMDD dates without trading. Defaults to "".
+        corrections (str, optional): special sessions as "session:YYYYMMDD,...;...". Defaults to "".
+    """
+
+    def __init__(self, session, timezone, holidays="", corrections=""):
+        self.session = session
+        self.timezone = timezone
+        self.tz = gettz(timezone)
+        if self.tz is None:
+            raise ValueError(f"unknown timezone {timezone!r}")
+
+        self._sessions = _parse_session(session)
+        self._holidays = {day for day in holidays.split(",") if day}
+        self._corrections = {}
+        for correction in filter(None, corrections.split(";")):
+            spans, _, days = correction.rpartition(":")
+            for day in days.split(","):
+                # a correction applies to that date whatever its weekday
+                self._corrections[day] = [
+                    (open_, close, _weekdays)
+                    for open_, close, _ in _parse_session(spans)
+                ]
+
+        self.key = hashlib.sha1(
+            "|".join((session, timezone, holidays, corrections)).encode()
+        ).hexdigest()[:12]
+
+    @classmethod
+    def from_symbol_info(cls, info):
+        """calendar of a symbol_resolved payload, None if it has no session data
+
+        Args:
+            info (dict): as returned by TvDatafeed.get_symbol_data
+
+        Returns:
+            SessionCalendar
+        """
+        if not info or not info.get("session") or not info.get("timezone"):
+            return None
+
+        corrections = ""
+        for subsession in info.get("subsessions", []):
+            if subsession.get("id") == info.get("subsession_id"):
+                corrections = subsession.get("session-correction", "")
+
+        try:
+            return cls(
+                info["session"],
+                info["timezone"],
+                info.get("session_holidays", ""),
+                corrections,
+            )
+        except ValueError as e:
+            logger.warning(f"ignoring session of {info.get('pro_name')}: {e}")
+            return None
+
+    def sessions(self, day):
+        """(open, close) datetimes of the sessions of a trading day
+
+        A session is part of the trading day it closes on, so sessions
+        running over midnight open on the day before.
+        """
+        name = day.strftime("%Y%m%d")
+        if name in self._holidays:
+            return []
+
+        result = []
+        for open_, close, days in self._corrections.get(name, self._sessions):
+            if _tv_weekday(day) not in days:
+                continue
+            start = datetime.datetime.combine(day, datetime.time(), self.tz)
+            end = start + datetime.timedelta(minutes=close)
+            if open_ >= close:  # over midnight, or all day for 0000-0000
+                start -= datetime.timedelta(days=1)
+            result.append((start + datetime.timedelta(minutes=open_), end))
+        return sorted(result)
+
+    def is_open(self, when):
+        """True if when (aware datetime) is within a session"""
+        when = when.astimezone(self.tz)
+        for day in (when.date(), when.date() + datetime.timedelta(days=1)):
+            if any(start <= when < end for start, end in self.sessions(day)):
+                return True
+        return False
+
+    def next_bar_close(self, after, interval):
+        """when the first bar closing after a moment closes
+
+        Intraday bars are aligned to the session open and the last bar of a
+        session closes with the session. Daily bars close with the last
+        session of the trading day.
+
+        Args:
+            after (datetime): aware datetime
+            interval (str): Interval value, e.g. "5" or "1D"
+
+        Returns:
+            datetime: aware datetime in the exchange timezone, None for weekly
+            and monthly intervals or if no session within the next weeks
+        """
+        if interval != "1D" and interval not in _interval_seconds:
+            return None
+
+        after = after.astimezone(self.tz)
+        for offset in range(0, 15):
+            day = after.date() + datetime.timedelta(days=offset)
+            sessions = self.sessions(day)
+            if not sessions:
+                continue
+
+            if interval == "1D":
+                if sessions[-1][1] > after:
+                    return sessions[-1][1]
+                continue
+
+            # bars are counted in epoch seconds from the session open, as
+            # wall clock arithmetic is off by the DST change within a session
+            period = _interval_seconds[interval]
+            now = after.timestamp()
+            for start, end in sessions:
+                start, end = start.timestamp(), end.timestamp()
+                if end <= now:
+                    continue
+                bars = 1 if now < start else (now - start) // period + 1
+                close = min(start + bars * period, end)
+                return datetime.datetime.fromtimestamp(close, self.tz)
+
+        return None
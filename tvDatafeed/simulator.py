@@ -0,0 +1,812 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .main import TvDatafeed, set_auth_token_msg
+
+try:
+    from websockets.sync.client import connect
+    from websockets.sync.server import serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # optional dependency, see extras_require in setup.py
+    serve = None
+
+logger = logging.getLogger(__name__)
+
+interval_seconds = {
+    "1": 60,
+    "3": 3 * 60,
+    "5": 5 * 60,
+    "15": 15 * 60,
+    "30": 30 * 60,
+    "45": 45 * 60,
+    "1H": 60 * 60,
+    "2H": 2 * 60 * 60,
+    "3H": 3 * 60 * 60,
+    "4H": 4 * 60 * 60,
+    "1D": 24 * 60 * 60,
+    "1W": 7 * 24 * 60 * 60,
+    "1M": 30 * 24 * 60 * 60,
+}
+
+# quote fields whose synthetic value is text, the others are numbers
+_text_quote_fields = {
+    "current_session": "market",
+    "exchange": None,
+    "language": "en",
+    "type": "stock",
+    "update_mode": "streaming",
+    "currency_code": "USD",
+}
+
+
+def _frame(payload):
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, separators=(",", ":"))
+    return TvDatafeed.prepend_header(payload)
+
+
+def _messages(message):
+    # decoded payloads of a client message, heartbeats are left out
+    result = []
+    for payload in TvDatafeed.iter_frames(message):
+        if payload.startswith("~h~"):
+            continue
+        try:
+            result.append(json.loads(payload))
+        except json.JSONDecodeError:
+            logger.warning(f"ignoring malformed frame {payload!r}")
+    return result
+
+
+def _require_websockets(name):
+    if serve is None:
+        raise ImportError(
+            f"{name} requires websockets, install with pip install tvdatafeed[simulator]"
+        )
+
+
+class _Server:
+    # a websockets server on a background thread, shared by Simulator and
+    # Recorder
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """ws:// url to point a client at, e.g. TvDatafeed.ws_url"""
+        return f"ws://{self.host}:{self.port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """start serving in a background thread"""
+        if self._server is not None:
+            return
+        self._server = serve(self._handle, self.host, self.port)
+        self.port = self._server.socket.getsockname()[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """stop serving and close every connection"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._thread.join()
+        self._server = self._thread = None
+
+    def serve_forever(self):
+        """start serving and block until interrupted"""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            self.stop()
+
+
+class Simulator(_Server):
+    """local stand-in for the TradingView websocket server
+
+    Speaks the ~m~len~m~ framing and answers the chart and quote session
+    messages the clients send: set_auth_token, chart_create_session,
+    resolve_symbol, create_series, request_more_data, remove_series,
+    quote_create_session, quote_set_fields, quote_add_symbols and
+    quote_remove_symbols. Bars and quotes are generated deterministically
+    from the symbol name, and every series and quote session is updated
+    live with du and qsd messages. Alternatively a session recorded with
+    Recorder is replayed. Latency, jitter and dropped messages can be added
+    to either, so clients can be load tested without network access.
+
+    Point a client at it with TvDatafeed.ws_url = simulator.url.
+
+    Args:
+        host (str, optional): interface to listen on. Defaults to "localhost".
+        port (int, optional): port to listen on, 0 picks a free one. Defaults to 0.
+        bars (int, optional): bars of history per series. Defaults to 20000.
+        latency (float, optional): seconds to delay every frame by. Defaults to 0.
+        jitter (float, optional): up to this many seconds are added to the latency at random. Defaults to 0.
+        drop_rate (float, optional): probability of a message being dropped. Defaults to 0.
+        update_interval (float, optional): seconds between live updates, None for no updates. Defaults to 1.
+        heartbeat_interval (float, optional): seconds between heartbeats. Defaults to 10.
+        invalid_symbols (list, optional): EXCHANGE:SYMBOL names answered with symbol_error. Defaults to ().
+        session (str, optional): session of every symbol. Defaults to "24x7".
+        timezone (str, optional): timezone of every symbol. Defaults to "Etc/UTC".
+        recording (str, optional): file written by Recorder to replay instead of generating data. Defaults to None.
+        realtime (bool, optional): replay with the recorded delays between server frames. Defaults to False.
+        seed (int, optional): seed of the latency, jitter and drop randomness. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        host="localhost",
+        port=0,
+        bars=20000,
+        latency=0.0,
+        jitter=0.0,
+        drop_rate=0.0,
+        update_interval=1.0,
+        heartbeat_interval=10.0,
+        invalid_symbols=(),
+        session="24x7",
+        timezone="Etc/UTC",
+        recording=None,
+        realtime=False,
+        seed=None,
+    ):
+        _require_websockets("Simulator")
+        super().__init__(host, port)
+        self.bars = bars
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.update_interval = update_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.invalid_symbols = set(invalid_symbols)
+        self.session = session
+        self.timezone = timezone
+        self.realtime = realtime
+
+        self._random = random.Random(seed)
+        self._recording = None if recording is None else Recording(recording)
+        self._lock = threading.Lock()
+        self.stats = {"connections": 0, "received": 0, "sent": 0, "dropped": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _delay(self):
+        # latency of a frame and whether it is dropped
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            dropped = self._random.random() < self.drop_rate
+        return delay, dropped
+
+    def _handle(self, ws):
+        self._count("connections")
+        if self._recording is not None:
+            connection = _ReplayConnection(self, ws, self._recording.next())
+        else:
+            connection = _SimulatedConnection(self, ws)
+        connection.run()
+
+    def bar_values(self, symbol, times, seconds):
+        """synthetic bars of a symbol
+
+        Args:
+            symbol (str): EXCHANGE:SYMBOL
+            times (np.ndarray): bar open times, epoch seconds
+            seconds (int): bar length
+
+        Returns:
+            np.ndarray: (n, 6) float64 of time, open, high, low, close, volume
+        """
+        seed = zlib.crc32(symbol.encode())
+        base = 10 + seed % 490
+        phase = seed % 1000
+
+        def price(t):
+            x = t / 3600
+            return base * (1 + 0.1 * np.sin(x / 97 + phase) + 0.02 * np.sin(x / 7.3))
+
+        times = np.asarray(times, dtype=np.float64)
+        open = price(times)
+        close = price(times + seconds)
+        spread = 0.001 * (1 + (times // seconds) % 5)
+        volume = (1000 + (seed + times // seconds) % 997 * 10) * seconds / 60
+        return np.column_stack(
+            (
+                times,
+                open,
+                np.maximum(open, close) * (1 + spread),
+                np.minimum(open, close) * (1 - spread),
+                close,
+                volume,
+            )
+        )
+
+
+class _Connection:
+    # one client connection of the Simulator
+
+    def __init__(self, simulator, ws):
+        self.simulator = simulator
+        self.ws = ws
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def send(self, *payloads):
+        # send payloads as one message, after the simulated latency and
+        # unless dropped
+        if not payloads:
+            return
+        delay, dropped = self.simulator._delay()
+        if dropped:
+            self.simulator._count("dropped")
+            return
+        if delay:
+            time.sleep(delay)
+        with self._send_lock:
+            self.ws.send("".join(_frame(payload) for payload in payloads))
+        self.simulator._count("sent")
+
+    def run(self):
+        try:
+            self.open()
+            for message in self.ws:
+                self.simulator._count("received")
+                for json_entry in _messages(message):
+                    self.receive(json_entry)
+        except ConnectionClosed:
+            pass
+        finally:
+            self._closed.set()
+
+    def open(self):
+        pass
+
+    def receive(self, json_entry):
+        pass
+
+    def every(self, seconds, func):
+        # call func every seconds on a thread until the connection closes
+        def run():
+            while not self._closed.wait(seconds):
+                try:
+                    func()
+                except ConnectionClosed:
+                    return
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+class _SimulatedConnection(_Connection):
+    # answers with synthetic data
+
+    def __init__(self, simulator, ws):
+        super().__init__(simulator, ws)
+        self._lock = threading.Lock()
+        self._symbols = {}  # (chart session, symbol id) to symbol
+        self._series = {}  # (chart session, series id) to state dict
+        self._quotes = {}  # quote session to {"fields": list, "symbols": list}
+        self._heartbeat = 0
+
+    def open(self):
+        now = time.time()
+        self.send(
+            {
+                "session_id": f"<0.{zlib.crc32(str(now).encode())}.0>_simulator",
+                "timestamp": int(now),
+                "timestampMs": int(now * 1000),
+                "release": "simulator",
+                "protocol": "json",
+            }
+        )
+        if self.simulator.heartbeat_interval:
+            self.every(self.simulator.heartbeat_interval, self._send_heartbeat)
+        if self.simulator.update_interval:
+            self.every(self.simulator.update_interval, self._send_updates)
+
+    def _send_heartbeat(self):
+        self._heartbeat += 1
+        self.send(f"~h~{self._heartbeat}")
+
+    def receive(self, json_entry):
+        method, params = json_entry.get("m"), json_entry.get("p", [])
+        if (handler := getattr(self, f"_on_{method}", None)) is not None:
+            handler(*params)
+
+    def _on_resolve_symbol(self, session, symbol_id, spec, *args):
+        try:
+            symbol = json.loads(spec.lstrip("="))["symbol"]
+        except (ValueError, KeyError, TypeError):
+            symbol = spec.lstrip("=")
+
+        if symbol in self.simulator.invalid_symbols or ":" not in symbol:
+            self.send(
+                {"m": "symbol_error", "p": [session, symbol_id, "invalid symbol"]}
+            )
+            return
+
+        with self._lock:
+            self._symbols[session, symbol_id] = symbol
+        self.send(
+            {"m": "symbol_resolved", "p": [session, symbol_id, self._info(symbol)]}
+        )
+
+    def _info(self, symbol):
+        exchange, _, name = symbol.partition(":")
+        return {
+            "name": name,
+            "pro_name": symbol,
+            "full_name": symbol,
+            "exchange": exchange,
+            "listed_exchange": exchange,
+            "description": f"{name} simulated",
+            "type": "stock",
+            "currency_code": "USD",
+            "session": self.simulator.session,
+            "timezone": self.simulator.timezone,
+            "session_holidays": "",
+            "subsessions": [],
+            "pricescale": 100,
+            "minmov": 1,
+        }
+
+    def _on_create_series(
+        self, session, series_id, _, symbol_id, interval, n_bars, *args
+    ):
+        symbol = self._symbols.get((session, symbol_id))
+        seconds = interval_seconds.get(interval)
+        if symbol is None or seconds is None:
+            self.send(
+                {"m": "series_error", "p": [session, series_id, "invalid series"]}
+            )
+            return
+
+        now = time.time()
+        state = {
+            "symbol": symbol,
+            "seconds": seconds,
+            "newest": now - now % seconds,  # open of the forming bar
+            "loaded": 0,
+        }
+        with self._lock:
+            self._series[session, series_id] = state
+        self.send({"m": "series_loading", "p": [session, series_id]})
+        self._send_page(session, series_id, state, int(n_bars))
+
+    def _on_request_more_data(self, session, series_id, n_bars, *args):
+        if (state := self._series.get((session, series_id))) is not None:
+            self._send_page(session, series_id, state, int(n_bars))
+
+    def _send_page(self, session, series_id, state, n_bars):
+        # the next n_bars older bars of the series, none past the history
+        n = max(min(n_bars, self.simulator.bars - state["loaded"]), 0)
+        payloads = []
+        if n:
+            seconds = state["seconds"]
+            first = state["newest"] - (state["loaded"] + n - 1) * seconds
+            values = self.simulator.bar_values(
+                state["symbol"], first + seconds * np.arange(n), seconds
+            )
+            state["loaded"] += n
+            bars = [
+                {"i": self.simulator.bars - state["loaded"] + i, "v": row}
+                for i, row in enumerate(values.tolist())
+            ]
+            payloads.append(
+                {
+                    "m": "timescale_update",
+                    "p": [
+                        session,
+                        {series_id: {"node": "sim", "s": bars, "t": series_id}},
+                    ],
+                }
+            )
+        payloads.append(
+            {"m": "series_completed", "p": [session, series_id, "streaming"]}
+        )
+        self.send(*payloads)
+
+    def _on_remove_series(self, session, series_id, *args):
+        with self._lock:
+            self._series.pop((session, series_id), None)
+
+    def _on_quote_create_session(self, session, *args):
+        with self._lock:
+            self._quotes[session] = {"fields": None, "symbols": []}
+
+    def _on_quote_delete_session(self, session, *args):
+        with self._lock:
+            self._quotes.pop(session, None)
+
+    def _on_quote_set_fields(self, session, *fields):
+        with self._lock:
+            if session in self._quotes:
+                self._quotes[session]["fields"] = list(fields)
+
+    def _on_quote_add_symbols(self, session, *symbols):
+        if (quotes := self._quotes.get(session)) is None:
+            return
+
+        payloads = []
+        for symbol in symbols:
+            if not isinstance(symbol, str):  # flags
+                continue
+            if symbol in self.simulator.invalid_symbols or ":" not in symbol:
+                payloads.append(
+                    {
+                        "m": "qsd",
+                        "p": [
+                            session,
+                            {
+                                "n": symbol,
+                                "s": "error",
+                                "errmsg": "invalid symbol",
+                                "v": {},
+                            },
+                        ],
+                    }
+                )
+            else:
+                with self._lock:
+                    if symbol not in quotes["symbols"]:
+                        quotes["symbols"].append(symbol)
+                values = self._quote(symbol, quotes["fields"])
+                payloads.append(
+                    {"m": "qsd", "p": [session, {"n": symbol, "s": "ok", "v": values}]}
+                )
+            payloads.append({"m": "quote_completed", "p": [session, symbol]})
+        self.send(*payloads)
+
+    def _on_quote_remove_symbols(self, session, *symbols):
+        with self._lock:
+            if (quotes := self._quotes.get(session)) is not None:
+                quotes["symbols"] = [s for s in quotes["symbols"] if s not in symbols]
+
+    def _quote(self, symbol, fields, live=False):
+        # synthetic values of the requested quote fields, every field of
+        # the overview list if none were set
+        now = time.time()
+        _, _, _, _, price, volume = self.simulator.bar_values(symbol, [now - 60], 60)[0]
+        _, previous, *_ = self.simulator.bar_values(symbol, [now - now % 86400], 86400)[
+            0
+        ]
+        values = {
+            "lp": round(price, 2),
+            "lp_time": int(now),
+            "ch": round(price - previous, 2),
+            "chp": round((price - previous) / previous * 100, 2),
+            "volume": round(volume * (now % 86400) / 60),
+        }
+        if live:
+            return values
+
+        exchange, _, name = symbol.partition(":")
+        values.update(
+            description=f"{name} simulated",
+            pro_name=symbol,
+            short_name=name,
+            original_name=symbol,
+            local_description=f"{name} simulated",
+        )
+        seed = zlib.crc32(symbol.encode())
+        for field in fields or []:
+            if field in values:
+                continue
+            if field in _text_quote_fields:
+                values[field] = _text_quote_fields[field] or exchange
+            else:  # fundamentals and the like
+                values[field] = round(
+                    (seed ^ zlib.crc32(field.encode())) % 100000 / 100, 2
+                )
+        if fields:
+            values = {field: values[field] for field in fields if field in values}
+        return values
+
+    def _send_updates(self):
+        # a du for every series and a qsd for every quoted symbol
+        now = time.time()
+        with self._lock:
+            series = list(self._series.items())
+            quotes = [
+                (s, list(q["symbols"]), q["fields"]) for s, q in self._quotes.items()
+            ]
+
+        payloads = []
+        for (session, series_id), state in series:
+            seconds = state["seconds"]
+            start = now - now % seconds
+            row = self.simulator.bar_values(state["symbol"], [start], seconds)[0]
+            # the forming bar moves from its open towards its close
+            progress = (now - start) / seconds
+            row[4] = row[1] + (row[4] - row[1]) * progress
+            row[2], row[3] = max(row[1], row[4]), min(row[1], row[4])
+            row[5] *= progress
+            index = self.simulator.bars - 1 + int((start - state["newest"]) // seconds)
+            payloads.append(
+                {
+                    "m": "du",
+                    "p": [
+                        session,
+                        {
+                            series_id: {
+                                "s": [{"i": index, "v": row.tolist()}],
+                                "lbs": {},
+                            }
+                        },
+                    ],
+                }
+            )
+
+        for session, symbols, fields in quotes:
+            for symbol in symbols:
+                values = self._quote(symbol, fields, live=True)
+                if fields:
+                    values = {k: v for k, v in values.items() if k in fields}
+                payloads.append(
+                    {"m": "qsd", "p": [session, {"n": symbol, "s": "ok", "v": values}]}
+                )
+
+        self.send(*payloads)
+
+
+class _ReplayConnection(_Connection):
+    # answers with the server frames of a recorded connection
+    #
+    # Every client message is matched to the next recorded one of the same
+    # type, and the server frames recorded up to the client message after
+    # it are sent. Session and series ids of the recording are mapped to
+    # the ones the client uses as they are learned from the matched
+    # messages.
+
+    def __init__(self, simulator, ws, events):
+        super().__init__(simulator, ws)
+        self._events = events
+        self._position = 0
+        self._ids = {}
+
+    def open(self):
+        self._flush()
+
+    def receive(self, json_entry):
+        for position in range(self._position, len(self._events)):
+            origin, _, payloads = self._events[position]
+            if origin != "client":
+                continue
+            recorded = _messages(payloads)
+            if recorded and recorded[0].get("m") == json_entry.get("m"):
+                self._learn(recorded[0].get("p"), json_entry.get("p"))
+                self._position = position + 1
+                self._flush()
+                return
+        logger.debug(f"no recorded {json_entry.get('m')} left to replay")
+
+    def _learn(self, recorded, live):
+        # map the differing strings of the recorded parameters to the live
+        # ones, e.g. random session ids
+        if isinstance(recorded, list) and isinstance(live, list):
+            for a, b in zip(recorded, live):
+                self._learn(a, b)
+        elif isinstance(recorded, str) and isinstance(live, str) and recorded != live:
+            self._ids[recorded] = live
+
+    def _map(self, value):
+        if isinstance(value, str):
+            return self._ids.get(value, value)
+        if isinstance(value, list):
+            return [self._map(item) for item in value]
+        if isinstance(value, dict):
+            return {self._map(k): self._map(v) for k, v in value.items()}
+        return value
+
+    def _flush(self):
+        # send the server frames up to the next client message
+        while self._position < len(self._events):
+            origin, delay, message = self._events[self._position]
+            if origin == "client":
+                return
+            self._position += 1
+            if self.simulator.realtime and delay > 0:
+                time.sleep(delay)
+
+            payloads = []
+            for payload in TvDatafeed.iter_frames(message):
+                if payload.startswith("~h~"):
+                    payloads.append(payload)
+                    continue
+                try:
+                    payloads.append(self._map(json.loads(payload)))
+                except json.JSONDecodeError:
+                    payloads.append(payload)
+            self.send(*payloads)
+
+
+class Recording:
+    """connections captured by Recorder, read from its JSON lines file
+
+    Every line is {"connection": n, "from": "client" or "server", "t":
+    seconds since the connection opened, "data": raw websocket message}.
+
+    Args:
+        path (str): recording file
+    """
+
+    def __init__(self, path):
+        connections = {}
+        with open(path) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                connections.setdefault(event["connection"], []).append(event)
+
+        # (from, seconds since the previous event, data) per connection
+        self.connections = []
+        for events in connections.values():
+            last = 0
+            replay = []
+            for event in events:
+                replay.append((event["from"], event["t"] - last, event["data"]))
+                last = event["t"]
+            self.connections.append(replay)
+
+        if not self.connections:
+            raise ValueError(f"no connections recorded in {path}")
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        """events of the next connection to replay, starting over after the last"""
+        with self._lock:
+            events = self.connections[self._next % len(self.connections)]
+            self._next += 1
+        return events
+
+
+class Recorder(_Server):
+    """proxy recording the websocket traffic with TradingView for replay
+
+    Point a client at it with TvDatafeed.ws_url = recorder.url, every
+    message is forwarded to and from the upstream server and appended to
+    the recording file, which Simulator can replay. Auth tokens are
+    replaced by unauthorized_user_token before they are written.
+
+    Args:
+        path (str): recording file, appended to
+        upstream (str, optional): server to forward to. Defaults to TvDatafeed.ws_url.
+        host (str, optional): interface to listen on. Defaults to "localhost".
+        port (int, optional): port to listen on, 0 picks a free one. Defaults to 0.
+    """
+
+    headers = {"Origin": "https://data.tradingview.com"}
+
+    def __init__(self, path, upstream=TvDatafeed.ws_url, host="localhost", port=0):
+        _require_websockets("Recorder")
+        super().__init__(host, port)
+        self.path = path
+        self.upstream = upstream
+        self._lock = threading.Lock()
+        self._connections = 0
+
+    def _handle(self, ws):
+        with self._lock:
+            self._connections += 1
+            connection = self._connections
+        opened = time.monotonic()
+
+        def record(origin, message):
+            event = {
+                "connection": connection,
+                "from": origin,
+                "t": round(time.monotonic() - opened, 6),
+                "data": message,
+            }
+            with self._lock, open(self.path, "a") as file:
+                file.write(json.dumps(event) + "\n")
+
+        with connect(
+            self.upstream, additional_headers=self.headers, max_size=None
+        ) as upstream:
+
+            def forward():
+                try:
+                    for message in upstream:
+                        record("server", message)
+                        ws.send(message)
+                except ConnectionClosed:
+                    pass
+                ws.close()
+
+            thread = threading.Thread(target=forward, daemon=True)
+            thread.start()
+            try:
+                for message in ws:
+                    record("client", self._redact(message))
+                    upstream.send(message)
+            except ConnectionClosed:
+                pass
+            upstream.close()
+            thread.join()
+
+    @staticmethod
+    def _redact(message):
+        if set_auth_token_msg not in message:
+            return message
+        payloads = []
+        for payload in TvDatafeed.iter_frames(message):
+            if set_auth_token_msg in payload:
+                payload = TvDatafeed.construct_message(
+                    set_auth_token_msg, ["unauthorized_user_token"]
+                )
+            payloads.append(payload)
+        return "".join(_frame(payload) for payload in payloads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tvDatafeed.simulator",
+        description="serve a local stand-in for the TradingView websocket, or record one",
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--record", metavar="PATH", help="proxy to TradingView and record to PATH"
+    )
+    parser.add_argument(
+        "--replay", metavar="PATH", help="replay a recording instead of generating data"
+    )
+    parser.add_argument(
+        "--realtime", action="store_true", help="replay with the recorded delays"
+    )
+    parser.add_argument("--bars", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--update-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.record:
+        server = Recorder(args.record, host=args.host, port=args.port)
+    else:
+        server = Simulator(
+            host=args.host,
+            port=args.port,
+            bars=args.bars,
+            latency=args.latency,
+            jitter=args.jitter,
+            drop_rate=args.drop_rate,
+            update_interval=args.update_interval or None,
+            recording=args.replay,
+            realtime=args.realtime,
+            seed=args.seed,
+        )
+    server.start()
+    print(f"serving on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from dateutil.tz import gettz
+
+from .cache import FileLock
+
+logger = logging.getLogger(__name__)
+
+columns = ("open", "high", "low", "close", "volume")
+
+
+def to_epoch(index):
+    """int64 epoch seconds of a DatetimeIndex, naive ones are local time
+    as create_hist_df produces them"""
+    if index.tz is None:
+        try:
+            index = index.tz_localize(
+                gettz(), ambiguous="infer", nonexistent="shift_forward"
+            )
+        except Exception:
+            # too few bars around a DST change to infer, assume standard time
+            index = index.tz_localize(
+                gettz(), ambiguous=False, nonexistent="shift_forward"
+            )
+
+    utc = index.tz_convert(None)
+    return ((utc - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+
+def from_epoch(epoch):
+    """naive local DatetimeIndex of int64 epoch seconds"""
+    return (
+        pd.to_datetime(epoch, unit="s", utc=True)
+        .tz_convert(gettz())
+        .tz_localize(None)
+        .rename("datetime")
+    )
+
+
+class BarStore:
+    """memory-mapped columnar store for historical bars
+
+    Each (symbol, interval) gets a directory holding one flat binary file per
+    column: epoch seconds as int64 in time.i8 and open, high, low, close and
+    volume as float64 in <column>.f8, plus index.i8 with the timestamp of
+    every block-th bar. Reads slice the memory-mapped files for a date range
+    without loading whole files, appends only write the new rows.
+
+    Args:
+        directory (str): store directory, created if missing
+        block (int, optional): no of bars per time index entry. Defaults to 1024.
+    """
+
+    def __init__(self, directory, block=1024):
+        self.directory = directory
+        self.block = block
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, interval):
+        name = re.sub(r"[^\w.!-]", "_", symbol)
+        return os.path.join(self.directory, name, interval.value)
+
+    def series(self):
+        """list the (symbol, interval value) pairs held in the store"""
+        result = []
+        for name in sorted(os.listdir(self.directory)):
+            symbol_path = os.path.join(self.directory, name)
+            if not os.path.isdir(symbol_path):
+                continue
+            for interval in sorted(os.listdir(symbol_path)):
+                meta = os.path.join(symbol_path, interval, "meta.json")
+                if os.path.exists(meta):
+                    with open(meta) as file:
+                        result.append((json.load(file)["symbol"], interval))
+        return result
+
+    @staticmethod
+    def _rows(path):
+        # rows fully written to every column; a crashed append leaves
+        # some columns longer, those rows are ignored and overwritten
+        sizes = [
+            os.path.getsize(os.path.join(path, name))
+            for name in ["time.i8"] + [f"{column}.f8" for column in columns]
+            if os.path.exists(os.path.join(path, name))
+        ]
+        return min(sizes) // 8 if len(sizes) == len(columns) + 1 else 0
+
+    @staticmethod
+    def _map(path, name, dtype, rows, mode="r"):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, name), dtype=dtype, mode=mode, shape=rows)
+
+    def length(self, symbol, interval):
+        """no of bars stored for symbol and interval"""
+        return self._rows(self.path(symbol, interval))
+
+    def append(self, data, interval, symbol=None):
+        """append bars from a dataframe as returned by get_hist
+
+        Only bars newer than the last stored one are written. A bar with the
+        same timestamp as the last stored one replaces it, as that bar may
+        not have been closed when it was stored.
+
+        Args:
+            data (pd.DataFrame): dataframe with sohlcv as columns
+            interval (Interval): chart interval of the bars
+            symbol (str, optional): defaults to the symbol column of data
+
+        Returns:
+            int: no of bars written
+        """
+        if data is None or data.empty:
+            return 0
+        if symbol is None:
+            symbol = data["symbol"].iloc[0]
+
+        path = self.path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+
+        epoch = to_epoch(data.index)
+        order = np.argsort(epoch, kind="stable")
+        epoch = epoch[order]
+
+        with FileLock(os.path.join(path, ".lock")):
+            rows = self._rows(path)
+            times = self._map(path, "time.i8", np.int64, rows, "r+")
+
+            start = 0
+            if rows:
+                last = times[-1]
+                start = np.searchsorted(epoch, last, side="left")
+                if start < len(epoch) and epoch[start] == last:
+                    # refresh the last stored bar, then append the rest
+                    for column in columns:
+                        values = self._map(path, f"{column}.f8", np.float64, rows, "r+")
+                        values[-1] = data[column].to_numpy(np.float64)[order][start]
+                        values.flush()
+                    start += 1
+                if start:
+                    logger.debug(f"skipping {start} bars already stored for {symbol}")
+            del times
+
+            new = order[start:]
+            if len(new):
+                for column in columns:
+                    self._write(
+                        path,
+                        f"{column}.f8",
+                        rows,
+                        data[column].to_numpy(np.float64)[new],
+                    )
+                self._write(path, "time.i8", rows, epoch[start:])
+
+                self._update_index(path, rows + len(new))
+
+                if rows == 0:
+                    with open(os.path.join(path, "meta.json"), "w") as file:
+                        json.dump({"symbol": symbol, "interval": interval.value}, file)
+
+        return len(new)
+
+    @staticmethod
+    def _write(path, name, rows, values):
+        # truncate to the committed rows first in case an earlier append
+        # was interrupted half way
+        with open(os.path.join(path, name), "ab") as file:
+            file.truncate(rows * 8)
+            file.write(np.ascontiguousarray(values).tobytes())
+
+    def _update_index(self, path, rows):
+        times = self._map(path, "time.i8", np.int64, rows)
+        np.ascontiguousarray(times[:: self.block]).tofile(
+            os.path.join(path, "index.i8")
+        )
+
+    def _bounds(self, path, rows, start, end):
+        # row range of [start, end] using the time index to narrow the
+        # search to one block per bound
+        times = self._map(path, "time.i8", np.int64, rows)
+        index_path = os.path.join(path, "index.i8")
+        index = (
+            np.fromfile(index_path, dtype=np.int64)
+            if os.path.exists(index_path)
+            else times[:: self.block]
+        )
+
+        def find(ts, side):
+            block = max(np.searchsorted(index, ts, side=side) - 1, 0)
+            lo = block * self.block
+            hi = min(lo + 2 * self.block, rows)
+            return lo + np.searchsorted(times[lo:hi], ts, side=side)
+
+        lo = (
+            0 if start is None else find(to_epoch(pd.DatetimeIndex([start]))[0], "left")
+        )
+        hi = (
+            rows if end is None else find(to_epoch(pd.DatetimeIndex([end]))[0], "right")
+        )
+        return lo, max(lo, hi)
+
+    def read_arrays(self, symbol, interval, start=None, end=None):
+        """memory-mapped column arrays for a date range, without copying
+
+        Args:
+            symbol (str): symbol in EXCHANGE:SYMBOL format
+            interval (Interval): chart interval
+            start (datetime, optional): first bar to include. Defaults to None.
+            end (datetime, optional): last bar to include. Defaults to None.
+
+        Returns:
+            dict: "time" (int64 epoch seconds) and sohlcv float64 arrays
+        """
+        path = self.path(symbol, interval)
+        rows = self._rows(path)
+        lo, hi = self._bounds(path, rows, start, end) if rows else (0, 0)
+
+        arrays = {"time": self._map(path, "time.i8", np.int64, rows)[lo:hi]}
+        for column in columns:
+            arrays[column] = self._map(path, f"{column}.f8", np.float64, rows)[lo:hi]
+        return arrays
+
+    def read(self, symbol, interval, start=None, end=None):
+        """bars for a date range as a dataframe like get_hist returns
+
+        The price and volume columns are views of the memory-mapped files.
+
+        Returns:
+            pd.Dataframe: dataframe with sohlcv as columns, None if no bars
+        """
+        arrays = self.read_arrays(symbol, interval, start, end)
+        if not len(arrays["time"]):
+            return None
+
+        index = from_epoch(arrays.pop("time"))
+        data = pd.DataFrame(arrays, index=index, copy=False)
+        data.insert(
+            0,
+            "symbol",
+            pd.Categorical.from_codes(np.zeros(len(index), np.int8), [symbol]),
+        )
+        return data
@@ -0,0 +1,222 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import sqlite3
+import threading
+
+from .main import TvDatafeed
+
+logger = logging.getLogger(__name__)
+
+_schema = """
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    type TEXT,
+    description TEXT COLLATE NOCASE,
+    country TEXT,
+    currency_code TEXT,
+    isin TEXT COLLATE NOCASE,
+    data TEXT NOT NULL,
+    PRIMARY KEY (symbol, exchange)
+);
+CREATE INDEX IF NOT EXISTS symbols_exchange ON symbols (exchange, type);
+CREATE INDEX IF NOT EXISTS symbols_description ON symbols (description);
+CREATE INDEX IF NOT EXISTS symbols_isin ON symbols (isin);
+"""
+
+
+class SymbolMaster:
+    """local index of TradingView symbols in an SQLite file
+
+    Holds the symbol_search results for whole exchanges so symbols can be
+    validated and mapped without a network round trip. Fill it with crawl,
+    or from the command line:
+
+        python -m tvDatafeed.symbols symbols.db --exchange NASDAQ NYSE --type stocks
+
+    Args:
+        path (str): SQLite database file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # LIKE 'prefix%' can only use the NOCASE indexes when case insensitive
+        self._db.execute("PRAGMA case_sensitive_like = OFF")
+        self._db.executescript(_schema)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM symbols").fetchone()[0]
+
+    def add(self, symbols):
+        """insert or update symbol_search results
+
+        Args:
+            symbols (list): dicts as in the "symbols" list of search_symbol
+
+        Returns:
+            int: no of symbols written
+        """
+        rows = [
+            (
+                item["symbol"],
+                item["exchange"],
+                item.get("type"),
+                item.get("description"),
+                item.get("country"),
+                item.get("currency_code"),
+                item.get("isin"),
+                json.dumps(item, separators=(",", ":")),
+            )
+            for item in symbols
+            if "symbol" in item and "exchange" in item
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def get(self, symbol, exchange):
+        """symbol_search result for an exact symbol and exchange, None if unknown"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM symbols WHERE symbol = ? AND exchange = ?",
+                (symbol, exchange),
+            ).fetchone()
+        return None if row is None else json.loads(row["data"])
+
+    def find(
+        self,
+        symbol=None,
+        exchange=None,
+        type=None,
+        isin=None,
+        description=None,
+        limit=None,
+    ):
+        """symbols matching all the given fields
+
+        Args:
+            symbol (str, optional): exact symbol. Defaults to None.
+            exchange (str, optional): exact exchange. Defaults to None.
+            type (str, optional): instrument type, e.g. stock or fund. Defaults to None.
+            isin (str, optional): exact ISIN, case insensitive. Defaults to None.
+            description (str, optional): description prefix, case insensitive. Defaults to None.
+            limit (int, optional): max no of results. Defaults to all.
+
+        Returns:
+            list: symbol_search result dicts
+        """
+        conditions, args = [], []
+        for column, value in (
+            ("symbol", symbol),
+            ("exchange", exchange),
+            ("type", type),
+            ("isin", isin),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                args.append(value)
+        if description is not None:
+            conditions.append("description LIKE ? ESCAPE '\\'")
+            escaped = (
+                description.replace("\\", "\\\\")
+                .replace("%", "\\%")
+                .replace("_", "\\_")
+            )
+            args.append(escaped + "%")
+
+        query = "SELECT data FROM symbols"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def crawl(self, tv, exchanges, search_types=(None,), country=None, max_workers=4):
+        """download every symbol listed for the given exchanges and types
+
+        Pages through symbol_search with an empty search text, one
+        (exchange, type) pair per worker.
+
+        Args:
+            tv (TvDatafeed): client used for the searches
+            exchanges (list): exchanges to crawl, e.g. ["NASDAQ", "NYSE"]
+            search_types (list, optional): e.g. ["stocks", "funds"], None for all types. Defaults to all.
+            country (str, optional): limit to listings of a country code, e.g. "US". Defaults to None.
+            max_workers (int, optional): max no of searches in flight at the same time. Defaults to 4.
+
+        Returns:
+            int: no of symbols written
+        """
+
+        def crawl_one(exchange, search_type):
+            result = tv.search_symbol(
+                "",
+                exchange,
+                all_pages=True,
+                search_type=search_type,
+                country=country,
+                cache=False,
+            )
+            symbols = result.get("symbols", []) if result else []
+            logger.info(
+                f"crawled {len(symbols)} symbols for {exchange} {search_type or ''}"
+            )
+            return self.add(symbols)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(crawl_one, exchange, search_type)
+                for exchange in exchanges
+                for search_type in search_types
+            ]
+            return sum(future.result() for future in futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tvDatafeed.symbols",
+        description="build a local TradingView symbol master",
+    )
+    parser.add_argument("path", help="SQLite database file")
+    parser.add_argument("--exchange", nargs="+", required=True)
+    parser.add_argument("--type", nargs="+", default=[None], dest="search_types")
+    parser.add_argument("--country")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    with SymbolMaster(args.path) as master:
+        count = master.crawl(
+            TvDatafeed(),
+            args.exchange,
+            args.search_types,
+            country=args.country,
+            max_workers=args.workers,
+        )
+        print(f"{count} symbols written, {len(master)} in {args.path}")
+
+
+if __name__ == "__main__":
+    main()